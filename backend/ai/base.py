@@ -1,4 +1,40 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from backend.utils.prompt_loader import render_prompt
+from backend.utils.tracing import span, start_span
+
+_fallbacks = ContextVar("ai_fallbacks", default=None)
+
+
+class FallbackTracker:
+    used = False
+
+
+@contextmanager
+def track_fallbacks():
+    """
+    Notes whether any AI text produced inside the block (tasks started in it
+    included) is fallback text, so results built from it are not cached.
+    """
+    tracker = FallbackTracker()
+    token = _fallbacks.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _fallbacks.reset(token)
+
+
+def mark_fallback() -> None:
+    tracker = _fallbacks.get()
+    if tracker is not None:
+        tracker.used = True
+
+
 class AIExplainer:
+    model_name = None
+
     def explain(self, phone, target, lens, settings) -> str:
         raise NotImplementedError
 
@@ -7,3 +43,171 @@ class AIExplainer:
         Generates raw text content from the AI based on a prompt.
         """
         raise NotImplementedError
+
+    async def agenerate_content(self, prompt: str) -> str:
+        """
+        Async version of generate_content.
+        By default the blocking call runs in a worker thread so the event loop stays free.
+        """
+        return await asyncio.to_thread(self.generate_content, prompt)
+
+    def stream_content(self, prompt: str):
+        """
+        Yields the generated text in chunks as the model produces it.
+        Explainers without streaming support yield the whole text at once.
+        """
+        yield self.generate_content(prompt)
+
+    async def astream_content(self, prompt: str):
+        """
+        Async version of stream_content.
+        """
+        yield await self.agenerate_content(prompt)
+
+
+class PromptExplainer(AIExplainer):
+    """
+    Base for explainers backed by a text model.
+    Subclasses implement complete/acomplete (and optionally the streaming
+    complete_stream/acomplete_stream), which raise on failure;
+    explain/generate_content/stream_content turn failures into user-facing messages.
+    """
+
+    def complete(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, prompt: str) -> str:
+        return await asyncio.to_thread(self.complete, prompt)
+
+    def complete_stream(self, prompt: str):
+        yield self.complete(prompt)
+
+    async def acomplete_stream(self, prompt: str):
+        yield await self.acomplete(prompt)
+
+    def explain_prompt(self, phone, target, lens, settings) -> str:
+        return render_prompt(
+            "explainer_prompt",
+            phone_model=phone.get("model", "Unknown Phone"),
+            target=target,
+            lens=lens,
+            iso=settings.get("iso", "Auto"),
+            shutter=settings.get("shutter", "Auto"),
+            focus=settings.get("focus", "Auto"),
+            tripod=settings.get("tripod", "No"),
+            warning=settings.get("warning", "")
+        )
+
+    def fallback_content(self, prompt: str, error: Exception) -> str:
+        """
+        What generate_content/stream_content return when the model call fails.
+        """
+        return f"Error generating content: {str(error)}"
+
+    def fallback_explanation(self, phone, target, lens, settings, error: Exception) -> str:
+        return f"Error generating explanation: {str(error)}"
+
+    def explain(self, phone, target, lens, settings) -> str:
+        try:
+            return self.complete(self.explain_prompt(phone, target, lens, settings))
+        except Exception as e:
+            mark_fallback()
+            return self.fallback_explanation(phone, target, lens, settings, e)
+
+    def generate_content(self, prompt: str) -> str:
+        try:
+            return self.complete(prompt)
+        except Exception as e:
+            mark_fallback()
+            return self.fallback_content(prompt, e)
+
+    async def agenerate_content(self, prompt: str) -> str:
+        try:
+            return await self.acomplete(prompt)
+        except Exception as e:
+            mark_fallback()
+            return self.fallback_content(prompt, e)
+
+    def stream_content(self, prompt: str):
+        try:
+            yield from self.complete_stream(prompt)
+        except Exception as e:
+            mark_fallback()
+            yield self.fallback_content(prompt, e)
+
+    async def astream_content(self, prompt: str):
+        try:
+            async for chunk in self.acomplete_stream(prompt):
+                yield chunk
+        except Exception as e:
+            mark_fallback()
+            yield self.fallback_content(prompt, e)
+
+
+class ExplainerWrapper(PromptExplainer):
+    """
+    Wraps another PromptExplainer (caching, coalescing, ...).
+    Subclasses override complete/acomplete and call through to self.explainer.
+    """
+
+    def __init__(self, explainer: PromptExplainer):
+        self.explainer = explainer
+
+    @property
+    def model_name(self):
+        return self.explainer.model_name
+
+    def complete(self, prompt: str) -> str:
+        return self.explainer.complete(prompt)
+
+    async def acomplete(self, prompt: str) -> str:
+        return await self.explainer.acomplete(prompt)
+
+    def complete_stream(self, prompt: str):
+        return self.explainer.complete_stream(prompt)
+
+    def acomplete_stream(self, prompt: str):
+        return self.explainer.acomplete_stream(prompt)
+
+    def fallback_content(self, prompt: str, error: Exception) -> str:
+        return self.explainer.fallback_content(prompt, error)
+
+    def fallback_explanation(self, phone, target, lens, settings, error: Exception) -> str:
+        return self.explainer.fallback_explanation(phone, target, lens, settings, error)
+
+
+
+class TracedExplainer(ExplainerWrapper):
+    """
+    Times every upstream model call as an "ai_model" span (streams from
+    the first request to the last chunk).
+    """
+
+    def complete(self, prompt: str) -> str:
+        with span("ai_model", model=self.model_name):
+            return self.explainer.complete(prompt)
+
+    async def acomplete(self, prompt: str) -> str:
+        with span("ai_model", model=self.model_name):
+            return await self.explainer.acomplete(prompt)
+
+    def complete_stream(self, prompt: str):
+        call = start_span("ai_model", model=self.model_name, stream="yes")
+        try:
+            yield from self.explainer.complete_stream(prompt)
+        except BaseException as e:
+            call.tag(error=type(e).__name__)
+            raise
+        finally:
+            call.end()
+
+    async def acomplete_stream(self, prompt: str):
+        call = start_span("ai_model", model=self.model_name, stream="yes")
+        try:
+            async for chunk in self.explainer.acomplete_stream(prompt):
+                yield chunk
+        except BaseException as e:
+            call.tag(error=type(e).__name__)
+            raise
+        finally:
+            call.end()
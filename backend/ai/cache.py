@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from backend.ai.base import ExplainerWrapper
+from backend.utils.tracing import tag
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """
+    Cache key for a model response: hash of the model name, the template
+    version (for prompts rendered from backend/prompts/) and the final prompt.
+    """
+    version = getattr(prompt, "template_version", "")
+    return hashlib.sha256(f"{model_name}\0{version}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+class CacheBackend:
+    """
+    Key/value store for model responses. Tracks hit/miss/eviction counters.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> str | None:
+        """
+        get() for async callers. Backends that do I/O run it off the event loop.
+        """
+        return self.get(key)
+
+    async def aset(self, key: str, value: str) -> None:
+        self.set(key, value)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process LRU cache with a TTL per entry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    On-disk cache that survives restarts and is shared by every process
+    that opens the same file (WAL mode: readers never wait for the writer).
+    Entries expire after the TTL; expired and, past max_size, the oldest
+    entries are deleted every `evict_every` writes. Each table is its own
+    namespace with its own TTL. A database that stays locked longer than
+    `busy_timeout` seconds counts as a miss (or a skipped write), never an error.
+    """
+
+    def __init__(self, path, max_size: int = 50_000, ttl: float = 24 * 3600,
+                 table: str = "responses", busy_timeout: float = 2.0, evict_every: int = 256):
+        super().__init__()
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.path = str(path)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.table = table
+        self.evict_every = evict_every
+        self.errors = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Durable enough for a cache, and no fsync per write
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error:
+                self.errors += 1
+                row = None
+            if row is not None:
+                value, created_at = row
+                if created_at + self.ttl > time.time():
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+                self._writes += 1
+                if self._writes % self.evict_every == 0:
+                    self._evict()
+            except sqlite3.Error:
+                self.errors += 1
+
+    # A write holding the file's lock can block for up to busy_timeout, which
+    # must not stall every other request on the event loop
+    async def aget(self, key: str) -> str | None:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def _evict(self) -> None:
+        cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE created_at <= ?", (time.time() - self.ttl,))
+        self.evictions += max(cursor.rowcount, 0)
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_size:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)",
+                (count - self.max_size,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["errors"] = self.errors
+        try:
+            # Shared by every process using the file (the counters above are this process's)
+            stats["entries"] = len(self)
+        except sqlite3.Error:
+            stats["entries"] = None
+        return stats
+
+
+class TieredCache(CacheBackend):
+    """
+    Memory cache in front of a persistent one. Hits in the second tier are
+    promoted into the first.
+    """
+
+    def __init__(self, first: CacheBackend, second: CacheBackend):
+        super().__init__()
+        self.first = first
+        self.second = second
+
+    def get(self, key: str) -> str | None:
+        value = self.first.get(key)
+        if value is None:
+            value = self.second.get(key)
+            if value is not None:
+                self.first.set(key, value)
+        return self._counted(value)
+
+    def set(self, key: str, value: str) -> None:
+        self.first.set(key, value)
+        self.second.set(key, value)
+
+    async def aget(self, key: str) -> str | None:
+        # The memory tier inline, the second tier only on a miss (off the loop)
+        value = self.first.get(key)
+        if value is None:
+            value = await self.second.aget(key)
+            if value is not None:
+                self.first.set(key, value)
+        return self._counted(value)
+
+    async def aset(self, key: str, value: str) -> None:
+        self.first.set(key, value)
+        await self.second.aset(key, value)
+
+    def _counted(self, value: str | None) -> str | None:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["evictions"] = self.first.evictions + self.second.evictions
+        stats["memory"] = self.first.stats()
+        stats["disk"] = self.second.stats()
+        return stats
+
+
+class CachedExplainer(ExplainerWrapper):
+    """
+    Serves repeated prompts from a cache instead of calling the model again.
+    Failed calls raise through and are never cached.
+    """
+
+    def __init__(self, explainer, backend: CacheBackend):
+        super().__init__(explainer)
+        self.backend = backend
+
+    def complete(self, prompt: str) -> str:
+        key = cache_key(self.model_name, prompt)
+        text = self.backend.get(key)
+        tag(cache="miss" if text is None else "hit")
+        if text is None:
+            text = self.explainer.complete(prompt)
+            self.backend.set(key, text)
+        return text
+
+    async def acomplete(self, prompt: str) -> str:
+        key = cache_key(self.model_name, prompt)
+        text = await self.backend.aget(key)
+        tag(cache="miss" if text is None else "hit")
+        if text is None:
+            text = await self.explainer.acomplete(prompt)
+            await self.backend.aset(key, text)
+        return text
+
+    def complete_stream(self, prompt: str):
+        key = cache_key(self.model_name, prompt)
+        text = self.backend.get(key)
+        if text is not None:
+            yield text
+            return
+        chunks = []
+        for chunk in self.explainer.complete_stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        # Only streams that ran to completion are cached
+        self.backend.set(key, "".join(chunks).strip())
+
+    async def acomplete_stream(self, prompt: str):
+        key = cache_key(self.model_name, prompt)
+        text = await self.backend.aget(key)
+        if text is not None:
+            yield text
+            return
+        chunks = []
+        async for chunk in self.explainer.acomplete_stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        await self.backend.aset(key, "".join(chunks).strip())
+
+    def stats(self) -> dict:
+        return self.backend.stats()
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+_sdk = None
+_sdk_lock = threading.Lock()
+
+
+def load_sdk():
+    """
+    Imports the Gemini SDK on first use (about a second of import time).
+    Returns (genai, glm).
+    """
+    global _sdk
+    if _sdk is None:
+        with _sdk_lock:
+            if _sdk is None:
+                import google.ai.generativelanguage as glm
+                import google.generativeai as genai
+                _sdk = (genai, glm)
+    return _sdk
+
+
+def api_key_id(api_key: str) -> str:
+    """
+    What per-key state is keyed by, so raw API keys are not kept around as dict keys.
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _attach(model, attribute: str, client) -> None:
+    """
+    Gives a GenerativeModel its own service client. The SDK has no public way
+    to do this, so it sets the private attribute GenerativeModel reads
+    (google-generativeai 0.8, the version pinned in requirements.txt); if an
+    upgrade renames it, fail here instead of silently calling with the global
+    genai.configure() key.
+    """
+    if not hasattr(model, attribute):
+        genai, _ = load_sdk()
+        raise RuntimeError(
+            f"google-generativeai {getattr(genai, '__version__', '?')}: GenerativeModel has no "
+            f"{attribute}, so per-key clients cannot be set (supported: 0.8, see requirements.txt)"
+        )
+    setattr(model, attribute, client)
+
+
+class ModelPool:
+    """
+    Process-wide pool of GenerativeModel objects, one per (api key, model name),
+    keyed by api_key_id() rather than the key itself.
+
+    Each key gets its own service client instead of the SDK's global
+    genai.configure() state, so users bringing their own key never share or
+    overwrite each other's configuration.
+
+    Concurrent calls are capped by the AI scheduler (AI_MAX_CONCURRENCY in
+    backend/ai/factory.py). Only with the scheduler off does the factory set
+    the same cap here (set_max_concurrency), per process for sync calls and
+    per event loop for async calls; by default the pool adds no cap of its own.
+    """
+
+    def __init__(self, max_concurrency: int | None = None):
+        self._lock = threading.Lock()
+        self._models = {}
+        # grpc asyncio channels are bound to the loop that created them
+        self._loop_state = weakref.WeakKeyDictionary()
+        self.set_max_concurrency(max_concurrency)
+
+    def set_max_concurrency(self, max_concurrency: int | None) -> None:
+        """
+        Caps calls in flight (None = no cap). Meant for startup, before any call.
+        """
+        with self._lock:
+            self.max_concurrency = max_concurrency
+            self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+            self._loop_state = weakref.WeakKeyDictionary()
+
+    def get_model(self, api_key: str, model_name: str):
+        key = (api_key_id(api_key), model_name)
+        model = self._models.get(key)
+        if model is None:
+            genai, glm = load_sdk()
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = genai.GenerativeModel(model_name)
+                    _attach(model, "_client", glm.GenerativeServiceClient(client_options={"api_key": api_key}))
+                    self._models[key] = model
+        return model
+
+    def drop(self, api_key: str) -> None:
+        """
+        Forgets every client made for api_key (its explainer was evicted).
+        In-flight calls keep the model they hold; a later call makes a new one.
+        """
+        key_id = api_key_id(api_key)
+        with self._lock:
+            pools = [self._models, *(models for models, _ in self._loop_state.values())]
+            for models in pools:
+                for key in [key for key in models if key[0] == key_id]:
+                    models.pop(key, None)
+
+    def get_async_model(self, api_key: str, model_name: str):
+        models, _ = self._get_loop_state()
+        key = (api_key_id(api_key), model_name)
+        model = models.get(key)
+        if model is None:
+            genai, glm = load_sdk()
+            model = genai.GenerativeModel(model_name)
+            _attach(model, "_async_client", glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key}))
+            models[key] = model
+        return model
+
+    @contextmanager
+    def limit(self):
+        if self._semaphore is None:
+            yield
+            return
+        with self._semaphore:
+            yield
+
+    @asynccontextmanager
+    async def alimit(self):
+        _, semaphore = self._get_loop_state()
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            yield
+
+    def _get_loop_state(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_state.get(loop)
+            if state is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+                state = ({}, semaphore)
+                self._loop_state[loop] = state
+        return state
+
+
+model_pool = ModelPool()
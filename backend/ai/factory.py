@@ -1,9 +1,238 @@
 import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from backend.ai.base import TracedExplainer
+from backend.ai.client_pool import api_key_id, model_pool
 from backend.ai.gemini import GeminiExplainer
+from backend.ai.fake import FakeExplainer
 from backend.ai.fallback import FallbackExplainer
+from backend.ai.cache import CachedExplainer, MemoryCache, SQLiteCache, TieredCache
+from backend.ai.packing import PromptBatcher
+from backend.ai.resilience import CircuitBreaker, ResilientExplainer
+from backend.ai.scheduler import RateLimiter, ScheduledExplainer, Scheduler, SharedRateLimiter
+from backend.ai.singleflight import CoalescingExplainer, SingleFlight
+from backend.utils.prompt_loader import prompts
+
+# Response cache settings
+# AI_CACHE: "memory" (default), "sqlite" (memory + on-disk) or "off"
+AI_CACHE = os.getenv("AI_CACHE", "memory").lower()
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "1024"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", str(Path(tempfile.gettempdir()) / "astro_ai_cache.sqlite3"))
+
+# AI_COALESCE: share one upstream call between concurrent identical prompts ("on"/"off");
+# only callers using the same API key share a call
+AI_COALESCE = os.getenv("AI_COALESCE", "on").lower() != "off"
+
+# Resilience settings
+# AI_TIMEOUT: seconds per model call before giving up ("off" = no per-call limit)
+# AI_HEDGE: start a second call when the first is slower than the recent p95 ("on"/"off")
+# AI_HEDGE_MIN_DELAY: never hedge earlier than this many seconds
+# AI_BREAKER_FAILURES / AI_BREAKER_COOLDOWN: consecutive failures that switch to the
+# fallback text, and seconds before one probe call is tried again
+AI_RESILIENCE = os.getenv("AI_RESILIENCE", "on").lower() != "off"
+AI_TIMEOUT = None if os.getenv("AI_TIMEOUT", "20").lower() == "off" else float(os.getenv("AI_TIMEOUT", "20"))
+AI_HEDGE = os.getenv("AI_HEDGE", "off").lower() == "on"
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1.0"))
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "30"))
+
+# Scheduler settings (one queue per process, shared by every API key)
+# AI_SCHEDULER: priority queue + rate limits in front of the model ("on"/"off")
+# AI_MAX_CONCURRENCY: model calls in flight at once, per process. The only cap on
+# concurrent calls: enforced by the scheduler, or with AI_SCHEDULER=off by the
+# Gemini client pool. GEMINI_MAX_CONCURRENCY is its older name, used if it is unset
+# AI_MAX_QUEUE: calls allowed to wait; beyond that they get the fallback text at once
+# AI_RATE_RPM / AI_RATE_TPM: requests and estimated tokens per minute (0 = no limit),
+# with bursts of up to AI_RATE_BURST seconds worth of quota
+# AI_OUTPUT_TOKENS: expected answer length, added to the prompt's token estimate
+# AI_RATE_SHARED_FILE: file holding the rate buckets, to share them between processes (POSIX)
+AI_SCHEDULER = os.getenv("AI_SCHEDULER", "on").lower() != "off"
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", os.getenv("GEMINI_MAX_CONCURRENCY", "16")))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "256"))
+AI_RATE_RPM = float(os.getenv("AI_RATE_RPM", "0"))
+AI_RATE_TPM = float(os.getenv("AI_RATE_TPM", "0"))
+AI_RATE_BURST = float(os.getenv("AI_RATE_BURST", "10"))
+AI_OUTPUT_TOKENS = int(os.getenv("AI_OUTPUT_TOKENS", "300"))
+AI_RATE_SHARED_FILE = os.getenv("AI_RATE_SHARED_FILE", "")
+
+# Prompt packing
+# AI_PACK_PROMPTS: answer the prompts of one /analyze (and of concurrent ones) with one
+# packed JSON call ("on"/"off"); prompts are collected for AI_PACK_WINDOW_MS, at most
+# AI_PACK_MAX_PROMPTS per call
+AI_PACK_PROMPTS = os.getenv("AI_PACK_PROMPTS", "off").lower() == "on"
+AI_PACK_WINDOW_MS = float(os.getenv("AI_PACK_WINDOW_MS", "20"))
+AI_PACK_MAX_PROMPTS = int(os.getenv("AI_PACK_MAX_PROMPTS", "8"))
+
+# AI_MAX_KEYS: API keys whose explainer (pooled client, breaker, batcher) is kept;
+# beyond that the least recently used one is dropped
+AI_MAX_KEYS = int(os.getenv("AI_MAX_KEYS", "64"))
+
+# AI_PROVIDER: "gemini" (default) or "fake", a local model with injectable
+# latency (FAKE_AI_LATENCY: seconds, "low,high", "lognormal:median,sigma" or
+# "exp:mean"), failures (FAKE_AI_FAILURE_RATE) and stream chunks (FAKE_AI_CHUNKS)
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
+FAKE_AI_LATENCY = os.getenv("FAKE_AI_LATENCY", "0.5")
+FAKE_AI_FAILURE_RATE = float(os.getenv("FAKE_AI_FAILURE_RATE", "0"))
+FAKE_AI_CHUNKS = int(os.getenv("FAKE_AI_CHUNKS", "4"))
+
+_cache_backend = None
+
+
+def _build_scheduler() -> Scheduler:
+    if AI_RATE_SHARED_FILE:
+        limiter = SharedRateLimiter(AI_RATE_SHARED_FILE, AI_RATE_RPM, AI_RATE_TPM, AI_RATE_BURST)
+    else:
+        limiter = RateLimiter(AI_RATE_RPM, AI_RATE_TPM, AI_RATE_BURST)
+    return Scheduler(AI_MAX_CONCURRENCY, AI_MAX_QUEUE, limiter)
+
+
+scheduler = _build_scheduler()
+model_pool.set_max_concurrency(None if AI_SCHEDULER else AI_MAX_CONCURRENCY)
+
+# One explainer (and prompt batcher) per API key, reused across requests, for
+# the AI_MAX_KEYS most recently used keys. Keyed by a hash of the key, so the
+# secret itself is only held by the upstream client.
+_explainers = OrderedDict()
+_batchers = {}
+_explainers_lock = threading.Lock()
+
+
+def _resolve_key(api_key: str | None) -> str | None:
+    if AI_PROVIDER == "fake":
+        return "fake"
+    return api_key or os.getenv("GEMINI_API_KEY")
+
+
+def get_cache_backend():
+    """
+    Returns the process-wide response cache, or None when caching is off.
+    """
+    global _cache_backend
+    if AI_CACHE == "off":
+        return None
+    if _cache_backend is None:
+        memory = MemoryCache(max_size=AI_CACHE_SIZE, ttl=AI_CACHE_TTL)
+        if AI_CACHE == "sqlite":
+            _cache_backend = TieredCache(memory, SQLiteCache(AI_CACHE_PATH, ttl=AI_CACHE_TTL))
+        else:
+            _cache_backend = memory
+    return _cache_backend
+
+
+def get_ai_explainer(api_key: str | None = None):
+    """
+    Returns the shared explainer for an API key (defaults to GEMINI_API_KEY).
+    Uses Gemini behind the response cache if a key is available, otherwise fallback.
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return FallbackExplainer()
+
+    key_id = api_key_id(api_key)
+    evicted = []
+    with _explainers_lock:
+        explainer = _explainers.get(key_id)
+        if explainer is None:
+            explainer = _explainers[key_id] = _build_explainer(api_key)
+            while len(_explainers) > max(AI_MAX_KEYS, 1):
+                evicted_id, evicted_explainer = _explainers.popitem(last=False)
+                _batchers.pop(evicted_id, None)
+                evicted.append(evicted_explainer)
+        else:
+            _explainers.move_to_end(key_id)
+    for old in evicted:
+        _release(old)
+    return explainer
+
+
+def _release(explainer) -> None:
+    """
+    Drops the pooled clients of an evicted explainer. Requests still holding
+    it keep working; they just don't keep its clients alive for later ones.
+    """
+    while hasattr(explainer, "explainer"):
+        explainer = explainer.explainer
+    if isinstance(explainer, GeminiExplainer):
+        model_pool.drop(explainer.api_key)
+
+
+def get_prompt_batcher(api_key: str | None = None):
+    """
+    Returns the shared PromptBatcher for an API key, or None without a model
+    (the fallback explainer has nothing to pack).
+    """
+    explainer = get_ai_explainer(api_key)
+    if isinstance(explainer, FallbackExplainer):
+        return None
+    key_id = api_key_id(_resolve_key(api_key))
+    batcher = _batchers.get(key_id)
+    if batcher is None or batcher.explainer is not explainer:
+        with _explainers_lock:
+            batcher = _batchers.get(key_id)
+            if batcher is None or batcher.explainer is not explainer:
+                batcher = PromptBatcher(explainer, AI_PACK_WINDOW_MS / 1000.0, AI_PACK_MAX_PROMPTS)
+                # Only kept while the key's explainer is
+                if _explainers.get(key_id) is explainer:
+                    _batchers[key_id] = batcher
+    return batcher
+
+
+def _upstream(api_key: str):
+    if AI_PROVIDER == "fake":
+        return FakeExplainer(latency=FAKE_AI_LATENCY, failure_rate=FAKE_AI_FAILURE_RATE, chunks=FAKE_AI_CHUNKS)
+    return GeminiExplainer(api_key=api_key)
+
+
+def _build_explainer(api_key: str):
+    explainer = TracedExplainer(_upstream(api_key))
+    if AI_SCHEDULER:
+        explainer = ScheduledExplainer(explainer, scheduler, AI_OUTPUT_TOKENS)
+    if AI_RESILIENCE:
+        explainer = ResilientExplainer(
+            explainer,
+            timeout=AI_TIMEOUT,
+            hedge=AI_HEDGE,
+            hedge_min_delay=AI_HEDGE_MIN_DELAY,
+            breaker=CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN)
+        )
+    if AI_COALESCE:
+        # Per key: a caller must never run on (or get the errors of) someone else's key
+        explainer = CoalescingExplainer(explainer, SingleFlight())
+    backend = get_cache_backend()
+    if backend is not None:
+        explainer = CachedExplainer(explainer, backend)
+    return explainer
 
 
-def get_ai_explainer():
-    if os.getenv("GEMINI_API_KEY"):
-        return GeminiExplainer()
-    return FallbackExplainer()
\ No newline at end of file
+def ai_stats() -> dict:
+    """
+    Queue, breaker, coalescing and cache counters of the shared explainers,
+    upstream call counts (where the model reports them) and the prompt
+    template versions in use.
+    """
+    resilience = {}
+    coalescing = {}
+    upstream = {}
+    for number, explainer in enumerate(list(_explainers.values())):
+        while hasattr(explainer, "explainer"):
+            if isinstance(explainer, ResilientExplainer):
+                resilience[f"explainer_{number}"] = explainer.stats()
+            if isinstance(explainer, CoalescingExplainer):
+                coalescing[f"explainer_{number}"] = explainer.single_flight.stats()
+            explainer = explainer.explainer
+        if hasattr(explainer, "stats"):
+            upstream[f"explainer_{number}"] = explainer.stats()
+    backend = get_cache_backend()
+    return {
+        "scheduler": scheduler.stats() if AI_SCHEDULER else None,
+        "resilience": resilience,
+        "upstream": upstream,
+        "single_flight": coalescing,
+        "packing": {f"explainer_{number}": batcher.stats() for number, batcher in enumerate(list(_batchers.values()))},
+        "cache": backend.stats() if backend is not None else None,
+        "prompt_versions": prompts.versions()
+    }
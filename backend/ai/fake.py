@@ -0,0 +1,133 @@
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from backend.ai.base import PromptExplainer
+
+# Request markers of packed prompts (backend/ai/packing.py)
+_PACKED_RE = re.compile(r"^=== BEGIN (\S+) ===\s*$", re.MULTILINE)
+
+
+class FakeModelError(RuntimeError):
+    pass
+
+
+def latency_sampler(latency, rng: random.Random):
+    """
+    Turns a latency setting into a function returning seconds per call.
+
+    latency: seconds, a (low, high) range (uniform), a callable, or a spec
+    string: "0.5", "0.2,0.8", "lognormal:median,sigma" (long-tailed, like real
+    model calls) or "exp:mean".
+    """
+    if callable(latency):
+        return latency
+    if isinstance(latency, str):
+        kind, _, args = latency.partition(":") if ":" in latency else ("", "", latency)
+        values = [float(part) for part in args.split(",")]
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda: rng.lognormvariate(math.log(median), sigma)
+        if kind == "exp":
+            return lambda: rng.expovariate(1.0 / values[0])
+        if kind:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        latency = values[0] if len(values) == 1 else tuple(values)
+    if isinstance(latency, (tuple, list)):
+        low, high = latency
+        return lambda: rng.uniform(low, high)
+    return lambda: latency
+
+
+class FakeExplainer(PromptExplainer):
+    """
+    Local stand-in for the model, for exercising timeouts, hedging and the
+    circuit breaker without network access or an API key.
+
+    latency: seconds per call, a (low, high) range, a callable returning
+    seconds, or a distribution spec (see latency_sampler).
+    failure_rate: probability that a call raises FakeModelError.
+    fail: callable(call_number) -> bool forcing failures, for scripted scenarios.
+    chunks: pieces a streamed answer arrives in.
+    """
+    model_name = "fake-model"
+
+    def __init__(self, latency=0.0, failure_rate: float = 0.0, fail=None,
+                 chunks: int = 4, seed: int | None = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail = fail
+        self.chunks = chunks
+        self._random = random.Random(seed)
+        self._sample = latency_sampler(latency, self._random)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.stream_calls = 0
+        self.failures = 0
+
+    def _plan(self, stream: bool = False) -> tuple:
+        """
+        (call number, seconds to take, whether to fail) for the next call.
+        """
+        with self._lock:
+            self.calls += 1
+            self.stream_calls += stream
+            number = self.calls
+            delay = max(0.0, self._sample())
+            failed = self._random.random() < self.failure_rate
+        if self.fail is not None:
+            failed = failed or self.fail(number)
+        if failed:
+            with self._lock:
+                self.failures += 1
+        return number, delay, failed
+
+    @staticmethod
+    def _answer(prompt: str, number: int) -> str:
+        ids = _PACKED_RE.findall(prompt)
+        if ids:
+            return json.dumps({request_id: f"Fake answer #{number} to {request_id}." for request_id in ids})
+        return f"Fake answer #{number} for a {len(prompt)}-character prompt."
+
+    def complete(self, prompt: str) -> str:
+        number, delay, failed = self._plan()
+        time.sleep(delay)
+        if failed:
+            raise FakeModelError(f"Injected failure on call {number}")
+        return self._answer(prompt, number)
+
+    async def acomplete(self, prompt: str) -> str:
+        number, delay, failed = self._plan()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeModelError(f"Injected failure on call {number}")
+        return self._answer(prompt, number)
+
+    def _split(self, text: str) -> list:
+        size = max(1, -(-len(text) // self.chunks))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def complete_stream(self, prompt: str):
+        number, delay, failed = self._plan(stream=True)
+        parts = self._split(self._answer(prompt, number))
+        for i, part in enumerate(parts):
+            time.sleep(delay / len(parts))
+            if failed and i == len(parts) // 2:
+                raise FakeModelError(f"Injected failure on call {number}")
+            yield part
+
+    async def acomplete_stream(self, prompt: str):
+        number, delay, failed = self._plan(stream=True)
+        parts = self._split(self._answer(prompt, number))
+        for i, part in enumerate(parts):
+            await asyncio.sleep(delay / len(parts))
+            if failed and i == len(parts) // 2:
+                raise FakeModelError(f"Injected failure on call {number}")
+            yield part
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "stream_calls": self.stream_calls, "failures": self.failures}
@@ -1,7 +1,8 @@
-from backend.ai.base import AIExplainer
+from backend.ai.base import AIExplainer, mark_fallback
 
 class FallbackExplainer(AIExplainer):
     def explain(self, phone, target, lens, settings) -> str:
+        mark_fallback()
         return (
             f"Lens: {lens}\n"
             f"ISO: {settings.get('iso', 'Auto')}\n"
@@ -11,4 +12,5 @@ class FallbackExplainer(AIExplainer):
         )
 
     def generate_content(self, prompt: str) -> str:
+        mark_fallback()
         return "AI unavailable. Please check the standard guide."
@@ -1,38 +1,54 @@
 import os
-import google.generativeai as genai
-from backend.ai.base import AIExplainer
-from backend.utils.prompt_loader import load_prompt
-
-# Configure API Key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-
-class GeminiExplainer(AIExplainer):
-    def explain(self, phone, target, lens, settings) -> str:
-        try:
-            template = load_prompt("explainer_prompt.txt")
-
-            prompt = template.format(
-                phone_model=phone.get("model", "Unknown Phone"),
-                target=target,
-                lens=lens,
-                iso=settings.get("iso", "Auto"),
-                shutter=settings.get("shutter", "Auto"),
-                focus=settings.get("focus", "Auto"),
-                tripod=settings.get("tripod", "No"),
-                warning=settings.get("warning", "")
-            )
-
-            model = genai.GenerativeModel("gemini-3-flash-preview")
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            return f"Error generating explanation: {str(e)}"
-
-    def generate_content(self, prompt: str) -> str:
-        try:
-            model = genai.GenerativeModel("gemini-3-flash-preview")
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            return f"Error generating content: {str(e)}"
+from backend.ai.base import PromptExplainer
+from backend.ai.client_pool import model_pool
+from backend.ai.packing import wants_json
+
+MODEL_NAME = "gemini-3-flash-preview"
+
+
+def _generation_config() -> dict | None:
+    # Packed prompts ask for a bare JSON object
+    return {"response_mime_type": "application/json"} if wants_json() else None
+
+
+def _chunk_text(chunk) -> str:
+    # The last chunk of a stream can carry only the finish reason, no parts
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+class GeminiExplainer(PromptExplainer):
+    def __init__(self, api_key: str | None = None, model_name: str = MODEL_NAME):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model_name = model_name
+
+    def complete(self, prompt: str) -> str:
+        model = model_pool.get_model(self.api_key, self.model_name)
+        with model_pool.limit():
+            response = model.generate_content(prompt, generation_config=_generation_config())
+        return response.text.strip()
+
+    async def acomplete(self, prompt: str) -> str:
+        model = model_pool.get_async_model(self.api_key, self.model_name)
+        async with model_pool.alimit():
+            response = await model.generate_content_async(prompt, generation_config=_generation_config())
+        return response.text.strip()
+
+    def complete_stream(self, prompt: str):
+        model = model_pool.get_model(self.api_key, self.model_name)
+        with model_pool.limit():
+            for chunk in model.generate_content(prompt, stream=True):
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
+
+    async def acomplete_stream(self, prompt: str):
+        model = model_pool.get_async_model(self.api_key, self.model_name)
+        async with model_pool.alimit():
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                text = _chunk_text(chunk)
+                if text:
+                    yield text
@@ -0,0 +1,242 @@
+"""
+Several prompts, one model call.
+
+pack_prompt() merges independent prompts into one request whose answer is a
+JSON object keyed by request id; parse_packed() splits the answer back.
+PromptBatcher uses them to micro-batch: prompts submitted within a short
+window (from one request or many concurrent ones) go out as one packed call.
+Answers missing from the JSON, or a reply that is not JSON at all, are
+retried one prompt at a time, so packing never loses an answer.
+"""
+import asyncio
+import contextvars
+import json
+import re
+import weakref
+from contextlib import contextmanager
+
+from backend.ai.base import mark_fallback
+from backend.ai.cache import cache_key
+from backend.utils.prompt_loader import render_prompt
+
+_json_response = contextvars.ContextVar("ai_json_response", default=False)
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+@contextmanager
+def json_response():
+    """
+    Asks the model for a JSON reply (where supported) for calls inside the block.
+    """
+    token = _json_response.set(True)
+    try:
+        yield
+    finally:
+        _json_response.reset(token)
+
+
+def wants_json() -> bool:
+    return _json_response.get()
+
+
+def packed_schema(ids) -> dict:
+    return {
+        "type": "object",
+        "properties": {request_id: {"type": "string"} for request_id in ids},
+        "required": list(ids),
+        "additionalProperties": False
+    }
+
+
+def pack_prompt(prompts: dict) -> str:
+    """
+    {id: prompt} -> one prompt asking for {"id": answer, ...}.
+    """
+    requests = "\n\n".join(
+        f"=== BEGIN {request_id} ===\n{prompt.strip()}\n=== END {request_id} ==="
+        for request_id, prompt in prompts.items()
+    )
+    return render_prompt(
+        "packed_prompt",
+        schema=json.dumps(packed_schema(prompts), indent=1),
+        requests=requests
+    )
+
+
+def parse_packed(text: str, ids) -> dict:
+    """
+    The non-empty string answers found for `ids` in a packed reply.
+
+    Accepts the bare object, the object in a code fence, or the first JSON
+    object embedded in other text; anything else yields {}.
+    """
+    text = _FENCE_RE.sub("", text.strip())
+    data = None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        decoder = json.JSONDecoder()
+        for match in re.finditer(r"\{", text):
+            try:
+                data, _ = decoder.raw_decode(text, match.start())
+                break
+            except ValueError:
+                continue
+    if not isinstance(data, dict):
+        return {}
+    return {
+        request_id: data[request_id].strip()
+        for request_id in ids
+        if isinstance(data.get(request_id), str) and data[request_id].strip()
+    }
+
+
+class _Batch:
+    def __init__(self):
+        # prompt -> future; identical prompts in one window share an entry
+        self.futures = {}
+        self.handle = None
+
+
+class PromptBatcher:
+    """
+    Collects prompts for `window` seconds (or until `max_prompts`) and sends
+    them as one packed call through `explainer`.
+
+    Answers already in the explainer's cache are served without joining a
+    batch, and every unpacked answer is cached under its own prompt, so
+    packed and unpacked requests share cached answers.
+    """
+
+    def __init__(self, explainer, window: float = 0.02, max_prompts: int = 8):
+        self.explainer = explainer
+        self.window = window
+        self.max_prompts = max_prompts
+        self.cache = getattr(explainer, "backend", None)
+        # Futures belong to one event loop, so batches are kept per loop
+        self._batches = weakref.WeakKeyDictionary()
+        self._tasks = set()
+        self.packed_calls = 0
+        self.packed_prompts = 0
+        self.single_calls = 0
+        self.parse_failures = 0
+        self.cache_hits = 0
+
+    async def _cached(self, prompt: str) -> str | None:
+        if self.cache is None:
+            return None
+        return await self.cache.aget(cache_key(self.explainer.model_name, prompt))
+
+    async def _store(self, prompt: str, text: str) -> None:
+        if self.cache is not None:
+            await self.cache.aset(cache_key(self.explainer.model_name, prompt), text)
+
+    async def acomplete_many(self, prompts: dict) -> dict:
+        """
+        {key: prompt} -> {key: answer}. Raises like acomplete if a prompt
+        could not be answered at all.
+        """
+        results = {}
+        waiting = {}
+        for key, prompt in prompts.items():
+            text = await self._cached(prompt)
+            if text is not None:
+                self.cache_hits += 1
+                results[key] = text
+            else:
+                waiting[key] = self._submit(prompt)
+        for key, future in waiting.items():
+            # Shielded: other requests may be waiting on the same answer
+            results[key] = await asyncio.shield(future)
+        return results
+
+    async def agenerate_many(self, prompts: dict) -> dict:
+        """
+        acomplete_many that answers each failed prompt with the explainer's
+        fallback text instead of raising.
+        """
+        keys = list(prompts)
+        outcomes = await asyncio.gather(
+            *(self.acomplete_many({key: prompts[key]}) for key in keys), return_exceptions=True
+        )
+        results = {}
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, BaseException):
+                mark_fallback()
+                results[key] = self.explainer.fallback_content(prompts[key], outcome)
+            else:
+                results[key] = outcome[key]
+        return results
+
+    def _submit(self, prompt: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = _Batch()
+            self._batches[loop] = batch
+            # The call runs in the context of the first prompt (its budget and priority)
+            batch.handle = loop.call_later(self.window, self._flush, loop)
+        future = batch.futures.get(prompt)
+        if future is None:
+            future = loop.create_future()
+            batch.futures[prompt] = future
+            if len(batch.futures) >= self.max_prompts:
+                batch.handle.cancel()
+                self._flush(loop)
+        return future
+
+    def _flush(self, loop) -> None:
+        batch = self._batches.pop(loop, None)
+        if batch is not None:
+            task = loop.create_task(self._run(batch.futures))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, futures: dict) -> None:
+        prompts = list(futures)
+        answers = {}
+        if len(prompts) > 1:
+            ids = [f"r{number}" for number in range(len(prompts))]
+            self.packed_calls += 1
+            self.packed_prompts += len(prompts)
+            try:
+                with json_response():
+                    text = await self.explainer.acomplete(pack_prompt(dict(zip(ids, prompts))))
+            except Exception as e:
+                # The model itself failed (timeout, circuit open, ...): so would single calls
+                for future in futures.values():
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            parsed = parse_packed(text, ids)
+            if len(parsed) < len(ids):
+                self.parse_failures += 1
+            for request_id, prompt in zip(ids, prompts):
+                if request_id in parsed:
+                    answers[prompt] = parsed[request_id]
+                    await self._store(prompt, parsed[request_id])
+
+        # Single prompts, and whatever the packed reply did not answer
+        missing = [prompt for prompt in prompts if prompt not in answers]
+        self.single_calls += len(missing)
+        outcomes = await asyncio.gather(*(self.explainer.acomplete(prompt) for prompt in missing), return_exceptions=True)
+        answers.update(zip(missing, outcomes))
+
+        for prompt, future in futures.items():
+            if future.done():
+                continue
+            answer = answers[prompt]
+            if isinstance(answer, BaseException):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
+
+    def stats(self) -> dict:
+        return {
+            "packed_calls": self.packed_calls,
+            "packed_prompts": self.packed_prompts,
+            "single_calls": self.single_calls,
+            "parse_failures": self.parse_failures,
+            "cache_hits": self.cache_hits
+        }
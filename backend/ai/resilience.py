@@ -0,0 +1,390 @@
+"""
+Keeps a slow or failing model from stalling requests.
+
+ResilientExplainer wraps the upstream explainer with:
+
+- a deadline per call, further capped by the request budget (request_budget());
+- optional hedging: when a call is still running after the recent p95
+  latency, a second identical call is started and the first answer wins;
+- a circuit breaker: after enough consecutive failures calls go straight to
+  FallbackExplainer for a cooldown, then one probe call decides whether to
+  close the circuit again.
+
+Failures still raise from complete/acomplete (so nothing bad is cached);
+generate_content/explain on any wrapper around it return the fallback text
+instead of an error message.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from backend.ai.base import ExplainerWrapper
+from backend.ai.fallback import FallbackExplainer
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Rejected(RuntimeError):
+    """
+    The call was refused locally (circuit open, queue full), not by the model.
+    """
+
+
+class CircuitOpenError(Rejected):
+    pass
+
+
+# Absolute time.monotonic() by which the current request must be done
+_deadline = contextvars.ContextVar("ai_request_deadline", default=None)
+
+
+@contextmanager
+def request_budget(seconds: float | None):
+    """
+    Caps the total time AI calls may take inside the block (None = no cap).
+    Nested budgets can only shorten the outer one.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+# The layers below share the call's deadline (scheduler queue); when it runs
+# out they get this long to report their own error before the call is cut off
+_GRACE = 0.05
+
+
+def _exceeded(what: str, timeout: float | None) -> DeadlineExceeded:
+    return DeadlineExceeded(f"{what} exceeded {timeout:.1f}s" if timeout is not None else f"{what} timed out")
+
+
+async def _within(awaitable, timeout: float | None, error: DeadlineExceeded):
+    """
+    Awaits `awaitable`, raising `error` only when this `timeout` runs out.
+    Errors raised inside, TimeoutErrors included (a socket timeout, the
+    scheduler's queue deadline), pass through unchanged, unlike
+    asyncio.wait_for, whose own timeout looks the same as theirs.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if not done:
+            done, _ = await asyncio.wait({task}, timeout=_GRACE)
+    except BaseException:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.wait({task})
+        raise error
+    return task.result()
+
+
+def remaining_budget() -> float | None:
+    """
+    Seconds left in the current request budget, or None without one.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class LatencyWindow:
+    """
+    Latencies of the last `size` successful calls.
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; open -> half-open
+    after `cooldown` seconds, letting one probe through; the probe's outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, failures: int = 5, cooldown: float = 30.0):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """
+        The call was abandoned by its caller: no verdict, let another probe through.
+        """
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+
+class ResilientExplainer(ExplainerWrapper):
+    """
+    Deadlines, hedging and a circuit breaker around an upstream explainer.
+
+    timeout: seconds per call (None = only the request budget applies).
+    hedge: start a second call after the recent p95 latency (at least
+    hedge_min_delay), once hedge_min_samples calls have been seen.
+    """
+
+    def __init__(self, explainer, timeout: float | None = 20.0, hedge: bool = False,
+                 hedge_min_delay: float = 1.0, hedge_min_samples: int = 20,
+                 breaker: CircuitBreaker | None = None, fallback=None, max_workers: int = 32):
+        super().__init__(explainer)
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.fallback = fallback or FallbackExplainer()
+        self.latency = LatencyWindow()
+        # Blocking calls run here so the caller can stop waiting at the deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-call")
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    # -- helpers -------------------------------------------------------
+    def _call_timeout(self) -> float | None:
+        timeout = self.timeout
+        remaining = remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded("Request budget exhausted")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _hedge_delay(self, timeout: float | None) -> float | None:
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        delay = max(self.hedge_min_delay, self.latency.percentile(0.95))
+        return delay if timeout is None or delay < timeout else None
+
+    def _admit(self) -> float | None:
+        timeout = self._call_timeout()
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("AI temporarily disabled after repeated failures")
+        self.calls += 1
+        return timeout
+
+    def _failed(self, error: BaseException) -> None:
+        if isinstance(error, Rejected):
+            # Local backpressure says nothing about the model's health
+            self.rejected += 1
+            self.breaker.release()
+            return
+        if isinstance(error, TimeoutError):
+            self.timeouts += 1
+        else:
+            self.errors += 1
+        self.breaker.record_failure()
+
+    def _succeeded(self, started: float) -> None:
+        self.latency.add(time.monotonic() - started)
+        self.breaker.record_success()
+
+    # -- blocking path -------------------------------------------------
+    def complete(self, prompt: str) -> str:
+        timeout = self._admit()
+        started = time.monotonic()
+        try:
+            # The call's own deadline is visible to the layers below (scheduler queue)
+            with request_budget(timeout):
+                text = self._hedged(prompt, timeout)
+        except BaseException as e:
+            self._failed(e)
+            raise
+        self._succeeded(started)
+        return text
+
+    def _hedged(self, prompt: str, timeout: float | None) -> str:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def left():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        context = contextvars.copy_context()
+        pending = {self._executor.submit(context.run, self.explainer.complete, prompt)}
+        first = next(iter(pending))
+        delay = self._hedge_delay(timeout)
+        if delay is not None:
+            done, pending = wait(pending, timeout=delay)
+            if not done:
+                self.hedges += 1
+                pending.add(self._executor.submit(context.copy().run, self.explainer.complete, prompt))
+            else:
+                pending = done
+        while pending:
+            done, pending = wait(pending, timeout=left(), return_when=FIRST_COMPLETED)
+            if not done:
+                done, pending = wait(pending, timeout=_GRACE, return_when=FIRST_COMPLETED)
+            if not done:
+                raise _exceeded("AI call", timeout)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self.hedge_wins += 1
+                    return future.result()
+        return first.result()
+
+    # -- async path ----------------------------------------------------
+    async def acomplete(self, prompt: str) -> str:
+        timeout = self._admit()
+        started = time.monotonic()
+        try:
+            with request_budget(timeout):
+                text = await _within(self._ahedged(prompt, timeout), timeout, _exceeded("AI call", timeout))
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except BaseException as e:
+            self._failed(e)
+            raise
+        self._succeeded(started)
+        return text
+
+    async def _ahedged(self, prompt: str, timeout: float | None) -> str:
+        first = asyncio.ensure_future(self.explainer.acomplete(prompt))
+        tasks = {first}
+        try:
+            delay = self._hedge_delay(timeout)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(self.explainer.acomplete(prompt)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+            return first.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # -- streaming -----------------------------------------------------
+    def complete_stream(self, prompt: str):
+        # Blocking streams cannot be interrupted mid-chunk; only the breaker applies
+        self._admit()
+        started = time.monotonic()
+        try:
+            yield from self.explainer.complete_stream(prompt)
+        except GeneratorExit:
+            self.breaker.release()
+            raise
+        except BaseException as e:
+            self._failed(e)
+            raise
+        self._succeeded(started)
+
+    async def acomplete_stream(self, prompt: str):
+        timeout = self._admit()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        stream = self.explainer.acomplete_stream(prompt)
+        try:
+            while True:
+                left = None if deadline is None else deadline - time.monotonic()
+                try:
+                    chunk = await _within(anext(stream), left, _exceeded("AI stream", timeout))
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except (GeneratorExit, asyncio.CancelledError):
+            self.breaker.release()
+            raise
+        except BaseException as e:
+            self._failed(e)
+            raise
+        finally:
+            await stream.aclose()
+        self._succeeded(started)
+
+    # -- fallbacks -----------------------------------------------------
+    def fallback_content(self, prompt: str, error: Exception) -> str:
+        return self.fallback.generate_content(prompt)
+
+    def fallback_explanation(self, phone, target, lens, settings, error: Exception) -> str:
+        return self.fallback.explain(phone, target, lens, settings)
+
+    def stats(self) -> dict:
+        return {
+            **self.breaker.stats(),
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_latency_sec": self.latency.percentile(0.95)
+        }
@@ -0,0 +1,441 @@
+"""
+Shares the model quota between everything that calls it.
+
+Calls wait in one priority queue per process (interactive requests first,
+then batch, then precompute jobs) and are let through when a concurrency
+slot is free and the token buckets allow it: one bucket for requests per
+minute, one for estimated tokens per minute. When the queue is full the call
+is refused at once (QueueFull), so the caller falls back instead of piling up.
+
+With a shared state file the buckets are kept in that file under an
+exclusive lock, so all API and Streamlit workers on a machine draw on the
+same quota (POSIX only).
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from backend.ai.base import ExplainerWrapper
+from backend.ai.resilience import LatencyWindow, Rejected, remaining_budget
+
+try:
+    import fcntl
+except ImportError:  # Windows: no shared buckets
+    fcntl = None
+
+# Priorities, most urgent first
+INTERACTIVE = 0
+BATCH = 1
+PRECOMPUTE = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", PRECOMPUTE: "precompute"}
+
+_priority = contextvars.ContextVar("ai_priority", default=INTERACTIVE)
+_shared = contextvars.ContextVar("ai_shared_priority", default=None)
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Queue priority for the AI calls made inside the block.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    shared = _shared.get()
+    return _priority.get() if shared is None else shared.level
+
+
+class SharedPriority:
+    """
+    The priority of one call made for several callers (a coalesced call):
+    the most urgent of theirs. A caller joining later raises it, and the
+    call's queue entries move up while they still wait for a slot.
+    """
+
+    def __init__(self, level: int | None = None):
+        self.level = current_priority() if level is None else level
+        self._lock = threading.Lock()
+        self._queued = []
+
+    def join(self, level: int | None = None) -> None:
+        level = current_priority() if level is None else level
+        with self._lock:
+            if level >= self.level:
+                return
+            self.level = level
+            queued = list(self._queued)
+        for scheduler, waiter in queued:
+            scheduler._promote(waiter, level)
+
+    def _track(self, scheduler, waiter) -> None:
+        with self._lock:
+            self._queued.append((scheduler, waiter))
+            level = self.level
+        # Raised between reading the level and getting here
+        if level < waiter.priority:
+            scheduler._promote(waiter, level)
+
+    @contextmanager
+    def applied(self):
+        """
+        AI calls made inside the block (tasks started in it included) queue at this priority.
+        """
+        token = _shared.set(self)
+        try:
+            yield
+        finally:
+            _shared.reset(token)
+
+
+def estimate_tokens(prompt: str, output_tokens: int = 0) -> int:
+    # About 4 characters per token for English text
+    return len(prompt) // 4 + 1 + output_tokens
+
+
+class QueueFull(Rejected):
+    pass
+
+
+class QueueTimeout(Rejected):
+    pass
+
+
+class TokenBucket:
+    """
+    `rate` units per second, holding at most `capacity`. rate <= 0 = unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.level = self.capacity
+        self.updated = None
+
+    def refill(self, now: float) -> None:
+        if self.updated is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until `amount` is available (0 = now). Assumes refill() was called.
+        """
+        if self.rate <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.rate > 0:
+            self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets, taken together.
+    Buckets hold `burst_seconds` worth of quota.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 burst_seconds: float = 10.0):
+        self.requests = TokenBucket(requests_per_minute / 60.0, requests_per_minute / 60.0 * burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 60.0 * burst_seconds)
+
+    def _reserve(self, tokens: int, now: float) -> float:
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait == 0:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        return wait
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Takes quota for one call of `tokens` and returns 0, or returns the
+        seconds to wait before trying again (nothing taken).
+        """
+        return self._reserve(tokens, time.monotonic())
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket levels live in a file, locked with flock on
+    every reservation, so several processes share one quota.
+    """
+
+    def __init__(self, path: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 burst_seconds: float = 10.0):
+        if fcntl is None:
+            raise RuntimeError("Shared rate limits need fcntl (POSIX)")
+        super().__init__(requests_per_minute, tokens_per_minute, burst_seconds)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def reserve(self, tokens: int) -> float:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            raw = os.pread(self._fd, 4096, 0)
+            state = json.loads(raw) if raw.strip() else {}
+            # Wall clock: monotonic clocks are not comparable between processes
+            now = time.time()
+            for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                bucket.level = state.get(name, bucket.capacity)
+                bucket.updated = state.get("updated")
+            wait = self._reserve(tokens, now)
+            data = json.dumps({"requests": self.requests.level, "tokens": self.tokens.level, "updated": now}).encode()
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, data, 0)
+            return wait
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class _Waiter:
+    __slots__ = ("tokens", "priority", "wake", "enqueued", "granted", "cancelled")
+
+    def __init__(self, tokens: int, priority: int, wake):
+        self.tokens = tokens
+        self.priority = priority
+        self.wake = wake
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    Priority queue in front of the model, for threads and event loops alike.
+
+    A call waits until it is at the head of the queue, a concurrency slot is
+    free and the rate limiter has quota; within a priority, calls go in
+    arrival order. Waits are bounded by the current request budget.
+    """
+
+    def __init__(self, max_concurrency: int = 16, max_queue: int = 256, limiter: RateLimiter | None = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.limiter = limiter or RateLimiter()
+        self.active = 0
+        self.queued = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._dispatching = False
+        self._timer = None
+        self.waits = LatencyWindow(1000)
+        self.admitted = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self.max_wait = 0.0
+
+    # -- queue ---------------------------------------------------------
+    def _enqueue(self, tokens: int, wake) -> _Waiter:
+        waiter = _Waiter(tokens, current_priority(), wake)
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"AI queue full ({self.max_queue} waiting)")
+            heapq.heappush(self._heap, (waiter.priority, next(self._sequence), waiter))
+            self.queued += 1
+        shared = _shared.get()
+        if shared is not None:
+            shared._track(self, waiter)
+        self._dispatch()
+        return waiter
+
+    def _promote(self, waiter: _Waiter, level: int) -> None:
+        # The entry at the old priority stays behind; _next skips it once granted
+        with self._lock:
+            if waiter.granted or waiter.cancelled or level >= waiter.priority:
+                return
+            waiter.priority = level
+            heapq.heappush(self._heap, (level, next(self._sequence), waiter))
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        Admits waiters while a slot is free and the limiter has quota. Called
+        without the lock: the limiter (flock and file I/O when it is shared
+        between processes) is asked outside it, by one dispatcher at a time;
+        whoever is dispatching keeps going until nothing more can be admitted.
+        """
+        while True:
+            with self._lock:
+                if self._dispatching:
+                    return
+                waiter = self._next()
+                if waiter is None:
+                    return
+                self._dispatching = True
+            try:
+                wait = self.limiter.reserve(waiter.tokens)
+            except BaseException:
+                with self._lock:
+                    self._dispatching = False
+                raise
+            with self._lock:
+                self._dispatching = False
+                if wait > 0:
+                    self._retry_in(wait)
+                    return
+                # Slots only free up meanwhile; a waiter that gave up meanwhile
+                # just leaves its quota unused
+                if not waiter.cancelled:
+                    self._grant(waiter)
+
+    def _next(self) -> _Waiter | None:
+        # Called with the lock held: the first waiter still queued, if a slot is free
+        while self._heap and self.active < self.max_concurrency:
+            waiter = self._heap[0][2]
+            if not (waiter.cancelled or waiter.granted):
+                return waiter
+            heapq.heappop(self._heap)
+        return None
+
+    def _grant(self, waiter: _Waiter) -> None:
+        # Called with the lock held. The waiter may no longer be at the head
+        # (a more urgent call arrived during the reservation); _next skips it
+        waiter.granted = True
+        self.queued -= 1
+        self.active += 1
+        self.admitted += 1
+        waited = time.monotonic() - waiter.enqueued
+        self.waits.add(waited)
+        self.max_wait = max(self.max_wait, waited)
+        waiter.wake()
+
+    def _retry_in(self, seconds: float) -> None:
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(seconds, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self._dispatch()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """
+        The caller stopped waiting; gives the slot back if it raced with a grant.
+        """
+        with self._lock:
+            waiter.cancelled = True
+            if waiter.granted:
+                self.active -= 1
+            else:
+                self.queued -= 1
+                self.abandoned += 1
+        self._dispatch()
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+        self._dispatch()
+
+    # -- blocking callers ----------------------------------------------
+    def acquire(self, tokens: int = 0) -> None:
+        event = threading.Event()
+        waiter = self._enqueue(tokens, event.set)
+        if not event.wait(remaining_budget()):
+            self._abandon(waiter)
+            raise QueueTimeout("Timed out waiting in the AI queue")
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # -- async callers -------------------------------------------------
+    async def aacquire(self, tokens: int = 0) -> None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(tokens, wake)
+        try:
+            await asyncio.wait_for(future, remaining_budget())
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            raise QueueTimeout("Timed out waiting in the AI queue") from None
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0):
+        await self.aacquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _, waiter in self._heap:
+                # level != waiter.priority: left behind when the waiter was promoted
+                if not (waiter.cancelled or waiter.granted) and level == waiter.priority:
+                    depth[PRIORITY_NAMES.get(level, str(level))] += 1
+        return {
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "p50_wait_sec": self.waits.percentile(0.5),
+            "p95_wait_sec": self.waits.percentile(0.95),
+            "max_wait_sec": round(self.max_wait, 3)
+        }
+
+
+class ScheduledExplainer(ExplainerWrapper):
+    """
+    Runs every upstream call (streams included) inside a scheduler slot.
+    """
+
+    def __init__(self, explainer, scheduler: Scheduler, output_tokens: int = 0):
+        super().__init__(explainer)
+        self.scheduler = scheduler
+        self.output_tokens = output_tokens
+
+    def _tokens(self, prompt: str) -> int:
+        return estimate_tokens(prompt, self.output_tokens)
+
+    def complete(self, prompt: str) -> str:
+        with self.scheduler.slot(self._tokens(prompt)):
+            return self.explainer.complete(prompt)
+
+    async def acomplete(self, prompt: str) -> str:
+        async with self.scheduler.aslot(self._tokens(prompt)):
+            return await self.explainer.acomplete(prompt)
+
+    def complete_stream(self, prompt: str):
+        with self.scheduler.slot(self._tokens(prompt)):
+            yield from self.explainer.complete_stream(prompt)
+
+    async def acomplete_stream(self, prompt: str):
+        async with self.scheduler.aslot(self._tokens(prompt)):
+            async for chunk in self.explainer.acomplete_stream(prompt):
+                yield chunk
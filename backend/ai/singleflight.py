@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from concurrent.futures import Future, wait
+
+from backend.ai.base import ExplainerWrapper
+from backend.ai.cache import cache_key
+from backend.ai.resilience import DeadlineExceeded, remaining_budget
+from backend.ai.scheduler import SharedPriority
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, priority: SharedPriority):
+        self.task = task
+        self.priority = priority
+        self.waiters = 0
+
+
+def _result(future: Future, timeout: float | None):
+    # Unlike future.result(timeout), a TimeoutError raised by the call itself is not mistaken for ours
+    done, _ = wait([future], timeout)
+    if not done:
+        raise DeadlineExceeded("Request budget exhausted")
+    return future.result()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call.
+    Every caller gets the leader's result, or its exception.
+
+    The call queues at the most urgent priority among its callers: an
+    interactive request joining a batch call moves it up. It runs under the
+    leader's request budget; a later caller stops waiting at its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._flights = {}
+        self.upstream_calls = 0
+        self.shared_calls = 0
+
+    def do(self, key: str, fn):
+        """
+        Thread-based path: the first caller runs fn, later callers block on its result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = (Future(), SharedPriority())
+                self.upstream_calls += 1
+            else:
+                self.shared_calls += 1
+        future, priority = call
+
+        if not leader:
+            priority.join()
+            return _result(future, remaining_budget())
+
+        try:
+            with priority.applied():
+                result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    async def ado(self, key: str, coro_fn):
+        """
+        Asyncio path: the upstream call runs as a task shared by all waiters on
+        the same event loop. A cancelled waiter only stops waiting; the task is
+        cancelled once nobody is left waiting for it.
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                priority = SharedPriority()
+                # The task copies this context: its calls queue at the shared priority
+                with priority.applied():
+                    flight = _Flight(asyncio.ensure_future(coro_fn()), priority)
+                self._flights[flight_key] = flight
+                flight.task.add_done_callback(
+                    lambda task: self._forget(flight_key, flight)
+                )
+                self.upstream_calls += 1
+            else:
+                self.shared_calls += 1
+            flight.waiters += 1
+
+        try:
+            if leader:
+                return await asyncio.shield(flight.task)
+            flight.priority.join()
+            done, _ = await asyncio.wait({flight.task}, timeout=remaining_budget())
+            if not done:
+                raise DeadlineExceeded("Request budget exhausted")
+            return flight.task.result()
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _forget(self, flight_key, flight: _Flight):
+        with self._lock:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved when every waiter was cancelled
+            flight.task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "shared_calls": self.shared_calls,
+            "in_flight": len(self._calls) + len(self._flights)
+        }
+
+
+class CoalescingExplainer(ExplainerWrapper):
+    """
+    Shares one upstream model call between concurrent identical prompts.
+    Streams are passed through: each stream is its own upstream call.
+    """
+
+    def __init__(self, explainer, single_flight: SingleFlight):
+        super().__init__(explainer)
+        self.single_flight = single_flight
+
+    def complete(self, prompt: str) -> str:
+        key = cache_key(self.model_name, prompt)
+        return self.single_flight.do(key, lambda: self.explainer.complete(prompt))
+
+    async def acomplete(self, prompt: str) -> str:
+        key = cache_key(self.model_name, prompt)
+        return await self.single_flight.ado(key, lambda: self.explainer.acomplete(prompt))
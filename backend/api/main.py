@@ -1,17 +1,53 @@
-from fastapi import FastAPI
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Annotated
+
+from fastapi import FastAPI, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from backend.ai.base import track_fallbacks
+from backend.ai.factory import AI_CACHE, AI_PACK_PROMPTS, ai_stats, get_cache_backend
+from backend.ai.resilience import request_budget
+from backend.ai.scheduler import BATCH, priority
+from backend.utils.prompt_loader import prompts
+from backend.utils.result_cache import RESULT_CACHE, build_result_cache
+from backend.utils.tracing import METRICS, SamplingProfiler, record_error, render_metrics, span, trace, traced
 
 # Import engines
-from backend.engines.phone_specs import get_phone_specs
+from backend.engines.phone_specs import catalog
 from backend.engines.target_classifier import classify_target
-from backend.engines.lens_selector import select_lens
-from backend.engines.decision_engine import decide_settings
-from backend.engines.ai_explainer import explain_decision, explain_direction
-from backend.engines.ai_direction import get_ai_direction
-from backend.engines.direction_engine import get_direction_data
+from backend.engines.target_resolver import target_id, target_name
+from backend.engines.decision_engine import recommend_exposure
+from backend.engines.ai_explainer import explain_decision, aexplain_direction, aexplain_directions_packed, astream_direction
+from backend.engines.ai_direction import aget_ai_direction, astream_ai_direction
+from backend.engines.direction_engine import get_direction_data, describe_direction
+from backend.engines.ephemeris import BODIES, DEFAULT_TWILIGHT, MAX_PLAN_HOURS, TWILIGHT
+from backend.warmup import warm_up
+
+logger = logging.getLogger(__name__)
+
+# APP_WARMUP: "on" loads the phone catalog, target index, NumPy and the Gemini SDK
+# before the server accepts traffic; "off" (default) loads each on first use
+APP_WARMUP = os.getenv("APP_WARMUP", "off").lower() == "on"
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    if APP_WARMUP:
+        timings = await asyncio.to_thread(warm_up)
+        logger.info("Warm-up done (ms): %s", timings)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ------------------------------------------------------------------
 # 🔓 CORS Configuration (Required for Deployment)
@@ -25,6 +61,67 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# ------------------------------------------------------------------
+# ⏱️ Request Tracing
+# ------------------------------------------------------------------
+# Per-stage timings are always kept for GET /metrics (METRICS=off disables them).
+# SERVER_TIMING: "on" (default) lets a request send `X-Trace: 1` to get its stage
+# timings back in a Server-Timing header
+# PROFILING: "on" lets a request send `X-Profile: 1` to sample the server's stack
+# while it runs; the collapsed stacks are written to PROFILE_DIR and the file
+# name is returned in an X-Profile header (development only)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "on").lower() != "off"
+PROFILING = os.getenv("PROFILING", "off").lower() == "on"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+
+class TracingMiddleware:
+    """
+    Times each request as a "request" span (by route) and, when asked for,
+    collects its spans into a Server-Timing header or profiles it.
+    Plain ASGI, so streamed responses pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        timing = SERVER_TIMING and headers.get(b"x-trace") == b"1"
+        profiler = None
+        if PROFILING and headers.get(b"x-profile") == b"1":
+            profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000.0).start()
+
+        with trace() if timing else nullcontext() as request_trace:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    extra = []
+                    if request_trace is not None:
+                        extra.append((b"server-timing", request_trace.server_timing().encode("latin-1")))
+                    if profiler is not None:
+                        path = profiler.stop().write(PROFILE_DIR)
+                        extra.append((b"x-profile", path.name.encode("latin-1")))
+                    if extra:
+                        message = {**message, "headers": [*message.get("headers", []), *extra]}
+                await send(message)
+
+            with span("request", method=scope["method"]) as request_span:
+                try:
+                    await self.app(scope, receive, send_with_headers)
+                finally:
+                    route = scope.get("route")
+                    request_span.tag(route=getattr(route, "path", "unmatched"))
+                    if profiler is not None:
+                        profiler.stop()
+
+
+if METRICS or SERVER_TIMING or PROFILING:
+    app.add_middleware(TracingMiddleware)
+
 
 # ------------------------------------------------------------------
 # 🏠 Root Endpoint
@@ -40,49 +137,500 @@ def root():
 class AnalyzeRequest(BaseModel):
     phone_name: str
     target: str
+    # Optional observer location/time: enables locally computed directions
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+    time: datetime | None = None
+    # Ask the AI for directions (default: only when they can't be computed)
+    ai_direction: bool | None = None
+
+    def location(self) -> str | None:
+        if self.latitude is None or self.longitude is None:
+            return None
+        return f"{self.latitude:.2f}, {self.longitude:.2f}"
+
+
+class PlanLocation(BaseModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class PlanRequest(BaseModel):
+    target: str
+    locations: list[PlanLocation] = Field(min_length=1, max_length=10000)
+    # Defaults to local noon before now at the first location (covers tonight)
+    start: datetime | None = None
+    hours: float = Field(default=24, gt=0, le=MAX_PLAN_HOURS)
+    step_minutes: float = Field(default=1, ge=1, le=60)
+    min_altitude: float = Field(default=15, ge=-5, le=90)
+    # Per-location window lists; off for big "tonight's sky" grids
+    windows: bool = True
 
 
 # ------------------------------------------------------------------
 # 🔭 Analyze Endpoint
 # ------------------------------------------------------------------
+# ANALYZE_AI_BUDGET: total seconds the AI calls of one analysis may take;
+# past it, the remaining texts fall back instead of holding the response
+ANALYZE_AI_BUDGET = float(os.getenv("ANALYZE_AI_BUDGET", "25"))
+
+
 @app.post("/analyze")
-def analyze(data: AnalyzeRequest):
-    # 1. Get AI Direction (pure AI)
-    ai_direction = get_ai_direction(data.target)
+async def analyze(data: AnalyzeRequest):
+    result, _ = await cached_analysis(data, catalog.current)
+    return result
+
+
+def prepare_analysis(data: AnalyzeRequest, snapshot) -> dict:
+    """
+    The deterministic steps (milliseconds): specs, lens, settings and direction data.
+    A phone not in the catalog is not an error: it gets the generic defaults.
+    """
+    # 7. Get Direction Data first: computed locally (ephemeris) when a location
+    # is given, which makes the AI direction call in step 1 optional
+    with span("direction_data"):
+        direction_data = get_direction_data(data.target, data.latitude, data.longitude, data.time)
+    use_ai_direction = data.ai_direction
+    if use_ai_direction is None:
+        use_ai_direction = "ephemeris" not in direction_data
 
     # 2. Get Phone Specs
-    try:
-        phone = get_phone_specs(data.phone_name.strip())
-    except ValueError as e:
-        return {"error": str(e)}
+    with span("phone_specs"):
+        phone_key = snapshot.index.resolve(data.phone_name.strip())
+        phone = snapshot.phones[phone_key] if phone_key is not None else None
 
     # 3. Classify Target
-    target_type = classify_target(data.target.strip())
-
-    # 4. Select Lens
-    lens = select_lens(phone, target_type)
+    with span("classify_target"):
+        target_type = classify_target(data.target.strip())
 
-    # 5. Decide Settings
-    settings = decide_settings(phone, target_type, lens)
+    # 4 + 5. Select Lens and Decide Settings: precomputed for every catalog phone
+    with span("lens_settings"):
+        lens, settings = snapshot.decisions.get(phone_key, target_type)
 
     # 6. Generate Explanation (Hybrid AI/Logic)
-    explanation = explain_decision(phone, data.target, lens, settings)
-
-    # 7. Get Static Direction Data
-    direction_data = get_direction_data(data.target)
-
-    # 8. Generate Direction Explanation (AI)
-    direction_explanation = explain_direction(data.target, direction_data)
+    with span("explanation"):
+        explanation = explain_decision(phone, data.target, lens, settings)
 
     return {
         "phone": data.phone_name,
         "target": data.target,
+        "target_id": target_id(data.target),
         "lens": lens,
         "settings": settings,
+        "exposure": recommend_exposure(phone, lens, target_type),
+        "direction_data": direction_data,
+        "use_ai_direction": use_ai_direction,
+        "explanation": explanation,
+        "catalog_version": snapshot.version
+    }
+
+
+def ephemeris_direction(data: AnalyzeRequest, direction_data: dict) -> dict:
+    return {
+        "source": "ephemeris",
+        "explanation": describe_direction(data.target, direction_data)
+    }
+
+
+async def run_analysis(data: AnalyzeRequest, snapshot) -> dict:
+    """
+    The full analyze pipeline against one catalog snapshot.
+    """
+    prepared = prepare_analysis(data, snapshot)
+    direction_data = prepared.pop("direction_data")
+
+    # 1 + 8. AI Direction (pure AI) and Direction Explanation (AI), concurrently.
+    # Prompts use the canonical name, so "the moon" and "Moon" share cached answers
+    name = target_name(data.target)
+    use_ai_direction = prepared.pop("use_ai_direction")
+    with request_budget(ANALYZE_AI_BUDGET):
+        if AI_PACK_PROMPTS:
+            # One packed model call for both texts (AI_PACK_PROMPTS)
+            ai_direction, direction_explanation = await traced("ai_packed", aexplain_directions_packed(
+                name, direction_data, data.location(), use_ai_direction
+            ))
+            if ai_direction is None:
+                ai_direction = ephemeris_direction(data, direction_data)
+        elif use_ai_direction:
+            ai_direction, direction_explanation = await asyncio.gather(
+                traced("ai_direction", aget_ai_direction(name, data.location())),
+                traced("direction_explanation", aexplain_direction(name, direction_data))
+            )
+        else:
+            direction_explanation = await traced("direction_explanation", aexplain_direction(name, direction_data))
+            ai_direction = ephemeris_direction(data, direction_data)
+
+    return {
+        "phone": prepared["phone"],
+        "target": prepared["target"],
+        "target_id": prepared["target_id"],
+        "lens": prepared["lens"],
+        "settings": prepared["settings"],
+        "exposure": prepared["exposure"],
         "direction_ai": ai_direction,
         "direction": {
             "data": direction_data,
             "explanation": direction_explanation
         },
-        "explanation": explanation
+        "explanation": prepared["explanation"],
+        "catalog_version": prepared["catalog_version"]
+    }
+
+
+# ------------------------------------------------------------------
+# 🗄️ Result Cache (RESULT_CACHE=sqlite shares it between workers)
+# ------------------------------------------------------------------
+analysis_cache = build_result_cache("analyze")
+
+
+def canonical_request(data: AnalyzeRequest, snapshot) -> dict:
+    """
+    Everything an analysis depends on, in canonical form: the catalog key the
+    phone resolves to (get_phone_specs' lookup), the target's canonical id
+    (the resolver classify_target uses), the catalog and prompt versions and
+    the optional location, time and AI flag. "s24 ultra" / "Galaxy S24 Ultra"
+    and "M31" / "Andromeda" canonicalize to the same request.
+    """
+    phone_name = data.phone_name.strip()
+    phone_key = snapshot.index.resolve(phone_name)
+    return {
+        "phone": phone_key or phone_name.lower(),
+        "target": target_id(data.target),
+        "latitude": data.latitude,
+        "longitude": data.longitude,
+        "time": data.time.isoformat() if data.time is not None else None,
+        "ai_direction": data.ai_direction,
+        "catalog_version": snapshot.version,
+        "prompt_version": prompts.version(),
+        "packed": AI_PACK_PROMPTS
+    }
+
+
+def result_key(data: AnalyzeRequest, snapshot) -> str | None:
+    """
+    Stable cache key for a full analysis: a hash of canonical_request().
+    None when the answer depends on the current time (a location without a time).
+    """
+    if data.latitude is not None and data.longitude is not None and data.time is None:
+        return None
+    canonical = json.dumps(canonical_request(data, snapshot), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def cached_analysis(data: AnalyzeRequest, snapshot) -> tuple:
+    """
+    run_analysis through the result cache: (result, complete). Results that
+    hold fallback text (the model failed or timed out) are not complete, and
+    are not cached.
+    """
+    key = result_key(data, snapshot)
+    if key is not None:
+        with span("result_cache") as lookup:
+            result = await analysis_cache.aget(key)
+            lookup.tag(cache="miss" if result is None else "hit")
+        if result is not None:
+            # Other spellings share the entry; echo this request's own
+            return {**result, "phone": data.phone_name, "target": data.target}, True
+
+    with track_fallbacks() as fallbacks:
+        result = await run_analysis(data, snapshot)
+    complete = not fallbacks.used
+    if key is not None and complete:
+        await analysis_cache.aset(key, jsonable_encoder(result))
+    return result, complete
+
+
+# ------------------------------------------------------------------
+# 📖 Cacheable Guide Endpoint (GET, for browsers, CDNs and proxies)
+# ------------------------------------------------------------------
+# GUIDE_MAX_AGE: seconds a GET /guide response may be reused without asking again
+GUIDE_MAX_AGE = int(os.getenv("GUIDE_MAX_AGE", "3600"))
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@app.get("/guide/{phone}/{target}")
+async def guide(phone: str, target: str, request: Request):
+    """
+    The /analyze result for a phone and target (no location), cacheable:
+    other spellings redirect to the canonical URL (catalog phone name,
+    canonical target name), and responses carry a strong ETag (a hash of
+    the body) and Cache-Control; If-None-Match with the current ETag gets a
+    304. Incomplete results (fallback text) are sent with no-store.
+    """
+    snapshot = catalog.current
+    phone_key = snapshot.index.resolve(phone.strip())
+    canonical = (phone_key or phone.strip(), target_name(target))
+    cache_control = f"public, max-age={GUIDE_MAX_AGE}"
+    if canonical != (phone, target):
+        return RedirectResponse(
+            app.url_path_for("guide", phone=canonical[0], target=canonical[1]),
+            status_code=301, headers={"Cache-Control": cache_control}
+        )
+
+    result, complete = await cached_analysis(AnalyzeRequest(phone_name=phone, target=target), snapshot)
+    body = json.dumps(jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if not complete:
+        return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+    headers = {"ETag": f'"{hashlib.sha256(body).hexdigest()[:32]}"', "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# ------------------------------------------------------------------
+# 📦 Batch Analyze Endpoint
+# ------------------------------------------------------------------
+# ANALYZE_BATCH_CONCURRENCY: unique combinations analyzed at once per batch
+# ANALYZE_BATCH_MAX_ITEMS: max items accepted in one batch
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "8"))
+ANALYZE_BATCH_MAX_ITEMS = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", "500"))
+
+
+class BatchAnalyzeRequest(BaseModel):
+    items: list[AnalyzeRequest] = Field(min_length=1, max_length=ANALYZE_BATCH_MAX_ITEMS)
+
+
+def batch_key(data: AnalyzeRequest, snapshot) -> tuple:
+    """
+    Items with the same key get the same answer: the canonical request (see
+    canonical_request), so "s24 ultra" / "Galaxy S24 Ultra" and "M31" /
+    "Andromeda" share one.
+    """
+    return tuple(canonical_request(data, snapshot).values())
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(data: BatchAnalyzeRequest):
+    """
+    Analyzes many phone x target pairs, streamed back as NDJSON in completion
+    order: one {"index", "result"} or {"index", "error"} line per input item,
+    then a {"done": true, ...} summary line.
+    """
+    snapshot = catalog.current
+
+    groups = {}
+    for index, item in enumerate(data.items):
+        groups.setdefault(batch_key(item, snapshot), []).append(index)
+
+    semaphore = asyncio.Semaphore(ANALYZE_BATCH_CONCURRENCY)
+
+    async def run(indexes):
+        # Batch AI calls queue behind interactive /analyze requests
+        with priority(BATCH):
+            async with semaphore:
+                try:
+                    result, _ = await cached_analysis(data.items[indexes[0]], snapshot)
+                    return indexes, result, None
+                except Exception as e:
+                    record_error("analyze_batch", e)
+                    return indexes, None, str(e)
+
+    async def lines():
+        tasks = [asyncio.create_task(run(indexes)) for indexes in groups.values()]
+        errors = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indexes, result, error = await finished
+                for index in indexes:
+                    if error is not None:
+                        errors += 1
+                        line = {"index": index, "error": error}
+                    else:
+                        item = data.items[index]
+                        line = {"index": index, "result": {**result, "phone": item.phone_name, "target": item.target}}
+                    yield json.dumps(jsonable_encoder(line), ensure_ascii=False) + "\n"
+            yield json.dumps({
+                "done": True,
+                "items": len(data.items),
+                "unique": len(groups),
+                "errors": errors,
+                "catalog_version": snapshot.version
+            }) + "\n"
+        finally:
+            # Client went away: stop the remaining analyses
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# ------------------------------------------------------------------
+# 📡 Streaming Analyze Endpoint (Server-Sent Events)
+# ------------------------------------------------------------------
+def sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(payload), ensure_ascii=False)}\n\n"
+
+
+async def analysis_events(data: AnalyzeRequest, snapshot):
+    """
+    Events, in order:
+      settings - lens, settings, explanation and direction data (no AI wait)
+      delta    - {"field": "direction_ai" | "direction", "text": chunk}, as generated
+      done     - the complete /analyze response
+    """
+    prepared = prepare_analysis(data, snapshot)
+    direction_data = prepared.pop("direction_data")
+    use_ai_direction = prepared.pop("use_ai_direction")
+    yield sse("settings", {**prepared, "direction": {"data": direction_data}})
+
+    name = target_name(data.target)
+    streams = {"direction": astream_direction(name, direction_data)}
+    if use_ai_direction:
+        streams["direction_ai"] = astream_ai_direction(name, data.location())
+    else:
+        ai_direction = ephemeris_direction(data, direction_data)
+        yield sse("delta", {"field": "direction_ai", "text": ai_direction["explanation"]})
+
+    # Both texts are generated concurrently; chunks are sent as they arrive
+    queue = asyncio.Queue()
+
+    async def pump(field, stream):
+        try:
+            async for chunk in stream:
+                await queue.put((field, chunk))
+        finally:
+            await queue.put((field, None))
+
+    # Tasks copy the context when created, so the budget applies to both streams
+    with request_budget(ANALYZE_AI_BUDGET):
+        tasks = [asyncio.create_task(pump(field, stream)) for field, stream in streams.items()]
+    texts = {field: [] for field in streams}
+    try:
+        remaining = len(tasks)
+        while remaining:
+            field, chunk = await queue.get()
+            if chunk is None:
+                remaining -= 1
+                continue
+            texts[field].append(chunk)
+            yield sse("delta", {"field": field, "text": chunk})
+    finally:
+        # Client went away: stop generating
+        for task in tasks:
+            task.cancel()
+
+    if use_ai_direction:
+        ai_direction = {"source": "ai_estimated", "explanation": "".join(texts["direction_ai"]).strip()}
+    yield sse("done", {
+        "phone": prepared["phone"],
+        "target": prepared["target"],
+        "target_id": prepared["target_id"],
+        "lens": prepared["lens"],
+        "settings": prepared["settings"],
+        "exposure": prepared["exposure"],
+        "direction_ai": ai_direction,
+        "direction": {
+            "data": direction_data,
+            "explanation": "".join(texts["direction"]).strip()
+        },
+        "explanation": prepared["explanation"],
+        "catalog_version": prepared["catalog_version"]
+    })
+
+
+def event_stream(data: AnalyzeRequest) -> StreamingResponse:
+    return StreamingResponse(
+        analysis_events(data, catalog.current),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/analyze/stream")
+async def analyze_stream_get(data: Annotated[AnalyzeRequest, Query()]):
+    return event_stream(data)
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(data: AnalyzeRequest):
+    return event_stream(data)
+
+
+# ------------------------------------------------------------------
+# 🗓️ Sky Planner Endpoint
+# ------------------------------------------------------------------
+# Max (locations x time samples) evaluated per request
+MAX_PLAN_SAMPLES = 50_000_000
+
+
+@app.post("/plan")
+def plan(data: PlanRequest):
+    target = target_id(data.target)
+    if target not in BODIES:
+        return {"error": f"No ephemeris for {data.target}"}
+
+    samples = len(data.locations) * (int(data.hours * 60 / data.step_minutes) + 1)
+    if samples > MAX_PLAN_SAMPLES:
+        return {"error": "Plan too large: use fewer locations, fewer hours or a larger step"}
+
+    # Imported here: NumPy is only needed once someone plans
+    from backend.engines.sky_planner import night_start, plan_grid
+
+    first = data.locations[0]
+    limit = TWILIGHT.get(target, DEFAULT_TWILIGHT)
+    start = data.start or night_start(first.latitude, first.longitude, limit=limit)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    plans = plan_grid(
+        target,
+        [location.latitude for location in data.locations],
+        [location.longitude for location in data.locations],
+        start, data.hours, data.step_minutes, data.min_altitude, data.windows
+    )
+    return {
+        "target": target,
+        "start": start.isoformat(timespec="minutes"),
+        "hours": data.hours,
+        "step_minutes": data.step_minutes,
+        "locations": plans
+    }
+
+
+# ------------------------------------------------------------------
+# 📚 Phone Catalog Info
+# ------------------------------------------------------------------
+@app.get("/catalog")
+def catalog_info():
+    return catalog.stats()
+
+
+# ------------------------------------------------------------------
+# 🚦 AI Queue & Health
+# ------------------------------------------------------------------
+@app.get("/ai/stats")
+def ai_info():
+    """
+    Queue depth and wait times, circuit breaker state, coalescing and cache counters.
+    """
+    return ai_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_info():
+    """
+    Per-stage latency histograms and error counts, Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+def cache_info():
+    """
+    Hit rates per cache and tier (memory, shared SQLite file). Counters are
+    this worker's; "entries" of a shared tier counts every worker's entries.
+    """
+    ai_cache = get_cache_backend()
+    return {
+        "analyze": {"mode": RESULT_CACHE, **(analysis_cache.stats() or {})},
+        "ai_responses": {"mode": AI_CACHE, **(ai_cache.stats() if ai_cache is not None else {})}
     }
@@ -0,0 +1,279 @@
+"""
+Microbenchmarks of the deterministic engines, with a stored baseline.
+
+Covers phone lookup (exact, substring and fuzzy/miss paths, on the real
+catalog and on synthetic 1k / 10k catalogs, bypassing the lookup LRU),
+classify_target, select_lens, decide_settings, get_direction_data, prompt
+rendering and the full non-LLM pipeline with a stub explainer.
+
+Each benchmark is timed --repeats times (each sample runs long enough to
+take about --min-time seconds). Compare mode (the default) fails (exit 1)
+when a benchmark's median is more than --threshold slower than the
+baseline AND a one-sided Mann-Whitney U test on the samples says the
+slowdown is significant (p < --alpha). Times are first scaled by a fixed
+reference workload timed in the same run, which absorbs most of the
+difference between a quiet and a busy machine; baselines are still best
+recorded (--update) on the machine that runs the check.
+
+    python -m backend.benchmarks.engines_bench
+    python -m backend.benchmarks.engines_bench --update
+    python -m backend.benchmarks.engines_bench --filter phone_specs
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from backend.ai.base import PromptExplainer
+from backend.engines.ai_explainer import explain_decision, explain_direction
+from backend.engines.decision_engine import decide_settings
+from backend.engines.decision_table import TARGET_TYPES
+from backend.engines.direction_engine import get_direction_data
+from backend.engines.lens_selector import select_lens
+from backend.engines.phone_index import PhoneIndex
+from backend.engines.phone_specs import DATA_PATH, catalog, get_phone_specs
+from backend.engines.target_classifier import classify_target
+from backend.utils.prompt_loader import render_prompt
+
+BASELINE_PATH = Path(__file__).resolve().parent / "engines_baseline.json"
+
+TARGETS = ["Moon", "the moon", "Jupiter", "Saturn", "M31", "Orion Nebula", "milky way core",
+           "perseids", "ISS", "Comet", "Sun", "Betelgeuse"]
+SYNTHETIC_SIZES = {"1k": 1_000, "10k": 10_000}
+SUFFIXES = ["", " Plus", " Pro", " Pro Max", " Ultra", " Lite", " FE", " Mini", " Fold", " Flip"]
+
+
+class StubExplainer(PromptExplainer):
+    """
+    Answers instantly, so the pipeline benchmark measures only our code.
+    """
+    model_name = "stub"
+
+    def complete(self, prompt: str) -> str:
+        return "Look south-east, about 40 degrees up, an hour after sunset."
+
+
+def synthetic_catalog(size: int, seed: int = 0) -> dict:
+    """
+    `size` phones named like real ones ("Galaxy X37 Pro"), all sharing the
+    first real phone's specs (the index only looks at names and brands).
+    """
+    real = json.loads(DATA_PATH.read_text(encoding="utf-8"))
+    template = next(iter(real.values()))
+    series = sorted({key.split()[0] for key in real})
+    rng = random.Random(seed)
+    phones = dict(real)
+    while len(phones) < size:
+        name = f"{rng.choice(series)} {rng.choice('ABCGKMNSXZ')}{rng.randint(1, 999)}{rng.choice(SUFFIXES)}"
+        phones.setdefault(name, {**template, "model": name})
+    return phones
+
+
+def lookup_queries(keys: list, seed: int = 0) -> dict:
+    """
+    Queries hitting each resolve() path: exact keys, lowercased substrings,
+    and typos / unknown names that fall through to fuzzy matching.
+    """
+    rng = random.Random(seed)
+    picks = rng.sample(keys, min(20, len(keys)))
+
+    def typo(name):
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:] + "x"
+
+    return {
+        "exact": picks,
+        "substring": [" ".join(key.lower().split()[-2:]) for key in picks],
+        "fuzzy_miss": [typo(key) for key in picks[:10]] + ["Nokia 3310", "Moto Razr 50", "my phone"] * 3,
+    }
+
+
+def build_benchmarks() -> dict:
+    """
+    name -> (function running one round, operations per round).
+    """
+    benchmarks = {}
+
+    catalogs = {"30": catalog.current.index}
+    for label, size in SYNTHETIC_SIZES.items():
+        catalogs[label] = PhoneIndex(synthetic_catalog(size))
+    for label, index in catalogs.items():
+        for path, queries in lookup_queries(index.keys).items():
+            # _resolve: the uncached lookup (resolve() adds an LRU in front)
+            benchmarks[f"phone_specs.{path}.{label}"] = (
+                lambda index=index, queries=queries: [index._resolve(query) for query in queries], len(queries)
+            )
+    cached = lookup_queries(catalog.current.index.keys)["substring"]
+    benchmarks["phone_specs.cached"] = (lambda: [get_phone_specs(query) for query in cached], len(cached))
+
+    benchmarks["classify_target"] = (lambda: [classify_target(target) for target in TARGETS], len(TARGETS))
+
+    phones = list(catalog.current.phones.values())
+    combos = [(phone, target_type) for phone in phones for target_type in TARGET_TYPES]
+    lenses = [(phone, target_type, select_lens(phone, target_type)) for phone, target_type in combos]
+    benchmarks["select_lens"] = (
+        lambda: [select_lens(phone, target_type) for phone, target_type in combos], len(combos)
+    )
+    benchmarks["decide_settings"] = (
+        lambda: [decide_settings(phone, target_type, lens) for phone, target_type, lens in lenses], len(lenses)
+    )
+
+    benchmarks["get_direction_data"] = (lambda: [get_direction_data(target) for target in TARGETS], len(TARGETS))
+    benchmarks["get_direction_data.ephemeris"] = (
+        lambda: [get_direction_data(target, 51.5, -0.13) for target in ("Moon", "Jupiter", "Saturn")], 3
+    )
+
+    direction = get_direction_data("Moon")
+    benchmarks["render_prompt"] = (
+        lambda: render_prompt(
+            "direction_prompt", target="Moon", look_direction=direction["look_direction"],
+            altitude=direction["altitude"], best_time=direction["best_time"], tip=direction["tip"]
+        ), 1
+    )
+
+    stub = StubExplainer()
+    requests = [(phone, target) for phone in ("Galaxy S24 Ultra", "iphone 17 pro", "Pixel 9") for target in TARGETS[:4]]
+
+    def pipeline():
+        for phone_name, target in requests:
+            phone = get_phone_specs(phone_name)
+            target_type = classify_target(target)
+            lens = select_lens(phone, target_type)
+            settings = decide_settings(phone, target_type, lens)
+            explain_decision(phone, target, lens, settings)
+            direction_data = get_direction_data(target)
+            explain_direction(target, direction_data, explainer=stub)
+
+    benchmarks["pipeline"] = (pipeline, len(requests))
+    return benchmarks
+
+
+def reference():
+    """
+    Fixed pure-Python work, timed with the suite to tell a slower machine
+    (or a busy one) from slower code.
+    """
+    words = [f"phone {i % 97} ultra" for i in range(200)]
+    return sorted({word.upper(): len(word) for word in words}.items())
+
+
+def calibrate(run, min_time: float) -> int:
+    """
+    Loops of `run` that take at least `min_time` seconds.
+    """
+    run()  # warm caches and imports
+    loops = 1
+    while True:
+        began = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - began
+        if elapsed >= min_time:
+            return loops
+        loops = max(loops * 2, math.ceil(loops * min_time / max(elapsed, 1e-9)))
+
+
+def measure(benchmarks: dict, repeats: int, min_time: float) -> dict:
+    """
+    name -> `repeats` samples of microseconds per operation. Samples are
+    taken round-robin, so a noisy moment hits every benchmark a little
+    instead of one benchmark a lot.
+    """
+    loops = {name: calibrate(run, min_time) for name, (run, _) in benchmarks.items()}
+    samples = {name: [] for name in benchmarks}
+    for _ in range(repeats):
+        for name, (run, operations) in benchmarks.items():
+            began = time.perf_counter()
+            for _ in range(loops[name]):
+                run()
+            samples[name].append((time.perf_counter() - began) / (loops[name] * operations) * 1e6)
+    return samples
+
+
+def slower_p_value(baseline: list, current: list) -> float:
+    """
+    One-sided Mann-Whitney U test (normal approximation, average ranks for
+    ties): probability of samples at least this much slower if nothing changed.
+    """
+    pooled = sorted([(value, 0) for value in baseline] + [(value, 1) for value in current])
+    ranks = [0.0] * len(pooled)
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        i = j + 1
+    n1, n2 = len(baseline), len(current)
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 1)
+    u = rank_sum - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    sd = math.sqrt(n1 * n2 * (n1 + n2 + 1) / 12)
+    z = (u - mean) / sd if sd else 0.0
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--min-time", type=float, default=0.02, help="seconds per sample")
+    parser.add_argument("--threshold", type=float, default=0.20, help="median slowdown to flag (0.20 = 20%%)")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level")
+    parser.add_argument("--filter", default="", help="only benchmarks whose name contains this")
+    parser.add_argument("--update", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="compare raw times instead of scaling by the reference workload")
+    args = parser.parse_args()
+
+    stored = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    baseline = stored.get("benchmarks", {})
+    benchmarks = {name: bench for name, bench in build_benchmarks().items() if args.filter in name}
+    benchmarks["reference"] = (reference, 1)
+    measured = measure(benchmarks, args.repeats, args.min_time)
+
+    # Machine speed now vs when the baseline was recorded
+    speed = 1.0
+    if "reference" in baseline and not args.no_normalize:
+        speed = statistics.median(measured["reference"]) / baseline["reference"]["median_us"]
+        print(f"{'reference':34} {statistics.median(measured['reference']):12.3f} us/op  "
+              f"(machine {speed:.2f}x the baseline's time; results below are scaled by it)")
+
+    results = dict(baseline) if args.filter else {}
+    failures = []
+    for name, samples in measured.items():
+        median = statistics.median(samples)
+        results[name] = {"median_us": round(median, 3), "samples_us": [round(sample, 3) for sample in samples]}
+        if name == "reference":
+            continue
+
+        line = f"{name:34} {median:12.3f} us/op"
+        if name in baseline:
+            before = baseline[name]["median_us"]
+            scaled = [sample / speed for sample in samples]
+            change = statistics.median(scaled) / before - 1
+            p_value = slower_p_value(baseline[name]["samples_us"], scaled)
+            line += f"  {change:+7.1%} vs {before:.3f}  p={p_value:.3f}"
+            if change > args.threshold and p_value < args.alpha and not args.update:
+                failures.append(f"{name}: {change:+.1%} vs baseline {before:.3f} us/op (p={p_value:.4f})")
+        print(line)
+
+    if args.update:
+        BASELINE_PATH.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "benchmarks": results
+        }, indent=1) + "\n", encoding="utf-8")
+        print(f"Wrote {BASELINE_PATH}")
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
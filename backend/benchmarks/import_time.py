@@ -0,0 +1,101 @@
+"""
+Cold-start import time of the API and of the engines the Streamlit app uses.
+
+Each target is imported in a fresh interpreter with `python -X importtime`
+(best of --runs). Fails (exit 1) when a target is slower than its stored
+baseline by more than --tolerance, or when a module that must stay lazy
+(the Gemini SDK, NumPy) is imported at startup.
+
+    python -m backend.benchmarks.import_time
+    python -m backend.benchmarks.import_time --update   # store a new baseline
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+BASELINE_PATH = Path(__file__).resolve().parent / "import_baseline.json"
+ROOT = Path(__file__).resolve().parents[2]
+
+# Target name -> modules imported, in order
+TARGETS = {
+    "api": ["backend.api.main"],
+    "frontend_engines": [
+        "backend.engines.phone_specs", "backend.engines.target_classifier",
+        "backend.engines.lens_selector", "backend.engines.decision_engine",
+        "backend.engines.ai_explainer", "backend.engines.ai_direction",
+        "backend.engines.direction_engine", "backend.engines.target_resolver",
+        "backend.ai.factory",
+    ],
+}
+
+# Loaded on first use only; importing them at startup is a regression
+LAZY_MODULES = ("google.generativeai", "google.ai.generativelanguage", "numpy")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure(modules: list) -> tuple:
+    """
+    (milliseconds for the target's imports, every module imported) in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {module}" for module in modules)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        imported.append(name)
+        # Top-level entries only: their cumulative time includes everything below
+        if indent == 0 and name in modules:
+            total += cumulative
+    return total / 1000.0, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument("--update", action="store_true", help="write the measured times as the new baseline")
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8")) if BASELINE_PATH.exists() else {}
+    measured = {}
+    failures = []
+    for target, modules in TARGETS.items():
+        runs = [measure(modules) for _ in range(args.runs)]
+        best = min(ms for ms, _ in runs)
+        measured[target] = round(best, 1)
+
+        eager = sorted({name for name in runs[0][1]
+                        if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)})
+        if eager:
+            failures.append(f"{target}: imports {', '.join(eager[:3])}{' ...' if len(eager) > 3 else ''} at startup")
+
+        line = f"{target:18} {best:8.1f} ms"
+        if target in baseline:
+            limit = baseline[target] * (1 + args.tolerance)
+            line += f"  (baseline {baseline[target]:.1f} ms, limit {limit:.1f} ms)"
+            if best > limit and not args.update:
+                failures.append(f"{target}: {best:.1f} ms > {limit:.1f} ms")
+        print(line)
+
+    if args.update:
+        BASELINE_PATH.write_text(json.dumps(measured, indent=1) + "\n", encoding="utf-8")
+        print(f"Wrote {BASELINE_PATH}")
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Load test for POST /analyze: open-loop requests at a fixed rate.
+
+Runs the FastAPI app in-process against the fake model (AI_PROVIDER=fake,
+latency from --fake-latency) unless --url points at a running server.
+Phones come from backend/data/phones.json and targets from targets.json,
+with a skewed popularity (a few combinations get most of the traffic, as
+in production), some user-typed spellings, unknown phones and requests
+with an observer location. Reports throughput, latency percentiles, the
+upstream model calls seen in /ai/stats and the hit rates in /cache/stats.
+
+    python -m backend.benchmarks.load_test --rps 20 --duration 30
+    python -m backend.benchmarks.load_test --rps 50 --fake-latency lognormal:1.0,0.6 --json
+    python -m backend.benchmarks.load_test --url http://localhost:8000 --rps 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+import httpx
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+
+# Share of requests that are not a clean catalog name / carry a location
+TYPO_SHARE = 0.2
+UNKNOWN_PHONE_SHARE = 0.05
+LOCATION_SHARE = 0.3
+UNKNOWN_PHONES = ["Nokia 3310", "Pixel Fold 9", "my phone"]
+LOCATIONS = [(51.5, -0.13), (40.7, -74.0), (19.1, 72.9), (-33.9, 151.2), (35.7, 139.7)]
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> list:
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Workload:
+    """
+    Random /analyze request bodies with a realistic mix (seeded).
+    """
+
+    def __init__(self, seed: int = 7):
+        self.random = random.Random(seed)
+        self.phones = list(json.loads((DATA_DIR / "phones.json").read_text(encoding="utf-8")))
+        targets = json.loads((DATA_DIR / "targets.json").read_text(encoding="utf-8"))["targets"]
+        # Moon and the planets first: they are what most people ask about
+        targets.sort(key=lambda target: (target["id"] != "moon", target["type"] != "planet"))
+        self.targets = targets
+        self.phone_weights = zipf_weights(len(self.phones))
+        self.target_weights = zipf_weights(len(self.targets))
+
+    def phone(self) -> str:
+        if self.random.random() < UNKNOWN_PHONE_SHARE:
+            return self.random.choice(UNKNOWN_PHONES)
+        name = self.random.choices(self.phones, self.phone_weights)[0]
+        if self.random.random() < TYPO_SHARE:
+            # "galaxy s24 ultra", "iPhone 17 Pro " ...
+            name = name.lower() if self.random.random() < 0.5 else f" {name} "
+        return name
+
+    def target(self) -> str:
+        target = self.random.choices(self.targets, self.target_weights)[0]
+        spellings = [target["name"]] + target.get("aliases", []) + target.get("designations", [])
+        if self.random.random() < TYPO_SHARE:
+            return self.random.choice(spellings)
+        return target["name"]
+
+    def body(self) -> dict:
+        body = {"phone_name": self.phone(), "target": self.target()}
+        if self.random.random() < LOCATION_SHARE:
+            body["latitude"], body["longitude"] = self.random.choice(LOCATIONS)
+        return body
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def upstream_totals(client: httpx.AsyncClient) -> dict:
+    """
+    Upstream calls / failures and AI response and result cache hits, from
+    /ai/stats and /cache/stats.
+    """
+    stats = (await client.get("/ai/stats")).json()
+    results = (await client.get("/cache/stats")).json().get("analyze") or {}
+    upstream = stats.get("upstream") or {}
+    cache = stats.get("cache") or {}
+    return {
+        "calls": sum(entry.get("calls", 0) for entry in upstream.values()),
+        "failures": sum(entry.get("failures", 0) for entry in upstream.values()),
+        "cache_hits": cache.get("hits", 0),
+        "cache_misses": cache.get("misses", 0),
+        "result_hits": results.get("hits", 0),
+        "result_misses": results.get("misses", 0)
+    }
+
+
+async def run(client: httpx.AsyncClient, rps: float, duration: float, workload: Workload,
+              poisson: bool = True, max_in_flight: int = 1000) -> dict:
+    latencies = []
+    statuses = {}
+    errors = 0
+    dropped = 0
+    in_flight = set()
+
+    async def one(body: dict):
+        nonlocal errors
+        began = time.perf_counter()
+        try:
+            response = await client.post("/analyze", json=body)
+            status = response.status_code
+            if status == 200 and "error" in response.json():
+                status = "error"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        latencies.append(time.perf_counter() - began)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != 200:
+            errors += 1
+
+    before = await upstream_totals(client)
+    began = time.perf_counter()
+    next_at = began
+    # Open loop: arrivals follow the schedule no matter how slow responses are
+    while next_at - began < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(one(workload.body()))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_at += workload.random.expovariate(rps) if poisson else 1.0 / rps
+    if in_flight:
+        await asyncio.wait(in_flight)
+    elapsed = time.perf_counter() - began
+    after = await upstream_totals(client)
+
+    sent = len(latencies)
+    upstream = {key: after[key] - before[key] for key in after}
+    lookups = upstream["cache_hits"] + upstream["cache_misses"]
+    result_lookups = upstream["result_hits"] + upstream["result_misses"]
+    return {
+        "target_rps": rps,
+        "duration_sec": round(elapsed, 2),
+        "requests": sent,
+        "errors": errors,
+        "dropped": dropped,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": round(sent / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 1)
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+        "upstream_calls": upstream["calls"],
+        "upstream_failures": upstream["failures"],
+        "upstream_calls_per_request": round(upstream["calls"] / sent, 3) if sent else 0.0,
+        "ai_cache_hit_rate": round(upstream["cache_hits"] / lookups, 3) if lookups else 0.0,
+        "result_cache_hit_rate": round(upstream["result_hits"] / result_lookups, 3) if result_lookups else 0.0
+    }
+
+
+def print_report(report: dict) -> None:
+    latency = report["latency_ms"]
+    print(f"requests   {report['requests']} sent, {report['errors']} errors, {report['dropped']} dropped "
+          f"in {report['duration_sec']}s {report['statuses']}")
+    print(f"throughput {report['throughput_rps']} req/s (target {report['target_rps']})")
+    print(f"latency    p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms  max {latency['max']} ms")
+    print(f"upstream   {report['upstream_calls']} model calls ({report['upstream_calls_per_request']} per request), "
+          f"{report['upstream_failures']} failed")
+    print(f"caches     results {report['result_cache_hit_rate']:.0%} hits, AI responses {report['ai_cache_hit_rate']:.0%} hits")
+
+
+async def main_async(args) -> dict:
+    workload = Workload(args.seed)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        # Read by backend.ai.factory at import time
+        os.environ.setdefault("AI_PROVIDER", "fake")
+        os.environ["FAKE_AI_LATENCY"] = args.fake_latency
+        os.environ["FAKE_AI_FAILURE_RATE"] = str(args.fake_failure_rate)
+        from backend.api.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+    async with client:
+        return await run(client, args.rps, args.duration, workload, not args.uniform, args.max_in_flight)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of arrivals")
+    parser.add_argument("--url", help="test a running server instead of the app in-process")
+    parser.add_argument("--fake-latency", default="lognormal:0.8,0.5", help="FAKE_AI_LATENCY for in-process runs")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    parser.add_argument("--uniform", action="store_true", help="evenly spaced arrivals instead of Poisson")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="drop arrivals beyond this many open requests")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Throughput of the compiled camera rules (lens + settings per phone and target type).
+
+    python -m backend.benchmarks.rule_engine_bench --rounds 200
+"""
+import argparse
+import time
+
+from backend.engines.decision_table import DecisionTable, TARGET_TYPES
+from backend.engines.phone_specs import catalog
+from backend.engines.rule_engine import rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    phones = [phone.to_dict() if hasattr(phone, "to_dict") else phone for phone in catalog.current.phones.values()]
+
+    # One rule set = select_lens + decide_settings for one phone and target type
+    began = time.perf_counter()
+    for _ in range(args.rounds):
+        for phone in phones:
+            for target_type in TARGET_TYPES:
+                rules.decide_settings(phone, target_type, rules.select_lens(phone, target_type))
+    elapsed = time.perf_counter() - began
+    count = args.rounds * len(phones) * len(TARGET_TYPES)
+    print(f"rules          {count / elapsed:,.0f} rule sets/s ({count:,} in {elapsed:.3f}s)")
+
+    began = time.perf_counter()
+    for _ in range(args.rounds):
+        for phone in phones:
+            rules.recommend_exposure(phone, "main")
+    elapsed = time.perf_counter() - began
+    count = args.rounds * len(phones)
+    print(f"exposure       {count / elapsed:,.0f} recommendations/s")
+
+    began = time.perf_counter()
+    table = DecisionTable(catalog.current.phones)
+    print(f"decision table {len(table.settings):,} entries built in {(time.perf_counter() - began) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
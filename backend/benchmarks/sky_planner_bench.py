@@ -0,0 +1,57 @@
+"""
+Throughput of the sky planner: scalar ephemeris loop vs NumPy grid.
+
+    python -m backend.benchmarks.sky_planner_bench --locations 2000 --hours 24
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backend.engines.ephemeris import horizontal_position
+from backend.engines.sky_planner import plan_grid, sky_track, time_grid
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:,.0f} positions/s ({count:,} in {seconds:.3f}s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", default="moon")
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--step", type=float, default=1, help="minutes between samples")
+    parser.add_argument("--scalar-samples", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-60, 60, args.locations)
+    lons = rng.uniform(-180, 180, args.locations)
+    start = datetime(2026, 1, 1)
+    jd = time_grid(start, args.hours, args.step)
+    positions = len(lats) * len(jd)
+
+    # Scalar baseline: one horizontal_position() call per (location, time)
+    picks = rng.integers(0, positions, args.scalar_samples)
+    began = time.perf_counter()
+    for pick in picks:
+        horizontal_position(args.target, jd[pick % len(jd)], lats[pick // len(jd)], lons[pick // len(jd)])
+    scalar = time.perf_counter() - began
+    print(f"scalar     {_rate(len(picks), scalar)}")
+
+    began = time.perf_counter()
+    sky_track(args.target, jd, lats, lons)
+    vector = time.perf_counter() - began
+    print(f"sky_track  {_rate(positions, vector)}  x{(positions / vector) / (len(picks) / scalar):.0f}")
+
+    # Full plan: target + Sun tracks, masks, best time (no window lists)
+    began = time.perf_counter()
+    plan_grid(args.target, lats, lons, start, args.hours, args.step, windows=False)
+    planned = time.perf_counter() - began
+    print(f"plan_grid  {_rate(positions, planned)}  ({args.locations:,} locations x {len(jd):,} times)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,72 @@
-from backend.ai.gemini import GeminiExplainer
+from backend.ai.base import mark_fallback
+from backend.ai.factory import get_ai_explainer
+from backend.utils.prompt_loader import render_prompt
+from backend.utils.tracing import record_error
 
 
-def get_ai_direction(target: str, location: str | None = None) -> dict:
-    # It's better to use a factory or try/except here, but direct instantiation is okay for now
-    try:
-        client = GeminiExplainer()
+def build_direction_prompt(target: str, location: str | None = None) -> str:
+    return render_prompt("ai_direction_prompt", target=target, location=location or "Unknown")
 
-        prompt = f"""
-You are an astronomy assistant.
 
-Target: {target}
-Location: {location or "Unknown"}
+DIRECTION_ERROR = "Could not retrieve AI direction data."
 
-Explain in simple terms:
-1. Where in the sky to look (direction)
-2. Approximate altitude
-3. Best time to observe
-4. One practical tip
 
-Be clear, beginner-friendly, and realistic.
-Avoid exact degrees if uncertain.
-"""
+def get_ai_direction(target: str, location: str | None = None, explainer=None) -> dict:
+    try:
+        client = explainer or get_ai_explainer()
         # FIXED: Method name updated
-        text = client.generate_content(prompt)
-    except Exception:
-        text = "Could not retrieve AI direction data."
+        text = client.generate_content(build_direction_prompt(target, location))
+    except Exception as e:
+        record_error("ai_direction", e)
+        mark_fallback()
+        text = DIRECTION_ERROR
+
+    return {
+        "source": "ai_estimated",
+        "explanation": text.strip()
+    }
+
+
+async def aget_ai_direction(target: str, location: str | None = None, explainer=None) -> dict:
+    """
+    Async version of get_ai_direction, used by the concurrent /analyze pipeline.
+    """
+    try:
+        client = explainer or get_ai_explainer()
+        text = await client.agenerate_content(build_direction_prompt(target, location))
+    except Exception as e:
+        record_error("ai_direction", e)
+        mark_fallback()
+        text = DIRECTION_ERROR
 
     return {
         "source": "ai_estimated",
         "explanation": text.strip()
     }
+
+
+def stream_ai_direction(target: str, location: str | None = None, explainer=None):
+    """
+    Streaming version of get_ai_direction: yields the explanation text in chunks.
+    """
+    try:
+        client = explainer or get_ai_explainer()
+        yield from client.stream_content(build_direction_prompt(target, location))
+    except Exception as e:
+        record_error("ai_direction", e)
+        mark_fallback()
+        yield DIRECTION_ERROR
+
+
+async def astream_ai_direction(target: str, location: str | None = None, explainer=None):
+    """
+    Async version of stream_ai_direction, used by /analyze/stream.
+    """
+    try:
+        client = explainer or get_ai_explainer()
+        async for chunk in client.astream_content(build_direction_prompt(target, location)):
+            yield chunk
+    except Exception as e:
+        record_error("ai_direction", e)
+        mark_fallback()
+        yield DIRECTION_ERROR
@@ -1,16 +1,17 @@
-from backend.ai.gemini import GeminiExplainer
-from backend.ai.fallback import FallbackExplainer
-from backend.utils.prompt_loader import load_prompt
+from backend.ai.base import mark_fallback
+from backend.ai.factory import get_ai_explainer, get_prompt_batcher
+from backend.engines.ai_direction import DIRECTION_ERROR, aget_ai_direction, build_direction_prompt as build_ai_direction_prompt
+from backend.utils.prompt_loader import render_prompt
+from backend.utils.tracing import record_error
 
-def get_explainer():
+DIRECTION_FALLBACK = "Point your phone in the suggested direction during the recommended time for best clarity."
+
+def get_explainer(api_key: str | None = None):
     """
     Returns the best available explainer.
-    Uses Gemini if available, otherwise fallback.
+    Uses Gemini (behind the response cache) if available, otherwise fallback.
     """
-    try:
-        return GeminiExplainer()
-    except Exception:
-        return FallbackExplainer()
+    return get_ai_explainer(api_key)
 
 def explain_decision(phone, target, lens, settings):
     summary = f"{lens.capitalize()} • ISO {settings['iso']} • {settings['shutter']} • Tripod"
@@ -41,23 +42,96 @@ def explain_decision(phone, target, lens, settings):
         "confidence": "High"
     }
 
-def explain_direction(target: str, direction_data: dict) -> str:
-    try:
-        explainer = get_explainer()
-        template = load_prompt("direction_prompt.txt")
+def build_direction_prompt(target: str, direction_data: dict) -> str:
+    return render_prompt(
+        "direction_prompt",
+        target=target,
+        look_direction=direction_data.get("look_direction", "Unknown"),
+        altitude=direction_data.get("altitude", "Unknown"),
+        best_time=direction_data.get("best_time", "Unknown"),
+        tip=direction_data.get("tip", "")
+    )
 
-        prompt = template.format(
-            target=target,
-            look_direction=direction_data.get("look_direction", "Unknown"),
-            altitude=direction_data.get("altitude", "Unknown"),
-            best_time=direction_data.get("best_time", "Unknown"),
-            tip=direction_data.get("tip", "")
-        )
+def explain_direction(target: str, direction_data: dict, explainer=None) -> str:
+    try:
+        explainer = explainer or get_explainer()
+        prompt = build_direction_prompt(target, direction_data)
 
         # FIXED: calling the new standard method
         text = explainer.generate_content(prompt)
         return text.strip()
 
     except Exception as e:
-        print(f"Error in explain_direction: {e}")
-        return "Point your phone in the suggested direction during the recommended time for best clarity."
+        record_error("explain_direction", e)
+        mark_fallback()
+        return DIRECTION_FALLBACK
+
+async def aexplain_direction(target: str, direction_data: dict, explainer=None) -> str:
+    """
+    Async version of explain_direction, used by the concurrent /analyze pipeline.
+    """
+    try:
+        explainer = explainer or get_explainer()
+        prompt = build_direction_prompt(target, direction_data)
+
+        text = await explainer.agenerate_content(prompt)
+        return text.strip()
+
+    except Exception as e:
+        record_error("explain_direction", e)
+        mark_fallback()
+        return DIRECTION_FALLBACK
+
+def stream_direction(target: str, direction_data: dict, explainer=None):
+    """
+    Streaming version of explain_direction: yields the text in chunks.
+    """
+    try:
+        explainer = explainer or get_explainer()
+        yield from explainer.stream_content(build_direction_prompt(target, direction_data))
+
+    except Exception as e:
+        record_error("explain_direction", e)
+        mark_fallback()
+        yield DIRECTION_FALLBACK
+
+async def astream_direction(target: str, direction_data: dict, explainer=None):
+    """
+    Async version of stream_direction, used by /analyze/stream.
+    """
+    try:
+        explainer = explainer or get_explainer()
+        async for chunk in explainer.astream_content(build_direction_prompt(target, direction_data)):
+            yield chunk
+
+    except Exception as e:
+        record_error("explain_direction", e)
+        mark_fallback()
+        yield DIRECTION_FALLBACK
+
+async def aexplain_directions_packed(target: str, direction_data: dict, location: str | None = None,
+                                     ai_direction: bool = True, batcher=None):
+    """
+    The AI direction (if asked for) and the direction explanation from one
+    packed model call, micro-batched with concurrent requests.
+    Returns (direction_ai dict or None, direction explanation text).
+    """
+    batcher = batcher or get_prompt_batcher()
+    if batcher is None:
+        explanation = await aexplain_direction(target, direction_data)
+        return (await aget_ai_direction(target, location) if ai_direction else None), explanation
+
+    prompts = {"direction": build_direction_prompt(target, direction_data)}
+    if ai_direction:
+        prompts["direction_ai"] = build_ai_direction_prompt(target, location)
+    try:
+        texts = await batcher.agenerate_many(prompts)
+    except Exception as e:
+        record_error("packed_directions", e)
+        mark_fallback()
+        texts = {"direction": DIRECTION_FALLBACK, "direction_ai": DIRECTION_ERROR}
+
+    direction_ai = None
+    if ai_direction:
+        direction_ai = {"source": "ai_estimated", "explanation": texts["direction_ai"].strip()}
+    return direction_ai, texts["direction"].strip()
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from backend.engines.decision_table import DecisionTable
+from backend.engines.phone_catalog import load_catalog
+from backend.engines.phone_index import PhoneIndex
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    One immutable generation of the phone catalog, its lookup index and its
+    precomputed lens/settings table.
+    """
+    __slots__ = ("phones", "index", "decisions", "version", "loaded_at")
+
+    def __init__(self, phones, index: PhoneIndex, decisions: DecisionTable, version: str):
+        self.phones = phones
+        self.index = index
+        self.decisions = decisions
+        self.version = version
+        self.loaded_at = time.time()
+
+
+class CatalogManager:
+    """
+    Owns the current catalog snapshot and swaps in a new one when the data file changes.
+
+    Readers just read self.current (a single attribute load, no lock). Reloads
+    build the whole new snapshot off the request path, then replace the
+    reference in one assignment; in-flight requests keep using the snapshot
+    they already hold. Callbacks registered with on_reload() run after each
+    swap so caches derived from phone specs can be dropped.
+
+    With lazy=True the first snapshot is built on the first read of
+    self.current (or by load()) instead of in the constructor.
+    """
+
+    def __init__(self, data_path, compiled: bool = True, poll_interval: float = 0, lazy: bool = False):
+        self.data_path = Path(data_path)
+        self.compiled = compiled
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_error = None
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        if not lazy:
+            self.load()
+
+    def __getattr__(self, name):
+        # Only reached while self.current is not set yet (lazy catalogs)
+        if name == "current":
+            return self.load()
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def loaded(self) -> bool:
+        return "current" in self.__dict__
+
+    def load(self) -> CatalogSnapshot:
+        """
+        Builds the first snapshot if there is none yet; returns the current one.
+        """
+        with self._reload_lock:
+            if not self.loaded:
+                self._stamp = self._file_stamp()
+                self.current = self._load(None)
+        if self.poll_interval > 0:
+            self.start()
+        return self.current
+
+    def _file_stamp(self):
+        stat = self.data_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, previous: CatalogSnapshot | None) -> CatalogSnapshot:
+        raw = self.data_path.read_bytes()
+        version = hashlib.sha256(raw).hexdigest()[:12]
+        if self.compiled:
+            # Built from the bytes just hashed, so phones and version always agree
+            phones = load_catalog(self.data_path, source=raw)
+        else:
+            phones = json.loads(raw.decode("utf-8"))
+        # Decisions are only re-evaluated for phones whose specs changed
+        decisions = DecisionTable(phones, previous.decisions if previous else None)
+        return CatalogSnapshot(phones, PhoneIndex(phones), decisions, version)
+
+    def on_reload(self, callback) -> None:
+        """
+        Registers callback(snapshot), called after every swap.
+        """
+        self._listeners.append(callback)
+
+    def check(self) -> bool:
+        """
+        Reloads if the data file changed since the last load. Returns True on swap.
+        """
+        if not self.loaded:
+            return False
+        with self._reload_lock:
+            try:
+                stamp = self._file_stamp()
+            except FileNotFoundError:
+                return False
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            try:
+                snapshot = self._load(self.current)
+            except (OSError, ValueError) as e:
+                # Half-written or invalid file: keep serving the old catalog
+                self.reload_failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning("Phone catalog reload failed, keeping version %s: %s", self.current.version, e)
+                return False
+            if snapshot.version == self.current.version:
+                return False
+            self.current = snapshot
+            self.reloads += 1
+
+        for callback in self._listeners:
+            callback(snapshot)
+        return True
+
+    def start(self) -> None:
+        """
+        Starts the background mtime poller (daemon thread).
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="catalog-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.check()
+            except Exception as e:
+                self.reload_failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Phone catalog watcher error")
+
+    def stats(self) -> dict:
+        snapshot = self.load()
+        return {
+            "version": snapshot.version,
+            "phones": len(snapshot.phones),
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+            "last_error": self.last_error,
+            "decisions": snapshot.decisions.stats(),
+            "format": "compiled" if self.compiled else "json"
+        }
+
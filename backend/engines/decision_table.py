@@ -0,0 +1,125 @@
+import json
+import sys
+
+from backend.engines.decision_engine import decide_settings
+from backend.engines.lens_selector import select_lens
+
+# Every value classify_target() can return, and every lens select_lens() can pick
+TARGET_TYPES = ("planet", "deep_sky", "fast_object", "unknown")
+LENSES = ("main", "telephoto", "ultrawide")
+
+
+class FrozenSettings(dict):
+    """
+    Read-only settings dict, shared between all requests and phones that get
+    the same settings. Still a dict, so it serializes like one.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Settings from the decision table are read-only; copy with dict() first")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __hash__(self):
+        return hash(tuple(self.items()))
+
+
+def _fingerprint(phone) -> str:
+    # Exact spec contents: a phone is re-evaluated only when these change
+    if hasattr(phone, "to_dict"):
+        phone = phone.to_dict()
+    return json.dumps(phone, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class DecisionTable:
+    """
+    select_lens/decide_settings materialized for every catalog phone.
+
+    Built when a catalog snapshot loads: for each phone, each target type and
+    each lens. The request path is then one dict lookup returning the chosen
+    lens and a shared FrozenSettings. Passing the previous generation's table
+    re-evaluates only phones whose specs changed.
+    """
+
+    def __init__(self, phones, previous: "DecisionTable | None" = None):
+        self.interned = previous.interned if previous else {}
+        self.fingerprints = {}
+        self.choices = {}
+        self.settings = {}
+        self.reused = 0
+
+        for key, phone in phones.items():
+            fingerprint = _fingerprint(phone)
+            self.fingerprints[key] = fingerprint
+            if previous is not None and previous.fingerprints.get(key) == fingerprint:
+                self._copy(previous, key)
+                self.reused += 1
+            else:
+                self._evaluate(key, phone)
+
+        # Unknown phone: the generic defaults
+        self._evaluate(None, None)
+
+    def _intern(self, settings: dict) -> FrozenSettings:
+        frozen = FrozenSettings(settings)
+        return self.interned.setdefault(frozen, frozen)
+
+    def _evaluate(self, key, phone) -> None:
+        for target_type in TARGET_TYPES:
+            for lens in LENSES:
+                self.settings[key, target_type, lens] = self._intern(decide_settings(phone, target_type, lens))
+            lens = select_lens(phone, target_type)
+            self.choices[key, target_type] = (lens, self.settings[key, target_type, lens])
+
+    def _copy(self, previous: "DecisionTable", key) -> None:
+        for target_type in TARGET_TYPES:
+            for lens in LENSES:
+                self.settings[key, target_type, lens] = previous.settings[key, target_type, lens]
+            self.choices[key, target_type] = previous.choices[key, target_type]
+
+    def get(self, phone_key: str | None, target_type: str):
+        """
+        (lens, settings) for a catalog key (None = phone not found).
+        """
+        return self.choices[phone_key, target_type]
+
+    def settings_for(self, phone_key: str | None, target_type: str, lens: str) -> FrozenSettings:
+        return self.settings[phone_key, target_type, lens]
+
+    def verify(self, phones) -> list:
+        """
+        Compares every entry with the live functions; returns the mismatches.
+        """
+        mismatches = []
+        for key in [None, *phones.keys()]:
+            phone = phones[key] if key is not None else None
+            for target_type in TARGET_TYPES:
+                lens = select_lens(phone, target_type)
+                expected = (lens, decide_settings(phone, target_type, lens))
+                if self.get(key, target_type) != expected:
+                    mismatches.append((key, target_type, "choice"))
+                for other in LENSES:
+                    if self.settings_for(key, target_type, other) != decide_settings(phone, target_type, other):
+                        mismatches.append((key, target_type, other))
+        return mismatches
+
+    def stats(self) -> dict:
+        return {
+            "phones": len(self.fingerprints),
+            "entries": len(self.settings),
+            "distinct_settings": len(self.interned),
+            "reused": self.reused
+        }
+
+
+if __name__ == "__main__":
+    # Consistency check: the table must agree with the live functions
+    from backend.engines.phone_specs import catalog
+
+    snapshot = catalog.current
+    mismatches = snapshot.decisions.verify(snapshot.phones)
+    for mismatch in mismatches:
+        print("Mismatch:", mismatch)
+    print(f"{len(mismatches)} mismatches, {snapshot.decisions.stats()}")
+    sys.exit(1 if mismatches else 0)
@@ -1,5 +1,25 @@
-def get_direction_data(target: str):
-    target = target.lower().strip()
+from datetime import datetime
+
+from backend.engines.ephemeris import BODIES, observe
+from backend.engines.target_resolver import target_id
+
+TIPS = {
+    "sun": "Never look at the Sun directly; use a certified solar filter on the lens",
+    "moon": "Avoid shooting near the horizon to reduce atmospheric blur",
+}
+PLANET_TIP = "Planets appear sharper when higher in the sky"
+
+
+def get_direction_data(target: str, latitude: float | None = None,
+                       longitude: float | None = None, when: datetime | None = None):
+    """
+    Where to look for a target. With a location, the Sun, Moon and planets are
+    computed locally by the ephemeris engine; otherwise static guidance is used.
+    """
+    target = target_id(target)
+
+    if latitude is not None and longitude is not None and target in BODIES:
+        return get_computed_direction(target, latitude, longitude, when)
 
     if target == "moon":
         return {
@@ -16,7 +36,7 @@ def get_direction_data(target: str):
             "tip": "Planets appear sharper when higher in the sky"
         }
 
-    if target == "stars" or target == "milky way":
+    if target == "stars" or target == "milky_way":
         return {
             "look_direction": "Away from city lights",
             "altitude": "Straight up (zenith)",
@@ -30,3 +50,51 @@ def get_direction_data(target: str):
         "best_time": "Unknown",
         "tip": "No specific direction data available for this target."
     }
+
+
+def get_computed_direction(body: str, latitude: float, longitude: float, when: datetime | None = None):
+    eph = observe(body, latitude, longitude, when)
+    tip = TIPS.get(body, PLANET_TIP)
+
+    if eph["best_time"] is None:
+        return {
+            "look_direction": f"{eph['direction']} (azimuth {eph['azimuth_deg']:.0f}°)",
+            "altitude": f"{eph['altitude_deg']:.0f}° (below the horizon)" if eph["altitude_deg"] < 0
+            else f"{eph['altitude_deg']:.0f}° above the horizon",
+            "best_time": "Not well placed for viewing tonight",
+            "tip": "Try again in a few days or weeks when it rises during dark hours",
+            "ephemeris": eph
+        }
+
+    window = eph["best_window"]
+    if eph.get("low_in_sky"):
+        tip = "It stays low tonight; find an open horizon. " + tip
+    return {
+        "look_direction": f"{eph['best_direction']} (azimuth {eph['best_azimuth_deg']:.0f}°)",
+        "altitude": f"{eph['best_altitude_deg']:.0f}° above the horizon",
+        "best_time": (
+            f"{_hhmm(window['start'])}–{_hhmm(window['end'])} UTC, "
+            f"highest at {_hhmm(eph['best_time'])} UTC"
+        ),
+        "tip": tip,
+        "ephemeris": eph
+    }
+
+
+def describe_direction(target: str, direction_data: dict) -> str:
+    """
+    Plain-text summary of computed direction data (used instead of the AI direction call).
+    """
+    text = (
+        f"Look {direction_data['look_direction']}, about {direction_data['altitude']}. "
+        f"Best time: {direction_data['best_time']}. {direction_data['tip']}."
+    )
+    phase = direction_data.get("ephemeris", {}).get("moon_phase")
+    if phase and target_id(target) == "moon":
+        text += f" Moon phase: {phase['name']} ({phase['illumination']:.0%} lit)."
+    return text
+
+
+def _hhmm(iso: str) -> str:
+    return iso[11:16]
+
@@ -0,0 +1,420 @@
+"""
+Offline ephemeris for the Sun, Moon and planets.
+
+Positions come from low-precision analytic orbital elements (P. Schlyter,
+"How to compute planetary positions") with the main Moon, Jupiter, Saturn and
+Uranus perturbation terms, giving roughly arcminute accuracy, which is plenty
+for "where do I point my phone". Rise/transit/set use the iterative hour-angle
+method from Meeus, "Astronomical Algorithms", ch. 15. Everything is plain
+math: no network and no data files.
+"""
+import math
+from datetime import datetime, timezone
+
+BODIES = ("sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune")
+
+# N, i, w, a, e, M as (value at d=0, rate per day); d = days since 2000 Jan 0.0 UT
+ELEMENTS = {
+    "sun": ((0.0, 0.0), (0.0, 0.0), (282.9404, 4.70935e-5), (1.0, 0.0), (0.016709, -1.151e-9), (356.0470, 0.9856002585)),
+    "moon": ((125.1228, -0.0529538083), (5.1454, 0.0), (318.0634, 0.1643573223), (60.2666, 0.0), (0.054900, 0.0), (115.3654, 13.0649929509)),
+    "mercury": ((48.3313, 3.24587e-5), (7.0047, 5.00e-8), (29.1241, 1.01444e-5), (0.387098, 0.0), (0.205635, 5.59e-10), (168.6562, 4.0923344368)),
+    "venus": ((76.6799, 2.46590e-5), (3.3946, 2.75e-8), (54.8910, 1.38374e-5), (0.723330, 0.0), (0.006773, -1.302e-9), (48.0052, 1.6021302244)),
+    "mars": ((49.5574, 2.11081e-5), (1.8497, -1.78e-8), (286.5016, 2.92961e-5), (1.523688, 0.0), (0.093405, 2.516e-9), (18.6021, 0.5240207766)),
+    "jupiter": ((100.4542, 2.76854e-5), (1.3030, -1.557e-7), (273.8777, 1.64505e-5), (5.20256, 0.0), (0.048498, 4.469e-9), (19.8950, 0.0830853001)),
+    "saturn": ((113.6634, 2.38980e-5), (2.4886, -1.081e-7), (339.3939, 2.97661e-5), (9.55475, 0.0), (0.055546, -9.499e-9), (316.9670, 0.0334442282)),
+    "uranus": ((74.0005, 1.3978e-5), (0.7733, 1.9e-8), (96.6612, 3.0565e-5), (19.18171, -1.55e-8), (0.047318, 7.45e-9), (142.5905, 0.011725806)),
+    "neptune": ((131.7806, 3.0173e-5), (1.7700, -2.55e-7), (272.8461, -6.027e-6), (30.05826, 3.313e-8), (0.008606, 2.15e-9), (260.2471, 0.005995147)),
+}
+
+# Standard altitude of rise/set: refraction + semi-diameter (Moon adds parallax below)
+RISE_ALTITUDE = {"sun": -0.8333, "moon": -0.5667}
+PLANET_RISE_ALTITUDE = -0.5667
+
+# Minimum target altitude for a useful photo, and how dark the sky must be
+MIN_VIEW_ALTITUDE = 15.0
+TWILIGHT = {"moon": -6.0, "venus": -6.0, "jupiter": -6.0}
+DEFAULT_TWILIGHT = -12.0
+
+# Longest span the visibility planner (sky_planner) covers in one request
+MAX_PLAN_HOURS = 24 * 31
+
+SIDEREAL_RATE = 360.98564736629
+COMPASS = (
+    "North", "North-North-East", "North-East", "East-North-East",
+    "East", "East-South-East", "South-East", "South-South-East",
+    "South", "South-South-West", "South-West", "West-South-West",
+    "West", "West-North-West", "North-West", "North-North-West",
+)
+MOON_PHASES = (
+    "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
+    "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent",
+)
+SYNODIC_MONTH = 29.530588853
+
+_rad = math.radians
+_deg = math.degrees
+
+
+# ------------------------------------------------------------------
+# Time helpers
+# ------------------------------------------------------------------
+def julian_day(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp() / 86400.0 + 2440587.5
+
+
+def from_julian_day(jd: float) -> datetime:
+    return datetime.fromtimestamp((jd - 2440587.5) * 86400.0, tz=timezone.utc)
+
+
+def local_sidereal_time(jd: float, lon: float) -> float:
+    return (280.46061837 + SIDEREAL_RATE * (jd - 2451545.0) + lon) % 360.0
+
+
+def compass(azimuth: float) -> str:
+    return COMPASS[int((azimuth % 360.0) / 22.5 + 0.5) % 16]
+
+
+def _wrap180(angle: float) -> float:
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+# ------------------------------------------------------------------
+# Positions
+# ------------------------------------------------------------------
+def _orbit(body: str, d, xp=math):
+    """
+    Ecliptic rectangular coordinates from the orbital elements
+    (heliocentric for planets, geocentric for the Sun and Moon).
+
+    Position functions take an `xp` math namespace (math by default) so the
+    NumPy sky planner can evaluate the same series over arrays of times.
+    """
+    N, i, w, a, e, M = (v0 + v1 * d for v0, v1 in ELEMENTS[body])
+    N, i, w, M = xp.radians(N), xp.radians(i), xp.radians(w), xp.radians(M % 360.0)
+
+    E = M + e * xp.sin(M) * (1.0 + e * xp.cos(M))
+    for _ in range(10):
+        delta = (E - e * xp.sin(E) - M) / (1.0 - e * xp.cos(E))
+        E = E - delta
+        if xp is math and abs(delta) < 1e-9:
+            break
+
+    xv = a * (xp.cos(E) - e)
+    yv = a * xp.sqrt(1.0 - e * e) * xp.sin(E)
+    v = xp.atan2(yv, xv)
+    r = xp.hypot(xv, yv)
+
+    vw = v + w
+    cos_n, sin_n, cos_i = xp.cos(N), xp.sin(N), xp.cos(i)
+    x = r * (cos_n * xp.cos(vw) - sin_n * xp.sin(vw) * cos_i)
+    y = r * (sin_n * xp.cos(vw) + cos_n * xp.sin(vw) * cos_i)
+    z = r * xp.sin(vw) * xp.sin(i)
+    return x, y, z
+
+
+def _mean_anomaly(body: str, d, xp=math):
+    m0, m1 = ELEMENTS[body][5]
+    return xp.radians((m0 + m1 * d) % 360.0)
+
+
+def _perturb(body: str, d, lon, lat, r, xp=math):
+    """
+    Main periodic terms (degrees; Moon distance in Earth radii).
+    """
+    sin, cos = xp.sin, xp.cos
+    if body == "moon":
+        Ms = _mean_anomaly("sun", d, xp)
+        Mm = _mean_anomaly("moon", d, xp)
+        Nm = xp.radians(ELEMENTS["moon"][0][0] + ELEMENTS["moon"][0][1] * d)
+        ws = xp.radians(ELEMENTS["sun"][2][0] + ELEMENTS["sun"][2][1] * d)
+        wm = xp.radians(ELEMENTS["moon"][2][0] + ELEMENTS["moon"][2][1] * d)
+        Ls, Lm = Ms + ws, Mm + wm + Nm
+        D, F = Lm - Ls, Lm - Nm
+        lon = lon + (-1.274 * sin(Mm - 2 * D) + 0.658 * sin(2 * D) - 0.186 * sin(Ms)
+                - 0.059 * sin(2 * Mm - 2 * D) - 0.057 * sin(Mm - 2 * D + Ms)
+                + 0.053 * sin(Mm + 2 * D) + 0.046 * sin(2 * D - Ms) + 0.041 * sin(Mm - Ms)
+                - 0.035 * sin(D) - 0.031 * sin(Mm + Ms) - 0.015 * sin(2 * F - 2 * D)
+                + 0.011 * sin(Mm - 4 * D))
+        lat = lat + (-0.173 * sin(F - 2 * D) - 0.055 * sin(Mm - F - 2 * D)
+                - 0.046 * sin(Mm + F - 2 * D) + 0.033 * sin(F + 2 * D) + 0.017 * sin(2 * Mm + F))
+        r = r + -0.58 * cos(Mm - 2 * D) - 0.46 * cos(2 * D)
+    elif body in ("jupiter", "saturn", "uranus"):
+        Mj = _mean_anomaly("jupiter", d, xp)
+        Ms = _mean_anomaly("saturn", d, xp)
+        Mu = _mean_anomaly("uranus", d, xp)
+        if body == "jupiter":
+            lon = lon + (-0.332 * sin(2 * Mj - 5 * Ms - xp.radians(67.6)) - 0.056 * sin(2 * Mj - 2 * Ms + xp.radians(21))
+                    + 0.042 * sin(3 * Mj - 5 * Ms + xp.radians(21)) - 0.036 * sin(Mj - 2 * Ms)
+                    + 0.022 * cos(Mj - Ms) + 0.023 * sin(2 * Mj - 3 * Ms + xp.radians(52))
+                    - 0.016 * sin(Mj - 5 * Ms - xp.radians(69)))
+        elif body == "saturn":
+            lon = lon + (0.812 * sin(2 * Mj - 5 * Ms - xp.radians(67.6)) - 0.229 * cos(2 * Mj - 4 * Ms - xp.radians(2))
+                    + 0.119 * sin(Mj - 2 * Ms - xp.radians(3)) + 0.046 * sin(2 * Mj - 6 * Ms - xp.radians(69))
+                    + 0.014 * sin(Mj - 3 * Ms + xp.radians(32)))
+            lat = lat + -0.020 * cos(2 * Mj - 4 * Ms - xp.radians(2)) + 0.018 * sin(2 * Mj - 6 * Ms - xp.radians(49))
+        else:
+            lon = lon + (0.040 * sin(Ms - 2 * Mu + xp.radians(6)) + 0.035 * sin(Ms - 3 * Mu + xp.radians(33))
+                    - 0.015 * sin(Mj - Mu + xp.radians(20)))
+    return lon, lat, r
+
+
+def ecliptic_position(body: str, jd, xp=math):
+    """
+    Geocentric ecliptic (longitude deg, latitude deg, distance).
+    Distance is in AU, or Earth radii for the Moon.
+    """
+    d = jd - 2451543.5
+    x, y, z = _orbit(body, d, xp)
+
+    if body not in ("sun", "moon"):
+        lon, lat, r = xp.degrees(xp.atan2(y, x)), xp.degrees(xp.atan2(z, xp.hypot(x, y))), xp.sqrt(x * x + y * y + z * z)
+        lon, lat, r = _perturb(body, d, lon, lat, r, xp)
+        cl = xp.cos(xp.radians(lat))
+        x, y, z = r * cl * xp.cos(xp.radians(lon)), r * cl * xp.sin(xp.radians(lon)), r * xp.sin(xp.radians(lat))
+        xs, ys, _ = _orbit("sun", d, xp)
+        x, y = x + xs, y + ys
+
+    lon = xp.degrees(xp.atan2(y, x)) % 360.0
+    lat = xp.degrees(xp.atan2(z, xp.hypot(x, y)))
+    r = xp.sqrt(x * x + y * y + z * z)
+    if body == "moon":
+        lon, lat, r = _perturb(body, d, lon, lat, r, xp)
+        lon = lon % 360.0
+    return lon, lat, r
+
+
+def equatorial_position(body: str, jd, xp=math):
+    """
+    Geocentric (right ascension deg, declination deg, distance) of date.
+    """
+    lon, lat, r = ecliptic_position(body, jd, xp)
+    ecl = xp.radians(23.4393 - 3.563e-7 * (jd - 2451543.5))
+    cl = xp.cos(xp.radians(lat))
+    x = cl * xp.cos(xp.radians(lon))
+    y = cl * xp.sin(xp.radians(lon))
+    z = xp.sin(xp.radians(lat))
+    ye = y * xp.cos(ecl) - z * xp.sin(ecl)
+    ze = y * xp.sin(ecl) + z * xp.cos(ecl)
+    return xp.degrees(xp.atan2(ye, x)) % 360.0, xp.degrees(xp.atan2(ze, xp.hypot(x, ye))), r
+
+
+def _parallax(body: str, distance: float) -> float:
+    return _deg(math.asin(1.0 / distance)) if body == "moon" else 0.0
+
+
+def horizontal_position(body: str, jd: float, lat: float, lon: float):
+    """
+    Topocentric (azimuth deg from North through East, altitude deg).
+    """
+    ra, dec, r = equatorial_position(body, jd)
+    ha = _rad(local_sidereal_time(jd, lon) - ra)
+    lat_r, dec_r = _rad(lat), _rad(dec)
+    sin_alt = math.sin(lat_r) * math.sin(dec_r) + math.cos(lat_r) * math.cos(dec_r) * math.cos(ha)
+    alt = _deg(math.asin(max(-1.0, min(1.0, sin_alt))))
+    az = _deg(math.atan2(-math.cos(dec_r) * math.sin(ha),
+                         math.sin(dec_r) * math.cos(lat_r) - math.cos(dec_r) * math.sin(lat_r) * math.cos(ha)))
+    alt -= _parallax(body, r) * math.cos(_rad(alt))
+    return az % 360.0, alt
+
+
+# ------------------------------------------------------------------
+# Events
+# ------------------------------------------------------------------
+def _h0(body: str, altitude: float | None, distance: float) -> float:
+    h0 = altitude
+    if h0 is None:
+        h0 = RISE_ALTITUDE.get(body, PLANET_RISE_ALTITUDE)
+    if body == "moon":
+        # Geocentric altitude that appears as h0 from the surface
+        h0 += _parallax(body, distance) * math.cos(_rad(h0))
+    return h0
+
+
+def _cos_hour_angle(lat: float, dec: float, h0: float) -> float:
+    lat_r, dec_r = _rad(lat), _rad(dec)
+    return (math.sin(_rad(h0)) - math.sin(lat_r) * math.sin(dec_r)) / (math.cos(lat_r) * math.cos(dec_r))
+
+
+def _crossing(body: str, jd: float, lat: float, lon: float, altitude: float | None, side: int):
+    """
+    Time nearest jd when the body transits (side=0), or crosses `altitude`
+    rising (side=-1) or setting (side=+1). Returns None if it never does.
+    """
+    for _ in range(6):
+        ra, dec, r = equatorial_position(body, jd)
+        target_ha = 0.0
+        if side:
+            cos_h = _cos_hour_angle(lat, dec, _h0(body, altitude, r))
+            if abs(cos_h) > 1.0:
+                return None
+            target_ha = side * _deg(math.acos(cos_h))
+        ha = _wrap180(local_sidereal_time(jd, lon) - ra)
+        step = _wrap180(ha - target_ha) / SIDEREAL_RATE
+        jd -= step
+        if abs(step) < 1e-5:
+            break
+    return jd
+
+
+def _interval(body: str, transit: float, lat: float, lon: float, altitude: float | None):
+    """
+    (start, end, status) around a transit while the body is above `altitude`.
+    status is "ok", "always_above" (start/end span the whole day) or
+    "always_below" (start/end are None).
+    """
+    _, dec, r = equatorial_position(body, transit)
+    cos_h = _cos_hour_angle(lat, dec, _h0(body, altitude, r))
+    if cos_h < -1.0:
+        return transit - 0.5, transit + 0.5, "always_above"
+    if cos_h > 1.0:
+        return None, None, "always_below"
+
+    half_arc = _deg(math.acos(cos_h)) / SIDEREAL_RATE
+    start = _crossing(body, transit - half_arc, lat, lon, altitude, -1)
+    end = _crossing(body, transit + half_arc, lat, lon, altitude, 1)
+    if start is None or end is None or end <= start:
+        # Only grazes the altitude near transit; treat as not reaching it
+        return None, None, "always_below"
+    return start, end, "ok"
+
+
+def moon_phase(jd: float) -> dict:
+    sun_lon, _, _ = ecliptic_position("sun", jd)
+    moon_lon, moon_lat, _ = ecliptic_position("moon", jd)
+    elongation = (moon_lon - sun_lon) % 360.0
+    cos_e = math.cos(_rad(moon_lat)) * math.cos(_rad(elongation))
+    illumination = (1.0 - cos_e) / 2.0
+    return {
+        "name": MOON_PHASES[int(elongation / 45.0 + 0.5) % 8],
+        "illumination": round(illumination, 3),
+        "age_days": round(elongation / 360.0 * SYNODIC_MONTH, 1),
+        "waxing": elongation < 180.0
+    }
+
+
+def _iso(jd):
+    return from_julian_day(jd).isoformat(timespec="minutes") if jd is not None else None
+
+
+def observe(body: str, lat: float, lon: float, when: datetime | None = None) -> dict:
+    """
+    Where a body is now and when to look for it during the coming night.
+
+    `when` defaults to now (naive datetimes are UTC). The night is the one
+    still to come (see coming_night()); for the Sun it is the day around the
+    nearest local noon. The best window is when the body is at least
+    MIN_VIEW_ALTITUDE high and the Sun is below the twilight limit.
+    """
+    body = body.lower()
+    if body not in ELEMENTS:
+        raise ValueError(f"No ephemeris for {body}")
+    when = when or datetime.now(timezone.utc)
+    jd = julian_day(when)
+    # Exactly at a pole hour angles are undefined
+    lat = max(-89.99, min(89.99, lat))
+
+    azimuth, altitude = horizontal_position(body, jd, lat, lon)
+
+    if body == "sun":
+        # Daytime target: the window is the day around the nearest local mean noon
+        noon = math.floor(jd + lon / 360.0 + 0.5) - lon / 360.0
+        transit, rise, setting, status, window, low = _plan(body, noon, (noon - 0.5, noon + 0.5), lat, lon)
+    else:
+        limit = TWILIGHT.get(body, DEFAULT_TWILIGHT)
+        noon, dark = coming_night(jd, lat, lon, limit)
+        transit, rise, setting, status, window, low = _plan(body, noon + 0.5, dark, lat, lon)
+        if window is not None and window[1] <= jd:
+            # Already set or too low for the rest of tonight: plan the next night
+            noon += 1.0
+            transit, rise, setting, status, window, low = _plan(
+                body, noon + 0.5, _sun_below(noon, lat, lon, limit), lat, lon
+            )
+    _, transit_altitude = horizontal_position(body, transit, lat, lon)
+
+    result = {
+        "body": body,
+        "time": _iso(jd),
+        "azimuth_deg": round(azimuth, 1),
+        "altitude_deg": round(altitude, 1),
+        "direction": compass(azimuth),
+        "above_horizon": altitude > 0,
+        "rise": _iso(rise) if status == "ok" else None,
+        "transit": _iso(transit),
+        "transit_altitude_deg": round(transit_altitude, 1),
+        "set": _iso(setting) if status == "ok" else None,
+        "circumpolar": status == "always_above",
+        "never_rises": status == "always_below",
+        "best_window": None,
+        "best_time": None,
+        "moon_phase": moon_phase(jd),
+    }
+
+    if window:
+        best = min(max(transit, window[0]), window[1])
+        best_az, best_alt = horizontal_position(body, best, lat, lon)
+        result["best_window"] = {"start": _iso(window[0]), "end": _iso(window[1])}
+        result["best_time"] = _iso(best)
+        result["best_azimuth_deg"] = round(best_az, 1)
+        result["best_altitude_deg"] = round(best_alt, 1)
+        result["best_direction"] = compass(best_az)
+        result["low_in_sky"] = low
+
+    return result
+
+
+def _plan(body: str, near: float, dark, lat: float, lon: float):
+    """
+    (transit, rise, set, status, best window, low) for the transit nearest
+    `near`, the window limited to `dark`.
+    """
+    transit = _crossing(body, near, lat, lon, None, 0)
+    rise, setting, status = _interval(body, transit, lat, lon, None)
+    view_start, view_end, _ = _interval(body, transit, lat, lon, MIN_VIEW_ALTITUDE)
+
+    window = _overlap(dark, view_start, view_end)
+    low = False
+    if window is None and status != "always_below":
+        # Never high enough while dark: fall back to "above the horizon"
+        window = _overlap(dark, rise, setting)
+        low = window is not None
+    return transit, rise, setting, status, window, low
+
+
+def _overlap(dark, start, end):
+    if not dark or start is None:
+        return None
+    start, end = max(dark[0], start), min(dark[1], end)
+    return (start, end) if end > start else None
+
+
+def coming_night(jd: float, lat: float, lon: float, limit: float = DEFAULT_TWILIGHT):
+    """
+    (noon, dark) for the night still to come at jd: it starts at the local
+    mean noon before jd, or at the next one once that night's dark hours
+    (dark, see _sun_below) are over, e.g. on a morning query.
+    """
+    noon = math.floor(jd + lon / 360.0) - lon / 360.0
+    dark = _sun_below(noon, lat, lon, limit)
+    # Never dark (polar summer): the night is over at local midnight
+    if jd >= (dark[1] if dark else noon + 0.5):
+        noon += 1.0
+        dark = _sun_below(noon, lat, lon, limit)
+    return noon, dark
+
+
+def _sun_below(noon: float, lat: float, lon: float, limit: float):
+    """
+    (dusk, dawn) between noon and the next noon while the Sun is below `limit`;
+    None when it never gets that dark.
+    """
+    midnight = noon + 0.5
+    dusk = _crossing("sun", noon + 0.25, lat, lon, limit, 1)
+    dawn = _crossing("sun", noon + 0.75, lat, lon, limit, -1)
+    if dusk is None or dawn is None:
+        _, sun_altitude = horizontal_position("sun", midnight, lat, lon)
+        return (noon, noon + 1.0) if sun_altitude < limit else None
+    if dawn <= dusk:
+        return None
+    return dusk, dawn
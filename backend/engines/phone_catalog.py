@@ -0,0 +1,423 @@
+"""
+Compiled phone catalog.
+
+phones.json is compiled into a compact binary file that is memory-mapped at
+load time, so every uvicorn/Streamlit worker shares the same pages instead of
+holding its own tree of dicts. Camera numbers are fixed-width fields, booleans
+are packed as bits, and every string (names, apertures, zoom labels, notes)
+lives once in an interned string table.
+
+Lookups return read-only PhoneView/CameraView objects that behave like the
+dicts the engines consume (get, [], in, iteration, truthiness).
+
+The header records the sha256 of the JSON it was compiled from; a .bin
+whose hash differs from the current JSON is rebuilt, however the file
+timestamps compare (cp -p, rsync -t and git checkouts keep old mtimes).
+
+Build step:
+    python -m backend.engines.phone_catalog [phones.json] [phones.bin]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+
+MAGIC = b"APHC"
+FORMAT_VERSION = 2
+NO_STRING = 0xFFFFFFFF
+UINT_MAX = 0xFFFFFFFF
+
+# magic, version, record count, string table offset, notes offset, records offset, source sha256
+HEADER = struct.Struct("<4sHIIII32s")
+# key, brand, model, field mask, notes start, notes count, extras (JSON string id)
+RECORD = struct.Struct("<IIIHIHI")
+# field mask, int mask, bool bits, sensor_mp, iso_min, iso_max, max_shutter_sec, aperture, zoom
+SECTION = struct.Struct("<HHHdIIdII")
+U32 = struct.Struct("<I")
+
+TOP_FIELDS = ("brand", "model", "main_camera", "ultrawide_camera", "telephoto_camera", "notes")
+SECTIONS = ("main_camera", "ultrawide_camera", "telephoto_camera")
+SECTION_FIELDS = (
+    ("available", "bool"),
+    ("sensor_mp", "num"),
+    ("aperture", "str"),
+    ("iso_min", "uint"),
+    ("iso_max", "uint"),
+    ("max_shutter_sec", "num"),
+    ("zoom", "str"),
+    ("manual_focus", "bool"),
+    ("pro_mode", "bool"),
+)
+FIELD_BITS = {name: 1 << i for i, (name, _) in enumerate(SECTION_FIELDS)}
+FIELD_KINDS = dict(SECTION_FIELDS)
+TOP_BITS = {name: 1 << i for i, name in enumerate(TOP_FIELDS)}
+
+
+# ------------------------------------------------------------------
+# Compiler
+# ------------------------------------------------------------------
+def _fits(kind: str, value) -> bool:
+    if kind == "bool":
+        return isinstance(value, bool)
+    if kind == "str":
+        return isinstance(value, str)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    if kind == "uint":
+        return isinstance(value, int) and 0 <= value <= UINT_MAX
+    return True
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, text: str) -> int:
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = len(self.strings)
+            self.ids[text] = sid
+            self.strings.append(text)
+        return sid
+
+    def pack(self) -> bytes:
+        blobs = [s.encode("utf-8") for s in self.strings]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        head = struct.pack(f"<I{len(offsets)}I", len(blobs), *offsets)
+        return head + b"".join(blobs)
+
+
+def _pack_section(section: dict, strings: _StringTable, extras: dict):
+    mask = int_mask = bools = 0
+    values = {"sensor_mp": 0.0, "iso_min": 0, "iso_max": 0, "max_shutter_sec": 0.0,
+              "aperture": NO_STRING, "zoom": NO_STRING}
+    for name, value in section.items():
+        kind = FIELD_KINDS.get(name)
+        if kind is None or not _fits(kind, value):
+            extras[name] = value
+            continue
+        bit = FIELD_BITS[name]
+        mask |= bit
+        if kind == "bool":
+            bools |= bit if value else 0
+        elif kind == "str":
+            values[name] = strings.add(value)
+        elif kind == "num":
+            int_mask |= bit if isinstance(value, int) else 0
+            values[name] = float(value)
+        else:
+            values[name] = value
+    return SECTION.pack(
+        mask, int_mask, bools,
+        values["sensor_mp"], values["iso_min"], values["iso_max"],
+        values["max_shutter_sec"], values["aperture"], values["zoom"]
+    )
+
+
+def compile_catalog(phones: dict, source_hash: bytes = b"") -> bytes:
+    """
+    Compiles a {name: specs} catalog into the binary format.
+    Fields outside the fixed layout are kept losslessly in a per-record JSON extra.
+    """
+    strings = _StringTable()
+    notes = []
+    records = []
+
+    for key, spec in phones.items():
+        extras = {}
+        top_extras = {}
+        mask = 0
+        brand = model = NO_STRING
+        notes_start, notes_count = len(notes), 0
+        sections = []
+
+        for name, value in spec.items():
+            if name in ("brand", "model") and isinstance(value, str):
+                mask |= TOP_BITS[name]
+                if name == "brand":
+                    brand = strings.add(value)
+                else:
+                    model = strings.add(value)
+            elif name == "notes" and isinstance(value, list) and all(isinstance(n, str) for n in value):
+                mask |= TOP_BITS[name]
+                notes.extend(strings.add(n) for n in value)
+                notes_count = len(value)
+            elif name not in SECTIONS:
+                top_extras[name] = value
+
+        for name in SECTIONS:
+            section = spec.get(name)
+            section_extras = {}
+            if isinstance(section, dict):
+                mask |= TOP_BITS[name]
+                sections.append(_pack_section(section, strings, section_extras))
+            else:
+                if name in spec:
+                    top_extras[name] = section
+                sections.append(_pack_section({}, strings, section_extras))
+            if section_extras:
+                extras[name] = section_extras
+
+        if top_extras:
+            extras["fields"] = top_extras
+        extras_sid = strings.add(json.dumps(extras, ensure_ascii=False)) if extras else NO_STRING
+
+        records.append(
+            RECORD.pack(strings.add(key), brand, model, mask, notes_start, notes_count, extras_sid)
+            + b"".join(sections)
+        )
+
+    string_blob = strings.pack()
+    notes_blob = struct.pack(f"<{len(notes)}I", *notes)
+    strings_offset = HEADER.size
+    notes_offset = strings_offset + len(string_blob)
+    records_offset = notes_offset + len(notes_blob)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(records), strings_offset, notes_offset, records_offset,
+                         source_hash)
+    return header + string_blob + notes_blob + b"".join(records)
+
+
+def build_catalog(json_path, bin_path, source: bytes | None = None) -> Path:
+    """
+    Compiles json_path (or `source`, its already-read bytes) into bin_path
+    (written atomically).
+    """
+    if source is None:
+        source = Path(json_path).read_bytes()
+    phones = json.loads(source.decode("utf-8"))
+    data = compile_catalog(phones, hashlib.sha256(source).digest())
+
+    bin_path = Path(bin_path)
+    fd, tmp_path = tempfile.mkstemp(dir=bin_path.parent, prefix=bin_path.name, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, bin_path)
+    return bin_path
+
+
+# ------------------------------------------------------------------
+# Reader
+# ------------------------------------------------------------------
+class CompiledCatalog(Mapping):
+    """
+    Memory-mapped compiled catalog: {phone name: PhoneView}.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._buf) < HEADER.size:
+            raise ValueError(f"Unsupported phone catalog format: {self.path}")
+        magic, version, count, strings_offset, notes_offset, records_offset, self.source_hash = \
+            HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported phone catalog format: {self.path}")
+
+        (string_count,) = U32.unpack_from(self._buf, strings_offset)
+        self._string_offsets = strings_offset + 4
+        self._string_blob = self._string_offsets + 4 * (string_count + 1)
+        self._notes_offset = notes_offset
+        self._records_offset = records_offset
+        self._record_size = RECORD.size + len(SECTIONS) * SECTION.size
+
+        # The name -> record map is the only per-process structure
+        self._index = {}
+        for i in range(count):
+            offset = records_offset + i * self._record_size
+            (key_sid,) = U32.unpack_from(self._buf, offset)
+            self._index[self.string(key_sid)] = offset
+
+    def string(self, sid: int) -> str:
+        start, end = struct.unpack_from("<II", self._buf, self._string_offsets + 4 * sid)
+        return self._buf[self._string_blob + start:self._string_blob + end].decode("utf-8")
+
+    def notes(self, start: int, count: int) -> list:
+        sids = struct.unpack_from(f"<{count}I", self._buf, self._notes_offset + 4 * start)
+        return [self.string(sid) for sid in sids]
+
+    def __getitem__(self, key: str):
+        return PhoneView(self, self._index[key])
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class PhoneView(Mapping):
+    """
+    Read-only view of one compiled phone record.
+    """
+    __slots__ = ("_catalog", "_offset")
+
+    def __init__(self, catalog: CompiledCatalog, offset: int):
+        self._catalog = catalog
+        self._offset = offset
+
+    def _record(self):
+        return RECORD.unpack_from(self._catalog._buf, self._offset)
+
+    def _extras(self, record) -> dict:
+        extras_sid = record[6]
+        return json.loads(self._catalog.string(extras_sid)) if extras_sid != NO_STRING else {}
+
+    def get(self, name, default=None):
+        record = self._record()
+        key_sid, brand, model, mask, notes_start, notes_count, extras_sid = record
+        bit = TOP_BITS.get(name)
+        if bit is not None and mask & bit:
+            if name == "brand":
+                return self._catalog.string(brand)
+            if name == "model":
+                return self._catalog.string(model)
+            if name == "notes":
+                return self._catalog.notes(notes_start, notes_count)
+            offset = self._offset + RECORD.size + SECTIONS.index(name) * SECTION.size
+            return CameraView(self._catalog, offset, self._extras(record).get(name, {}))
+        if extras_sid == NO_STRING:
+            return default
+        return self._extras(record).get("fields", {}).get(name, default)
+
+    def __getitem__(self, name):
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        record = self._record()
+        for name, bit in TOP_BITS.items():
+            if record[3] & bit:
+                yield name
+        yield from self._extras(record).get("fields", {})
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict:
+        return {
+            name: value.to_dict() if isinstance(value, CameraView) else value
+            for name, value in self.items()
+        }
+
+    def __repr__(self):
+        return f"PhoneView({self.to_dict()!r})"
+
+
+class CameraView(Mapping):
+    """
+    Read-only view of one camera section (main/ultrawide/telephoto).
+    """
+    __slots__ = ("_catalog", "_offset", "_extras")
+
+    def __init__(self, catalog: CompiledCatalog, offset: int, extras: dict):
+        self._catalog = catalog
+        self._offset = offset
+        self._extras = extras
+
+    def get(self, name, default=None):
+        bit = FIELD_BITS.get(name)
+        if bit is not None:
+            (mask, int_mask, bools, sensor_mp, iso_min, iso_max,
+             max_shutter_sec, aperture, zoom) = SECTION.unpack_from(self._catalog._buf, self._offset)
+            if mask & bit:
+                kind = FIELD_KINDS[name]
+                if kind == "bool":
+                    return bool(bools & bit)
+                if name == "aperture":
+                    return self._catalog.string(aperture)
+                if name == "zoom":
+                    return self._catalog.string(zoom)
+                if name == "iso_min":
+                    return iso_min
+                if name == "iso_max":
+                    return iso_max
+                value = sensor_mp if name == "sensor_mp" else max_shutter_sec
+                return int(value) if int_mask & bit else value
+        return self._extras.get(name, default)
+
+    def __getitem__(self, name):
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self):
+        (mask,) = struct.unpack_from("<H", self._catalog._buf, self._offset)
+        for name, bit in FIELD_BITS.items():
+            if mask & bit:
+                yield name
+        yield from self._extras
+
+    def __len__(self) -> int:
+        (mask,) = struct.unpack_from("<H", self._catalog._buf, self._offset)
+        return bin(mask).count("1") + len(self._extras)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"CameraView({self.to_dict()!r})"
+
+
+_MISSING = object()
+
+
+def _open_current(bin_path: Path, source_hash: bytes) -> CompiledCatalog | None:
+    """
+    The compiled catalog at bin_path if it was built from source_hash.
+    """
+    try:
+        compiled = CompiledCatalog(bin_path)
+    except (OSError, ValueError):
+        # Missing, or written by an older version of this module
+        return None
+    return compiled if compiled.source_hash == source_hash else None
+
+
+def load_catalog(json_path, bin_path=None, source: bytes | None = None) -> CompiledCatalog:
+    """
+    Memory-maps the compiled catalog, (re)building it first if it is missing
+    or was compiled from different JSON. `source` is the JSON's bytes if the
+    caller has already read them; the catalog is then built from exactly those.
+    """
+    json_path = Path(json_path)
+    bin_path = Path(bin_path) if bin_path else json_path.with_suffix(".bin")
+    if source is None:
+        source = json_path.read_bytes()
+    source_hash = hashlib.sha256(source).digest()
+
+    compiled = _open_current(bin_path, source_hash)
+    if compiled is not None:
+        return compiled
+    try:
+        build_catalog(json_path, bin_path, source)
+    except OSError:
+        # Read-only data dir: compile next to the other temp files instead
+        bin_path = Path(tempfile.gettempdir()) / f"{json_path.stem}.bin"
+        compiled = _open_current(bin_path, source_hash)
+        if compiled is not None:
+            return compiled
+        build_catalog(json_path, bin_path, source)
+    return CompiledCatalog(bin_path)
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parents[1] / "data" / "phones.json"
+    target = Path(sys.argv[2]) if len(sys.argv) > 2 else source.with_suffix(".bin")
+    built = build_catalog(source, target)
+    print(f"Compiled {source} -> {built} ({built.stat().st_size} bytes)")
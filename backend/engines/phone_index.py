@@ -0,0 +1,188 @@
+import re
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+# Same cutoff get_phone_specs always used with difflib.get_close_matches
+FUZZY_CUTOFF = 0.5
+
+# Shorthand users type for model suffixes, expanded before ranking
+SUFFIX_ALIASES = {
+    "u": "ultra",
+    "pm": "pro max",
+    "promax": "pro max",
+    "+": "plus",
+}
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+|\+")
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits a phone name into word/number tokens: "galaxy s24u" -> galaxy, s, 24, u.
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+class PhoneIndex:
+    """
+    Lookup structures for a phone catalog, built once when the catalog loads.
+
+    resolve() returns exactly what the original linear scan + difflib lookup
+    returned, but uses a normalized-name map, a trigram index for substring
+    search and bounded difflib scoring for typos. Resolved queries are kept in
+    an LRU so repeated free-text inputs cost one dict hit.
+    """
+
+    def __init__(self, phones: dict, cache_size: int = 4096):
+        self.phones = phones
+        self.keys = list(phones.keys())
+        self.lowered = [key.lower() for key in self.keys]
+
+        # Normalized name -> first key with that name
+        self.normalized = {}
+        for i, name in enumerate(self.lowered):
+            self.normalized.setdefault(name, i)
+
+        # Keys ordered by (length, catalog order): the first substring hit is the shortest
+        self.by_length = sorted(range(len(self.keys)), key=lambda i: (len(self.keys[i]), i))
+
+        # Trigram -> key ids, over lowercased names (substring search)
+        self.trigram_index = defaultdict(set)
+        self.trigram_counts = []
+        for i, name in enumerate(self.lowered):
+            grams = trigrams(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_index[gram].add(i)
+
+        # Character -> [(key id, count)], over original names (difflib bounds)
+        self.char_index = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for char, count in Counter(key).items():
+                self.char_index[char].append((i, count))
+
+        # Token/alias -> key ids (brand, series, model number, suffix)
+        self.token_index = defaultdict(set)
+        for i, key in enumerate(self.keys):
+            tokens = set(tokenize(key))
+            # Plain dicts from phones.json or PhoneViews from the compiled catalog
+            brand = phones[key].get("brand") if isinstance(phones[key], Mapping) else None
+            if brand:
+                tokens.add(brand.lower())
+            for token in tokens:
+                self.token_index[token].add(i)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def get(self, phone_name: str):
+        key = self.resolve(phone_name)
+        return self.phones[key] if key is not None else None
+
+    def _resolve(self, phone_name: str) -> str | None:
+        # 1. Exact match
+        if phone_name in self.phones:
+            return phone_name
+
+        # 2. Substring match on the normalized name, shortest key wins
+        search_query = phone_name.lower().strip()
+        i = self.normalized.get(search_query)
+        if i is None:
+            i = self._shortest_containing(search_query)
+        if i is not None:
+            return self.keys[i]
+
+        # 3. Typo correction
+        return self._closest(phone_name)
+
+    def _shortest_containing(self, query: str) -> int | None:
+        if len(query) < 3:
+            for i in self.by_length:
+                if query in self.lowered[i]:
+                    return i
+            return None
+
+        candidates = None
+        for gram in trigrams(query):
+            ids = self.trigram_index.get(gram)
+            if not ids:
+                return None
+            candidates = ids if candidates is None else candidates & ids
+        matches = [i for i in candidates if query in self.lowered[i]]
+        if not matches:
+            return None
+        return min(matches, key=lambda i: (len(self.keys[i]), i))
+
+    def _closest(self, phone_name: str) -> str | None:
+        """
+        Same answer as difflib.get_close_matches(phone_name, keys, n=1, cutoff=0.5).
+
+        difflib's quick_ratio (2 * shared characters / total length) is an upper
+        bound of ratio(), so candidates are scored in descending bound order and
+        the scan stops once no remaining bound can beat the best score.
+        """
+        query_length = len(phone_name)
+        shared = defaultdict(int)
+        for char, count in Counter(phone_name).items():
+            for i, key_count in self.char_index.get(char, ()):
+                shared[i] += min(count, key_count)
+
+        bounds = []
+        for i, common in shared.items():
+            bound = 2.0 * common / (query_length + len(self.keys[i]))
+            if bound >= FUZZY_CUTOFF:
+                bounds.append((bound, i))
+        bounds.sort(reverse=True)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(phone_name)
+        best = None
+        for bound, i in bounds:
+            if best is not None and bound < best[0]:
+                break
+            key = self.keys[i]
+            matcher.set_seq1(key)
+            score = matcher.ratio()
+            # Ties go to the larger key, like heapq.nlargest in get_close_matches
+            if score >= FUZZY_CUTOFF and (best is None or (score, key) > best):
+                best = (score, key)
+
+        return best[1] if best else None
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Ranked catalog matches for free text, best first: [(key, score), ...].
+        Suffix shorthand ("s24u", "15 pm") is expanded before scoring.
+        """
+        tokens = []
+        for token in tokenize(query):
+            tokens.extend(SUFFIX_ALIASES.get(token, token).split())
+        normalized = " ".join(tokens)
+        if not normalized:
+            return []
+
+        scores = defaultdict(float)
+        for token in tokens:
+            for i in self.token_index.get(token, ()):
+                scores[i] += 1.0 / len(tokens)
+
+        grams = trigrams(normalized)
+        if grams:
+            overlap = defaultdict(int)
+            for gram in grams:
+                for i in self.trigram_index.get(gram, ()):
+                    overlap[i] += 1
+            for i, shared in overlap.items():
+                scores[i] += 2.0 * shared / (len(grams) + self.trigram_counts[i])
+
+        for i in scores:
+            if self.lowered[i] == normalized:
+                scores[i] += 1.0
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.keys[item[0]]), item[0]))
+        return [(self.keys[i], round(score / 3.0, 4)) for i, score in ranked[:limit]]
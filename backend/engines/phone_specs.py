@@ -1,46 +1,46 @@
-import json
-import difflib
+import os
 from pathlib import Path
 
-# Load phones.json once (at import time)
+from backend.engines.catalog_manager import CatalogManager
+
+# Loaded once, on first use (or by the startup warm-up)
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "phones.json"
 
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    PHONES = json.load(f)
+# PHONE_CATALOG: "compiled" (default, memory-mapped phones.bin shared by all
+# workers) or "json" (plain dicts parsed from phones.json)
+# PHONE_CATALOG_RELOAD_INTERVAL: seconds between checks for a changed
+# phones.json (0 disables hot reload)
+catalog = CatalogManager(
+    DATA_PATH,
+    compiled=os.getenv("PHONE_CATALOG", "compiled").lower() != "json",
+    poll_interval=float(os.getenv("PHONE_CATALOG_RELOAD_INTERVAL", "5")),
+    lazy=True
+)
+
+def __getattr__(name):
+    # PHONES / PHONE_INDEX always refer to the current catalog generation
+    if name == "PHONES":
+        return catalog.current.phones
+    if name == "PHONE_INDEX":
+        return catalog.current.index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_phone_specs(phone_name: str) -> dict | None:
     """
     Retrieves phone specs with smart fuzzy matching.
     Example: "s24 ultra" -> returns "Galaxy S24 Ultra" specs.
+
+    1. Exact match, 2. substring of the lowercased name (shortest key wins),
+    3. typo correction (difflib ratio >= 0.5). If nothing is found, returns None
+    and the system uses the Default/Generic mode automatically.
     """
-    # 1. Try Exact Match first (Fastest)
-    if phone_name in PHONES:
-        return PHONES[phone_name]
-
-    # 2. Normalize input (lowercase, strip extra spaces)
-    search_query = phone_name.lower().strip()
-    
-    # 3. Approach A: Substring Search
-    # (Good for "s24 ultra" -> finding "Galaxy S24 Ultra")
-    matches = []
-    for key in PHONES.keys():
-        if search_query in key.lower():
-            matches.append(key)
-    
-    if matches:
-        # If multiple matches found (e.g. "pixel 8" matches "Pixel 8" and "Pixel 8 Pro"),
-        # pick the shortest one (usually the base model) to be safe.
-        best_match = min(matches, key=len)
-        return PHONES[best_match]
-
-    # 4. Approach B: Typo Correction (Fuzzy Match)
-    # (Good for "Glaxy S24" -> finding "Galaxy S24")
-    # cutoff=0.5 means it needs to be 50% similar
-    close_matches = difflib.get_close_matches(phone_name, PHONES.keys(), n=1, cutoff=0.5)
-    
-    if close_matches:
-        return PHONES[close_matches[0]]
-
-    # 5. If nothing found, return None 
-    # (The system will then use the Default/Generic mode automatically)
-    return None
+    return catalog.current.index.get(phone_name)
+
+def search_phones(query: str, limit: int = 5) -> list:
+    """
+    Ranked catalog matches for free text: [(catalog key, score), ...].
+    """
+    return catalog.current.index.search(query, limit)
+
+def catalog_version() -> str:
+    return catalog.current.version
@@ -0,0 +1,291 @@
+"""
+Camera rules as data.
+
+Target classification, lens choice and settings live in
+backend/data/camera_rules.json and are compiled once at load:
+
+- target names become one dict;
+- lens rules become an ordered list of compiled predicates per target type;
+- each settings rule set is expanded into a dispatch table with one
+  precomputed result per combination of its condition outcomes.
+
+Evaluating a phone then means running a handful of predicates and indexing
+a table. Conditions are [path, op, value] triples over the phone specs
+("main_camera.iso_max", ">=", 3200), or over "lens" for the chosen lens.
+
+Run `python -m backend.engines.rule_engine` to check the rules against the
+stored regression baseline (backend/data/decision_baseline.json).
+"""
+import json
+import math
+import operator
+import re
+import sys
+from itertools import product
+from pathlib import Path
+
+RULES_PATH = Path(__file__).resolve().parents[1] / "data" / "camera_rules.json"
+BASELINE_PATH = Path(__file__).resolve().parents[1] / "data" / "decision_baseline.json"
+
+
+def _flag(value) -> bool:
+    # Specs sometimes carry booleans as strings ("true"/"False")
+    if isinstance(value, str):
+        return value.lower() == "true"
+    return bool(value)
+
+
+def _compare(compare):
+    return lambda value, expected: value is not None and compare(value, expected)
+
+
+OPERATORS = {
+    "truthy": lambda value, expected: bool(value) == expected,
+    "flag": lambda value, expected: _flag(value) == expected,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">=": _compare(operator.ge),
+    "<=": _compare(operator.le),
+    ">": _compare(operator.gt),
+    "<": _compare(operator.lt),
+    "in": lambda value, expected: value in expected,
+}
+
+
+def _getter(path: str):
+    if path == "lens":
+        return lambda phone, lens: lens
+    parts = tuple(path.split("."))
+
+    def get(phone, lens):
+        value = phone
+        for part in parts:
+            if value is None:
+                return None
+            value = value.get(part)
+        return value
+    return get
+
+
+def compile_conditions(conditions: list):
+    """
+    [[path, op, value], ...] -> predicate(phone, lens), true when all hold.
+    """
+    checks = []
+    for path, op, expected in conditions:
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown rule operator: {op}")
+        checks.append((_getter(path), OPERATORS[op], expected))
+    checks = tuple(checks)
+
+    def predicate(phone, lens):
+        for get, check, expected in checks:
+            if not check(get(phone, lens), expected):
+                return False
+        return True
+    return predicate
+
+
+def _number(text, pattern: str) -> float | None:
+    match = re.search(pattern, str(text or ""))
+    return float(match.group(1)) if match else None
+
+
+class RuleSet:
+    """
+    One compiled camera_rules.json.
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = rules
+
+        self.target_types = {}
+        for target_type, names in rules["targets"].items():
+            for name in names:
+                self.target_types.setdefault(name.lower().strip(), target_type)
+        self.default_target_type = rules["default_target_type"]
+
+        self.lens_rules = {
+            target_type: tuple(
+                (compile_conditions(rule.get("if", [])), rule["lens"]) for rule in entries
+            )
+            for target_type, entries in rules["lens"].items()
+        }
+        self.default_lens = rules["default_lens"]
+
+        self.no_phone_settings = dict(rules["no_phone_settings"])
+        self.settings_tables = {
+            target_type: self._compile_settings(spec) for target_type, spec in rules["settings"].items()
+        }
+        self.exposure = rules["exposure"]
+
+    @staticmethod
+    def _compile_settings(spec: dict):
+        predicates = tuple(compile_conditions(rule["if"]) for rule in spec["rules"])
+        # Every outcome combination, precomputed: outcomes -> settings
+        table = {}
+        for outcomes in product((False, True), repeat=len(predicates)):
+            settings = dict(spec["base"])
+            for rule, matched in zip(spec["rules"], outcomes):
+                settings.update(rule.get("set" if matched else "else", {}))
+            table[outcomes] = settings
+        return predicates, table
+
+    def classify(self, target: str) -> str:
+        return self.target_types.get(target.lower().strip(), self.default_target_type)
+
+    def select_lens(self, phone, target_type: str) -> str:
+        if not phone:
+            return self.default_lens
+        for predicate, lens in self.lens_rules.get(target_type, ()):
+            if predicate(phone, None):
+                return lens
+        return self.default_lens
+
+    def decide_settings(self, phone, target_type: str, lens: str) -> dict:
+        if not phone:
+            return dict(self.no_phone_settings)
+        predicates, table = self.settings_tables.get(target_type) or self.settings_tables[self.default_target_type]
+        return dict(table[tuple(predicate(phone, lens) for predicate in predicates)])
+
+    def recommend_exposure(self, phone, lens: str, target_type: str | None = None) -> dict | None:
+        """
+        Longest sharp star exposure for a lens: the 500 rule and the more
+        accurate NPF rule, (35 * N + 30 * p) / f, both in 35 mm-equivalent
+        terms, capped by the camera's longest shutter time. None without
+        specs, or for target types that are not long exposures.
+        """
+        exposure = self.exposure
+        if not phone or (target_type is not None and target_type not in exposure["target_types"]):
+            return None
+        camera = phone.get(f"{lens}_camera") or {}
+        if lens == "telephoto" and not _flag(camera.get("available", False)):
+            return None
+        main = phone.get("main_camera") or {}
+        optics = exposure["optics"].get(lens, exposure["optics"]["main"])
+
+        focal = camera.get("focal_length_eq_mm") or optics["focal_length_eq_mm"]
+        if lens == "telephoto" and not camera.get("focal_length_eq_mm"):
+            focal *= _number(camera.get("zoom"), r"([\d.]+)\s*x") or 1.0
+        crop = camera.get("crop_factor") or optics["crop_factor"]
+        aperture = _number(camera.get("aperture"), r"([\d.]+)") or exposure["default_aperture"]
+        megapixels = camera.get("sensor_mp") or exposure["default_sensor_mp"]
+        # Pixel pitch (um) of a full-frame sensor with the same pixel count
+        pitch = math.sqrt(exposure["full_frame_area_mm2"] / megapixels)
+
+        rule_500 = exposure["rule_500"] / focal
+        npf = (exposure["npf_aperture"] * aperture * crop + exposure["npf_pitch"] * pitch) / focal
+        max_shutter = camera.get("max_shutter_sec") or main.get("max_shutter_sec")
+        suggested = min(npf, max_shutter) if max_shutter else npf
+        return {
+            "focal_length_eq_mm": round(float(focal), 1),
+            "aperture": aperture,
+            "rule_500_sec": round(rule_500, 1),
+            "npf_sec": round(npf, 1),
+            "max_shutter_sec": max_shutter,
+            "suggested_shutter_sec": round(suggested, 1),
+            "iso_max": camera.get("iso_max") or main.get("iso_max")
+        }
+
+
+def load_rules(path=RULES_PATH) -> RuleSet:
+    return RuleSet(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+rules = load_rules()
+
+
+# ------------------------------------------------------------------
+# Regression baseline
+# ------------------------------------------------------------------
+def _capability_cases() -> list:
+    """
+    Synthetic phones covering every branch the rules look at.
+    """
+    main = {"manual_focus": True, "pro_mode": True}
+    ultra = {"manual_focus": True, "pro_mode": True}
+    tele = {"available": True}
+    cases = []
+    for manual_focus, pro_mode in product((True, False, None), repeat=2):
+        camera = {key: value for key, value in (("manual_focus", manual_focus), ("pro_mode", pro_mode)) if value is not None}
+        cases.append({"main_camera": camera, "ultrawide_camera": ultra, "telephoto_camera": tele})
+    for camera in ({}, None, {"pro_mode": True}, {"manual_focus": True}, {"pro_mode": False, "manual_focus": False}):
+        phone = {"main_camera": main, "telephoto_camera": tele}
+        if camera is not None:
+            phone["ultrawide_camera"] = camera
+        cases.append(phone)
+    for available in (False, "true", "False", None):
+        camera = {"available": available} if available is not None else {}
+        cases.append({"main_camera": main, "ultrawide_camera": ultra, "telephoto_camera": camera})
+    return cases
+
+
+def build_baseline(phones, select_lens, decide_settings, classify_target) -> dict:
+    """
+    Records what the given functions answer for every phone (plus synthetic
+    capability cases and "no phone"), target type and lens.
+    """
+    lenses = ("main", "telephoto", "ultrawide")
+    target_types = (*rules.rules["settings"].keys(), "not_a_type")
+    distinct = []
+    cases = []
+    for phone in [None, *_capability_cases(), *phones]:
+        if hasattr(phone, "to_dict"):
+            phone = phone.to_dict()
+        if isinstance(phone, dict):
+            phone = {key: value for key, value in phone.items() if key.endswith("_camera")}
+        case = {"phone": phone, "lens": {}, "settings": {}}
+        for target_type in target_types:
+            case["lens"][target_type] = select_lens(phone, target_type)
+            case["settings"][target_type] = {}
+            for lens in lenses:
+                settings = decide_settings(phone, target_type, lens)
+                if settings not in distinct:
+                    distinct.append(settings)
+                case["settings"][target_type][lens] = distinct.index(settings)
+        cases.append(case)
+
+    names = [name for names in rules.rules["targets"].values() for name in names]
+    names += ["  Moon ", "JUPITER", "Milky Way", "m31", "sun", ""]
+    return {
+        "settings": distinct,
+        "cases": cases,
+        "targets": {name: classify_target(name) for name in names}
+    }
+
+
+def check_baseline(path=BASELINE_PATH, rule_set: RuleSet | None = None) -> list:
+    """
+    Differences between the rules and the stored baseline (empty = identical).
+    """
+    rule_set = rule_set or rules
+    baseline = json.loads(Path(path).read_text(encoding="utf-8"))
+    differences = []
+    for number, case in enumerate(baseline["cases"]):
+        phone = case["phone"]
+        for target_type, lens in case["lens"].items():
+            if rule_set.select_lens(phone, target_type) != lens:
+                differences.append(f"case {number}: lens for {target_type}")
+            for other, index in case["settings"][target_type].items():
+                if rule_set.decide_settings(phone, target_type, other) != baseline["settings"][index]:
+                    differences.append(f"case {number}: settings for {target_type}/{other}")
+    for name, target_type in baseline["targets"].items():
+        if rule_set.classify(name) != target_type:
+            differences.append(f"target {name!r}")
+    return differences
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        from backend.engines.phone_specs import catalog
+
+        baseline = build_baseline(catalog.current.phones.values(), rules.select_lens,
+                                  rules.decide_settings, rules.classify)
+        BASELINE_PATH.write_text(json.dumps(baseline, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"Wrote {BASELINE_PATH} ({len(baseline['cases'])} cases)")
+    else:
+        differences = check_baseline()
+        for difference in differences:
+            print("Differs from baseline:", difference)
+        print(f"{len(differences)} differences from {BASELINE_PATH.name}")
+        sys.exit(1 if differences else 0)
@@ -0,0 +1,177 @@
+"""
+Vectorized sky-visibility planner.
+
+Evaluates the ephemeris position series with NumPy over a whole grid of times
+(minute resolution over a night or a month) and observers at once, then finds
+the windows where the target is high enough while the sky is dark. The maths
+is the same as ephemeris.horizontal_position, only on arrays.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend.engines.ephemeris import (
+    DEFAULT_TWILIGHT, ELEMENTS, MAX_PLAN_HOURS, MIN_VIEW_ALTITUDE, SIDEREAL_RATE,
+    TWILIGHT, coming_night, compass, equatorial_position, julian_day
+)
+
+# NumPy namespace with the math-module names the ephemeris series use
+_np_math = SimpleNamespace(
+    sin=np.sin, cos=np.cos, sqrt=np.sqrt, hypot=np.hypot, atan2=np.arctan2,
+    radians=np.radians, degrees=np.degrees
+)
+
+# Upper bound on (locations x times) evaluated per block, to cap memory use
+BLOCK_SIZE = 1 << 18
+
+MAX_HOURS = MAX_PLAN_HOURS
+
+
+def time_grid(start: datetime, hours: float, step_minutes: float) -> np.ndarray:
+    """
+    Julian days from `start` (naive = UTC) over `hours`, every `step_minutes`.
+    """
+    count = int(hours * 60 / step_minutes) + 1
+    return julian_day(start) + np.arange(count) * (step_minutes / 1440.0)
+
+
+def _datetime(jd: float) -> datetime:
+    # Rounded to the second: float noise in jd would otherwise turn 16:00 into 15:59
+    return datetime.fromtimestamp(round((float(jd) - 2440587.5) * 86400.0), tz=timezone.utc)
+
+
+def _iso(jd: float) -> str:
+    return _datetime(jd).isoformat(timespec="minutes")
+
+
+def night_start(lat: float, lon: float, when: datetime | None = None,
+                limit: float = DEFAULT_TWILIGHT) -> datetime:
+    """
+    Local mean noon starting the night still to come at `when`, the same
+    night observe() plans (see ephemeris.coming_night).
+    """
+    noon, _ = coming_night(julian_day(when or datetime.now(timezone.utc)), lat, lon, limit)
+    return _datetime(noon)
+
+
+def sky_track(body: str, jd: np.ndarray, lats, lons):
+    """
+    Topocentric (azimuth, altitude) in degrees, shape (locations, times).
+
+    Right ascension and declination depend only on time, so they are computed
+    once per timestamp; only the hour-angle transform is broadcast over the
+    observers.
+    """
+    ra, dec, r = equatorial_position(body, jd, _np_math)
+    lats = np.radians(np.clip(np.atleast_1d(np.asarray(lats, dtype=float)), -89.99, 89.99))[:, None]
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))[:, None]
+
+    sidereal = 280.46061837 + SIDEREAL_RATE * (jd - 2451545.0)
+    ha = np.radians(sidereal[None, :] + lons - ra[None, :])
+    dec = np.radians(dec)[None, :]
+    sin_dec, cos_dec = np.sin(dec), np.cos(dec)
+    sin_lat, cos_lat = np.sin(lats), np.cos(lats)
+    cos_ha = np.cos(ha)
+
+    alt = np.degrees(np.arcsin(np.clip(sin_lat * sin_dec + cos_lat * cos_dec * cos_ha, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(-cos_dec * np.sin(ha), sin_dec * cos_lat - cos_dec * sin_lat * cos_ha))
+    if body == "moon":
+        alt -= np.degrees(np.arcsin(1.0 / r))[None, :] * np.cos(np.radians(alt))
+    return az % 360.0, alt
+
+
+def _windows(jd, az, alt, mask, step_minutes):
+    """
+    Contiguous runs of `mask` in one row as window dicts, with the peak of each.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], mask, [False])).astype(np.int8)))
+    windows = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        peak = start + int(np.argmax(alt[start:end]))
+        windows.append({
+            "start": _iso(jd[start]),
+            "end": _iso(jd[end - 1]),
+            "minutes": round((end - start) * step_minutes),
+            "peak_time": _iso(jd[peak]),
+            "peak_altitude_deg": round(float(alt[peak]), 1),
+            "peak_azimuth_deg": round(float(az[peak]), 1),
+            "peak_direction": compass(float(az[peak]))
+        })
+    return windows
+
+
+def plan_grid(body: str, lats, lons, start: datetime, hours: float = 24,
+              step_minutes: float = 1, min_altitude: float = MIN_VIEW_ALTITUDE,
+              windows: bool = True) -> list:
+    """
+    Observing plan for one target over many locations, sharing one time grid.
+
+    A sample counts as visible when the body is at least `min_altitude` high
+    and (except for the Sun itself) the Sun is below the twilight limit used by
+    observe(). Returns one dict per location, in input order.
+    """
+    body = body.lower()
+    if body not in ELEMENTS:
+        raise ValueError(f"No ephemeris for {body}")
+    if not 0 < hours <= MAX_HOURS:
+        raise ValueError(f"hours must be in (0, {MAX_HOURS}]")
+    if step_minutes <= 0:
+        raise ValueError("step_minutes must be positive")
+
+    jd = time_grid(start, hours, step_minutes)
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    twilight = TWILIGHT.get(body, DEFAULT_TWILIGHT)
+
+    plans = []
+    rows = max(1, BLOCK_SIZE // len(jd))
+    for first in range(0, len(lats), rows):
+        block_lats, block_lons = lats[first:first + rows], lons[first:first + rows]
+        az, alt = sky_track(body, jd, block_lats, block_lons)
+        visible = alt >= min_altitude
+        if body != "sun":
+            _, sun_alt = sky_track("sun", jd, block_lats, block_lons)
+            visible &= sun_alt <= twilight
+
+        best = np.argmax(np.where(visible, alt, -np.inf), axis=1)
+        counts = visible.sum(axis=1)
+        for row in range(len(block_lats)):
+            plan = {
+                "latitude": float(block_lats[row]),
+                "longitude": float(block_lons[row]),
+                "visible_minutes": round(int(counts[row]) * step_minutes),
+                "best_time": None,
+                "best_altitude_deg": None,
+                "best_azimuth_deg": None,
+                "best_direction": None
+            }
+            if counts[row]:
+                i = best[row]
+                plan["best_time"] = _iso(jd[i])
+                plan["best_altitude_deg"] = round(float(alt[row, i]), 1)
+                plan["best_azimuth_deg"] = round(float(az[row, i]), 1)
+                plan["best_direction"] = compass(float(az[row, i]))
+            if windows:
+                plan["windows"] = _windows(jd, az[row], alt[row], visible[row], step_minutes)
+            plans.append(plan)
+    return plans
+
+
+def plan_night(body: str, lat: float, lon: float, start: datetime | None = None,
+               hours: float = 24, step_minutes: float = 1,
+               min_altitude: float = MIN_VIEW_ALTITUDE) -> dict:
+    """
+    Observing windows for one location. `start` defaults to the local noon
+    starting the coming night, so the default 24 hours cover it.
+    """
+    start = start or night_start(lat, lon, limit=TWILIGHT.get(body.lower(), DEFAULT_TWILIGHT))
+    plan = plan_grid(body, [lat], [lon], start, hours, step_minutes, min_altitude)[0]
+    end = start + timedelta(hours=hours)
+    return {
+        "body": body.lower(),
+        "start": _iso(julian_day(start)),
+        "end": _iso(julian_day(end)),
+        "step_minutes": step_minutes,
+        **plan
+    }
@@ -0,0 +1,242 @@
+"""
+Resolves free-text targets ("M31", "the moon", "Jupiter tonight", "Orion neb")
+to a canonical target from backend/data/targets.json.
+
+Lookups go through three precompiled structures, cheapest first:
+
+1. a map from normalized names, aliases and designations to targets;
+2. a token index, where every alias token must be matched by a query token
+   (exactly or as a prefix of 3+ letters), so extra words are ignored;
+3. a symmetric-deletion index over the alias words for typos within a
+   bounded edit distance; corrected words go through steps 1 and 2 again.
+
+Designations (M31, NGC 224) are only matched exactly, since M31 and M33 are
+one edit apart.
+"""
+import bisect
+import json
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+TARGETS_PATH = Path(__file__).resolve().parents[1] / "data" / "targets.json"
+
+# Filler words people add around a target name. Not "planet": it is part of
+# aliases ("red planet"), and dropping it would leave "red" to match on its own
+STOPWORDS = frozenset({"the", "a", "an", "tonight", "today", "now", "this", "photo", "of"})
+
+_DESIGNATION_RE = re.compile(r"\b(messier|m|ngc|ic)\s*-?\s*(\d+)\b")
+_CATALOG_PREFIX = {"messier": "m", "m": "m", "ngc": "ngc", "ic": "ic"}
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """
+    "The Orion Nebula (M 42)" -> "orion nebula m42".
+    """
+    text = text.lower().replace("'", "")
+    text = _DESIGNATION_RE.sub(lambda match: _CATALOG_PREFIX[match.group(1)] + match.group(2), text)
+    return " ".join(word for word in _WORD_RE.findall(text) if word not in STOPWORDS)
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def deletions(word: str, depth: int) -> set:
+    """
+    Every string obtained by deleting up to `depth` characters from word.
+    """
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        found |= frontier
+    return found
+
+
+class TypoIndex:
+    """
+    Symmetric-deletion index over a word list: two words within d edits
+    share a string reachable by deleting at most d characters from each, so
+    a lookup is a few dict probes plus an exact check of the few candidates.
+    """
+
+    def __init__(self, words, max_distance: int = 2):
+        self.max_distance = max_distance
+        self.variants = defaultdict(set)
+        for word in words:
+            for variant in deletions(word, max_distance):
+                self.variants[variant].add(word)
+
+    def search(self, word: str, limit: int) -> list:
+        """
+        [(distance, word), ...] for every indexed word within `limit` edits.
+        """
+        limit = min(limit, self.max_distance)
+        candidates = set()
+        for variant in deletions(word, limit):
+            candidates |= self.variants.get(variant, set())
+        found = []
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) <= limit:
+                distance = edit_distance(word, candidate)
+                if distance <= limit:
+                    found.append((distance, candidate))
+        return found
+
+
+def max_typos(word: str) -> int:
+    if len(word) < 4:
+        return 0
+    return 1 if len(word) < 6 else 2
+
+
+class Target:
+    """
+    A canonical target: id (what the engines key off), display name and type.
+    """
+    __slots__ = ("id", "name", "type")
+
+    def __init__(self, id: str, name: str, type: str):
+        self.id = id
+        self.name = name
+        self.type = type
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name, "type": self.type}
+
+    def __repr__(self):
+        return f"Target({self.id!r})"
+
+
+class TargetResolver:
+    def __init__(self, entries: list, cache_size: int = 4096):
+        self.targets = {}
+        self.exact = {}
+        fuzzy_aliases = []
+        for entry in entries:
+            target = Target(entry["id"], entry["name"], entry["type"])
+            self.targets[target.id] = target
+            names = [target.id.replace("_", " "), target.name, *entry.get("aliases", [])]
+            for name in [*names, *entry.get("designations", [])]:
+                alias = normalize(name)
+                if alias:
+                    self.exact.setdefault(alias, target)
+            fuzzy_aliases.extend(normalize(name) for name in names)
+        fuzzy_aliases = [alias for alias in dict.fromkeys(fuzzy_aliases) if alias and not any(c.isdigit() for c in alias)]
+
+        # Alias token -> aliases containing it; sorted tokens for prefix search
+        self.token_index = defaultdict(set)
+        for alias in self.exact:
+            for token in alias.split():
+                self.token_index[token].add(alias)
+        self.tokens = sorted(self.token_index)
+
+        # Typo correction works per word, over the alias vocabulary
+        self.typos = TypoIndex(token for token in self.tokens if not any(c.isdigit() for c in token))
+        # ... plus whole aliases with the spaces removed, for "milkyway"
+        self.joined = {alias.replace(" ", ""): alias for alias in fuzzy_aliases if " " in alias}
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, text: str) -> Target | None:
+        query = normalize(text)
+        if not query:
+            return None
+
+        target = self.exact.get(query)
+        if target is not None:
+            return target
+
+        target = self._by_tokens(query.split())
+        if target is not None:
+            return target
+
+        corrected = [self._correct(token) for token in query.split()]
+        if corrected != query.split():
+            target = self.exact.get(" ".join(corrected)) or self._by_tokens(corrected)
+            if target is not None:
+                return target
+
+        alias = self.joined.get(query.replace(" ", ""))
+        return self.exact[alias] if alias else None
+
+    def _correct(self, token: str) -> str:
+        """
+        Closest vocabulary word within max_typos(token) edits, else the token itself.
+        """
+        limit = max_typos(token)
+        if not limit or token in self.token_index or any(c.isdigit() for c in token):
+            return token
+        matches = self.typos.search(token, limit)
+        return min(matches)[1] if matches else token
+
+    def _matching_tokens(self, token: str) -> list:
+        if len(token) < 3 or any(c.isdigit() for c in token):
+            return [token] if token in self.token_index else []
+        start = bisect.bisect_left(self.tokens, token)
+        end = bisect.bisect_left(self.tokens, token + "\uffff")
+        return self.tokens[start:end]
+
+    def _by_tokens(self, tokens: list) -> Target | None:
+        """
+        Most specific alias whose every token is covered by the query.
+        """
+        covered = set()
+        for token in tokens:
+            covered.update(self._matching_tokens(token))
+        exact = covered.intersection(tokens)
+        best = None
+        for token in covered:
+            for alias in self.token_index[token]:
+                alias_tokens = alias.split()
+                if all(part in covered for part in alias_tokens):
+                    # Most alias tokens, then most whole-word matches, then the longest alias
+                    rank = (len(alias_tokens), len(exact.intersection(alias_tokens)), len(alias), alias)
+                    if best is None or rank > best[0]:
+                        best = (rank, alias)
+        return self.exact[best[1]] if best else None
+
+
+def load_targets(path=TARGETS_PATH) -> TargetResolver:
+    return TargetResolver(json.loads(Path(path).read_text(encoding="utf-8"))["targets"])
+
+
+_resolver = None
+
+
+def get_resolver() -> TargetResolver:
+    """
+    The shared resolver, built on first use.
+    """
+    global _resolver
+    if _resolver is None:
+        _resolver = load_targets()
+    return _resolver
+
+
+def resolve_target(text: str) -> Target | None:
+    return get_resolver().resolve(text)
+
+
+def target_id(text: str) -> str:
+    """
+    Canonical id for a target, or its normalized text when it is not in the catalog.
+    """
+    target = get_resolver().resolve(text)
+    return target.id if target is not None else normalize(text)
+
+
+def target_name(text: str) -> str:
+    """
+    Canonical display name for a target, or the text as given.
+    """
+    target = get_resolver().resolve(text)
+    return target.name if target is not None else text.strip()
@@ -1,13 +1,192 @@
+"""
+Prompt templates from backend/prompts/, loaded and checked once.
+
+Every template must be declared in PROMPT_FIELDS with the fields its callers
+pass; a template using any other placeholder, or with broken braces, fails
+at load (startup) instead of with a KeyError mid-request.
+
+Versions: "direction_prompt.txt" is version v1 of direction_prompt and
+"direction_prompt.v2.txt" is v2. The highest version is used unless
+PROMPT_VERSIONS pins one ("direction_prompt=v1,explainer_prompt=v2").
+Rendered prompts carry their template version, which the response cache
+puts in its key.
+
+PROMPT_HOT_RELOAD=on re-reads the directory when files change (checked at
+most every PROMPT_RELOAD_INTERVAL seconds); a reload that fails validation
+keeps the previous templates.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
 from pathlib import Path
+from string import Formatter
 
+logger = logging.getLogger(__name__)
 
-def load_prompt(name: str) -> str:
-    # Adjust parents index based on your actual folder structure.
-    # If prompt_loader.py is in backend/utils/, parents[1] is backend/.
-    base = Path(__file__).resolve().parents[1]
-    prompt_path = base / "prompts" / name
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+
+# Template name -> fields its callers provide
+PROMPT_FIELDS = {
+    "explainer_prompt": {"phone_model", "target", "lens", "iso", "shutter", "focus", "tripod", "warning"},
+    "direction_prompt": {"target", "look_direction", "altitude", "best_time", "tip"},
+    "ai_direction_prompt": {"target", "location"},
+    "packed_prompt": {"schema", "requests"},
+}
+
+PROMPT_VERSIONS = dict(
+    item.split("=", 1) for item in os.getenv("PROMPT_VERSIONS", "").replace(" ", "").split(",") if "=" in item
+)
+PROMPT_HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "off").lower() == "on"
+PROMPT_RELOAD_INTERVAL = float(os.getenv("PROMPT_RELOAD_INTERVAL", "2"))
+
+_FILE_RE = re.compile(r"^(?P<name>[a-z0-9_]+)(?:\.(?P<version>v\d+))?\.txt$")
+
+
+class PromptError(ValueError):
+    pass
+
+
+class Prompt(str):
+    """
+    A rendered prompt: a plain str that also knows its template version.
+    """
+    template_version = ""
+
+
+class PromptTemplate:
+    """
+    One validated template. render(**values) fills it in.
+    """
+
+    def __init__(self, name: str, version: str, text: str):
+        self.name = name
+        self.version = version
+        self.text = text
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise PromptError(f"{name} {version}: {e}") from None
+        self.fields = {field for _, field, _, _ in parsed if field is not None}
+        bad = {field for field in self.fields if not field.isidentifier()}
+        if bad:
+            raise PromptError(f"{name} {version}: placeholders must be plain names, got {sorted(bad)}")
+        unknown = self.fields - PROMPT_FIELDS.get(name, set())
+        if unknown:
+            raise PromptError(f"{name} {version}: unknown placeholders {sorted(unknown)}")
+        # Content hash too, so editing a file in place still changes cache keys
+        self.full_version = f"{name}@{version}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}"
+        # Validated above, so format_map cannot hit an unknown field
+        self._format = text.format_map
+
+    def render(self, **values) -> Prompt:
+        missing = self.fields.difference(values)
+        if missing:
+            raise PromptError(f"{self.name}: missing values for {sorted(missing)}")
+        prompt = Prompt(self._format(values))
+        prompt.template_version = self.full_version
+        return prompt
+
+
+def _load_dir(directory: Path, pinned: dict) -> dict:
+    versions = {}
+    for path in directory.iterdir():
+        match = _FILE_RE.match(path.name)
+        if not match:
+            continue
+        name, version = match.group("name"), match.group("version") or "v1"
+        if name not in PROMPT_FIELDS:
+            raise PromptError(f"{path.name}: template {name} is not declared in PROMPT_FIELDS")
+        template = PromptTemplate(name, version, path.read_text(encoding="utf-8"))
+        versions.setdefault(name, {})[version] = template
 
-    if not prompt_path.exists():
-        raise FileNotFoundError(f"Prompt not found: {prompt_path}")
+    templates = {}
+    for name in PROMPT_FIELDS:
+        available = versions.get(name)
+        if not available:
+            raise PromptError(f"No template file for {name} in {directory}")
+        version = pinned.get(name) or max(available, key=lambda v: int(v[1:]))
+        if version not in available:
+            raise PromptError(f"{name}: pinned version {version} not found")
+        templates[name] = available[version]
+    return templates
 
-    return prompt_path.read_text(encoding="utf-8")
+
+def _fingerprint(directory: Path) -> tuple:
+    return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(directory)))
+
+
+class PromptRegistry:
+    def __init__(self, directory: Path = PROMPTS_DIR, pinned: dict | None = None,
+                 hot_reload: bool = False, reload_interval: float = 2.0):
+        self.directory = Path(directory)
+        self.pinned = pinned or {}
+        self.hot_reload = hot_reload
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked = time.monotonic()
+        self._fingerprint = _fingerprint(self.directory)
+        self.templates = _load_dir(self.directory, self.pinned)
+        self.reloads = 0
+
+    def reload(self) -> bool:
+        """
+        Re-reads the directory. Keeps the current templates (and returns
+        False) when the new ones do not validate.
+        """
+        with self._lock:
+            fingerprint = _fingerprint(self.directory)
+            try:
+                self.templates = _load_dir(self.directory, self.pinned)
+            except (PromptError, OSError) as e:
+                logger.warning("Prompt reload failed, keeping previous templates: %s", e)
+                return False
+            finally:
+                self._fingerprint = fingerprint
+            self.reloads += 1
+            return True
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return
+        self._checked = now
+        if _fingerprint(self.directory) != self._fingerprint:
+            self.reload()
+
+    def get(self, name: str) -> PromptTemplate:
+        if self.hot_reload:
+            self._maybe_reload()
+        try:
+            return self.templates[name]
+        except KeyError:
+            raise PromptError(f"Unknown prompt template: {name}") from None
+
+    def render(self, name: str, **values) -> Prompt:
+        return self.get(name).render(**values)
+
+    def versions(self) -> dict:
+        return {name: template.full_version for name, template in self.templates.items()}
+
+    def version(self) -> str:
+        """
+        One short digest of every active template version, for cache keys of
+        results built from several prompts.
+        """
+        return hashlib.sha256(repr(sorted(self.versions().items())).encode("utf-8")).hexdigest()[:12]
+
+
+prompts = PromptRegistry(PROMPTS_DIR, PROMPT_VERSIONS, PROMPT_HOT_RELOAD, PROMPT_RELOAD_INTERVAL)
+
+
+def render_prompt(name: str, **values) -> Prompt:
+    return prompts.render(name, **values)
+
+
+def load_prompt(name: str) -> str:
+    """
+    Raw text of the active version of a template ("direction_prompt.txt" or "direction_prompt").
+    """
+    return prompts.get(name.removesuffix(".txt")).text
@@ -0,0 +1,76 @@
+"""
+Cache for finished results: full /analyze responses and Streamlit guides.
+
+RESULT_CACHE picks the tiers:
+  "memory" (default) - per process
+  "sqlite"           - memory in front of a SQLite (WAL) file that every API
+                       worker and Streamlit process on the host reads and
+                       writes, so a guide computed by one is reused by all
+  "off"
+
+Each kind of result is a namespace (a table of its own, with its own TTL).
+Values are stored as JSON.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from backend.ai.cache import MemoryCache, SQLiteCache, TieredCache
+
+RESULT_CACHE = os.getenv("RESULT_CACHE", "memory").lower()
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+# Entries kept in each process's memory tier / in the shared file, per namespace
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_SHARED_SIZE = int(os.getenv("RESULT_CACHE_SHARED_SIZE", "100000"))
+# Same file as the AI response cache (AI_CACHE=sqlite) unless set
+RESULT_CACHE_PATH = os.getenv(
+    "RESULT_CACHE_PATH",
+    os.getenv("AI_CACHE_PATH", str(Path(tempfile.gettempdir()) / "astro_ai_cache.sqlite3"))
+)
+
+
+class ResultCache:
+    """
+    JSON values over a cache backend (None when caching is off).
+    """
+
+    def __init__(self, namespace: str, backend):
+        self.namespace = namespace
+        self.backend = backend
+
+    def get(self, key: str):
+        if self.backend is None:
+            return None
+        text = self.backend.get(key)
+        return json.loads(text) if text is not None else None
+
+    def set(self, key: str, value) -> None:
+        if self.backend is not None:
+            self.backend.set(key, json.dumps(value, ensure_ascii=False, default=str))
+
+    async def aget(self, key: str):
+        """
+        get() for async callers: a shared (SQLite) tier is read off the event loop.
+        """
+        if self.backend is None:
+            return None
+        text = await self.backend.aget(key)
+        return json.loads(text) if text is not None else None
+
+    async def aset(self, key: str, value) -> None:
+        if self.backend is not None:
+            await self.backend.aset(key, json.dumps(value, ensure_ascii=False, default=str))
+
+    def stats(self) -> dict | None:
+        return self.backend.stats() if self.backend is not None else None
+
+
+def build_result_cache(namespace: str, ttl: float = RESULT_CACHE_TTL, size: int = RESULT_CACHE_SIZE) -> ResultCache:
+    if RESULT_CACHE == "off":
+        return ResultCache(namespace, None)
+    memory = MemoryCache(max_size=size, ttl=ttl)
+    if RESULT_CACHE == "sqlite":
+        shared = SQLiteCache(RESULT_CACHE_PATH, max_size=RESULT_CACHE_SHARED_SIZE, ttl=ttl, table=namespace)
+        return ResultCache(namespace, TieredCache(memory, shared))
+    return ResultCache(namespace, memory)
@@ -0,0 +1,313 @@
+"""
+Lightweight tracing and metrics.
+
+span("stage", **tags) times a block. Every span's duration goes into a
+histogram per (stage, tags), exported in Prometheus text format by
+render_metrics() (GET /metrics). Inside trace() the spans are also collected
+per request, for a Server-Timing header or the Streamlit debug panel. Tags
+become metric labels, so only low-cardinality values belong in them
+(cache="hit", provider="gemini"), never prompts or phone names.
+
+With METRICS=off and no active trace, span() costs one contextvar read.
+
+SamplingProfiler records where one thread spends its time (collapsed stacks,
+the input format of flamegraph.pl and speedscope).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+# METRICS: keep per-stage histograms for /metrics ("on"/"off")
+METRICS = os.getenv("METRICS", "on").lower() != "off"
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger(__name__)
+
+_trace = ContextVar("trace", default=None)
+_span = ContextVar("span", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = 0
+        while index < len(BUCKETS) and seconds > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Metrics:
+    """
+    Stage duration histograms and event counters, keyed by label sets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, stage: str, tags: dict, seconds: float) -> None:
+        key = (stage, tuple(sorted(tags.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, amount: int = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self, prefix: str = "astro") -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Time spent per pipeline stage and model call.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        for (stage, tags), (counts, total, count) in sorted(histograms.items()):
+            labels = _labels({"stage": stage, **dict(tags)})
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{prefix}_stage_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{prefix}_stage_duration_seconds_count{{{labels}}} {count}")
+
+        names = sorted({name for name, _ in counters})
+        for name in names:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    label_text = _labels(dict(labels))
+                    lines.append(f"{prefix}_{name}_total{{{label_text}}} {value}" if label_text
+                                 else f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict) -> str:
+    return ",".join(
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in labels.items()
+    )
+
+
+metrics = Metrics()
+
+
+class Span:
+    __slots__ = ("name", "tags", "started", "duration", "_trace", "_token")
+
+    def __init__(self, name: str, tags: dict, trace):
+        self.name = name
+        self.tags = tags
+        self._trace = trace
+        self._token = None
+        self.duration = None
+        self.started = time.perf_counter()
+
+    def __enter__(self) -> "Span":
+        self._token = _span.set(self)
+        return self
+
+    def __exit__(self, error_type, error, traceback) -> bool:
+        if error_type is not None:
+            self.tags["error"] = error_type.__name__
+        _span.reset(self._token)
+        self.end()
+        return False
+
+    def tag(self, **tags) -> None:
+        self.tags.update(tags)
+
+    def end(self) -> None:
+        self.duration = time.perf_counter() - self.started
+        if METRICS:
+            metrics.observe(self.name, self.tags, self.duration)
+        if self._trace is not None:
+            self._trace.spans.append(self)
+
+
+class _NoopSpan:
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, error_type, error, traceback) -> bool:
+        return False
+
+    def tag(self, **tags) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    """
+    The finished spans of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def timings(self) -> list:
+        """
+        [(name, milliseconds, tags)] in the order the spans ended.
+        """
+        return [(span.name, span.duration * 1000, dict(span.tags)) for span in self.spans]
+
+    def server_timing(self) -> str:
+        entries = []
+        for name, ms, tags in self.timings():
+            entry = f"{name};dur={ms:.2f}"
+            if tags:
+                entry += ';desc="' + " ".join(f"{key}={value}" for key, value in tags.items()) + '"'
+            entries.append(entry)
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def trace():
+    """
+    Collects the spans of everything run inside the block (including tasks
+    and executor calls started from it, which copy the context).
+    """
+    collected = Trace()
+    token = _trace.set(collected)
+    try:
+        yield collected
+    finally:
+        _trace.reset(token)
+
+
+def start_span(name: str, **tags):
+    """
+    A span that is not made current; call .end() when done. For code that
+    cannot hold a context manager open (generators, streams).
+    """
+    return span(name, **tags)
+
+
+def span(name: str, **tags):
+    """
+    Context manager timing the block as the current span.
+    """
+    active = _trace.get()
+    if active is None and not METRICS:
+        return _NOOP
+    return Span(name, tags, active)
+
+
+async def traced(name: str, awaitable, **tags):
+    """
+    Awaits `awaitable` inside span(name); handy for asyncio.gather.
+    """
+    with span(name, **tags):
+        return await awaitable
+
+
+def tag(**tags) -> None:
+    """
+    Tags the current span, if any (cache="hit" from inside the cache layer).
+    """
+    current = _span.get()
+    if current is not None:
+        current.tags.update(tags)
+
+
+def record_error(stage: str, error: BaseException) -> None:
+    """
+    Logs and counts a handled error (one that ended in fallback text) and tags the current span.
+    """
+    logger.warning("Error in %s: %s", stage, error)
+    tag(fallback=type(error).__name__)
+    if METRICS:
+        metrics.count("errors", stage=stage, error=type(error).__name__)
+
+
+def render_metrics() -> str:
+    return metrics.render()
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack every `interval` seconds from a background
+    thread. For an async server that thread is the event loop's, so the
+    profile includes whatever else the loop ran during the request.
+    """
+
+    def __init__(self, thread_id: int | None = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        "frame;frame;frame count" lines, most frequent first.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def write(self, directory: Path) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{time.perf_counter_ns() % 1_000_000:06d}.txt"
+        path.write_text(self.collapsed(), encoding="utf-8")
+        return path
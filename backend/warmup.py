@@ -0,0 +1,44 @@
+"""
+Startup warm-up.
+
+The phone catalog, the target index, NumPy (sky planner) and the Gemini SDK
+are all loaded on first use so workers start fast. warm_up() does that work
+up front instead, for servers that would rather pay it before taking traffic
+(APP_WARMUP=on in backend/api/main.py).
+"""
+import importlib
+import os
+import time
+
+from backend.ai.client_pool import load_sdk, model_pool
+from backend.ai.factory import get_ai_explainer
+from backend.ai.gemini import MODEL_NAME
+from backend.engines.phone_specs import catalog
+from backend.engines.target_resolver import get_resolver
+
+
+def warm_up(ai: bool = True) -> dict:
+    """
+    Loads everything that is otherwise deferred; returns milliseconds per step.
+    """
+    timings = {}
+
+    def step(name, fn):
+        began = time.perf_counter()
+        fn()
+        timings[name] = round((time.perf_counter() - began) * 1000, 1)
+
+    step("catalog", catalog.load)
+    step("targets", get_resolver)
+    step("sky_planner", lambda: importlib.import_module("backend.engines.sky_planner"))
+    if ai:
+        step("ai_sdk", load_sdk)
+        step("ai_explainer", get_ai_explainer)
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key:
+            step("ai_model", lambda: model_pool.get_model(api_key, MODEL_NAME))
+    return timings
+
+
+if __name__ == "__main__":
+    print(warm_up())
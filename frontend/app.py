@@ -1,22 +1,105 @@
 import streamlit as st
+import hashlib
 import os
-import google.generativeai as genai
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # IMPORT YOUR ENGINES DIRECTLY 🛠️
-from backend.engines.phone_specs import get_phone_specs
+from backend.engines.phone_specs import catalog, get_phone_specs
 from backend.engines.target_classifier import classify_target
 from backend.engines.lens_selector import select_lens
 from backend.engines.decision_engine import decide_settings
 from backend.engines.ai_explainer import explain_decision, explain_direction
-from backend.engines.ai_direction import get_ai_direction
+from backend.engines.ai_direction import stream_ai_direction
 from backend.engines.direction_engine import get_direction_data
+from backend.engines.target_resolver import get_resolver, target_id, target_name
+from backend.ai.base import track_fallbacks
+from backend.ai.factory import AI_MAX_KEYS, get_ai_explainer
+from backend.utils.prompt_loader import prompts
+from backend.utils.result_cache import ResultCache, build_result_cache
+from backend.utils.tracing import span, trace
 
 # 🎨 Page Config
 st.set_page_config(page_title="Astro AI Agent", page_icon="🔭", layout="centered")
 
+# -----------------------------------------------------------------------------
+# 🗄️ Caching (shared by every session on this server)
+# -----------------------------------------------------------------------------
+# FRONTEND_CACHE_TTL: seconds a generated guide is reused for the same phone,
+# target and API key; FRONTEND_CACHE_SIZE: max guides kept in memory.
+# With RESULT_CACHE=sqlite, guides are also shared with other Streamlit processes
+FRONTEND_CACHE_TTL = float(os.getenv("FRONTEND_CACHE_TTL", "3600"))
+FRONTEND_CACHE_SIZE = int(os.getenv("FRONTEND_CACHE_SIZE", "512"))
+
+
+@st.cache_resource(show_spinner=False)
+def load_engines():
+    """
+    Loads the phone catalog and target index once per server process.
+    """
+    catalog.load()
+    get_resolver()
+    return True
+
+
+@st.cache_resource(show_spinner=False, max_entries=AI_MAX_KEYS)
+def get_explainer(key_hash: str, _api_key: str):
+    # One explainer (model clients, response cache) per key; cached by the key's hash,
+    # for as many keys as the factory keeps
+    return get_ai_explainer(api_key=_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def guide_cache() -> ResultCache:
+    """
+    Finished guides by (phone, target, versions, key hash), with a TTL.
+    """
+    return build_result_cache("guide", FRONTEND_CACHE_TTL, FRONTEND_CACHE_SIZE)
+
+
+@st.cache_data(ttl=FRONTEND_CACHE_TTL, max_entries=FRONTEND_CACHE_SIZE, show_spinner=False)
+def deterministic_steps(phone_model: str, target: str, catalog_version: str) -> dict:
+    """
+    Steps 2-7 of the pipeline (no AI). catalog_version is part of the cache
+    key, so a catalog reload invalidates the cached results.
+    """
+    # 2. Get Phone Specs
+    with span("phone_specs"):
+        phone = get_phone_specs(phone_model)
+
+    # 3. Classify Target
+    with span("classify_target"):
+        target_type = classify_target(target)
+
+    # 4. Select Lens
+    with span("lens_settings"):
+        lens = select_lens(phone, target_type)
+
+        # 5. Decide Settings
+        settings = decide_settings(phone, target_type, lens)
+
+    # 6. Generate Explanation
+    with span("explanation"):
+        explanation = explain_decision(phone, target, lens, settings)
+
+    # 7. Get Static Direction Data
+    with span("direction_data"):
+        direction_data = get_direction_data(target)
+
+    return {
+        "phone_model": phone_model,
+        "phone_found": bool(phone),
+        "target": target,
+        "lens": lens,
+        "settings": dict(settings),
+        "explanation": explanation,
+        "direction_data": direction_data
+    }
+
+
+load_engines()
+
 # -----------------------------------------------------------------------------
 # 💅 Custom CSS
 # -----------------------------------------------------------------------------
@@ -81,89 +164,138 @@ with st.form("analysis_form"):
 # -----------------------------------------------------------------------------
 # 🧠 Logic & Display
 # -----------------------------------------------------------------------------
+def key_hash(api_key: str) -> str:
+    # Results are cached per key without keeping the key itself in cache keys
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def guide_key(phone_model: str, target: str, api_key: str) -> str:
+    """
+    Cache key for a guide: the catalog phone and canonical target it resolves
+    to (so "s23 ultra" and "Galaxy S23 Ultra" share one), the catalog and
+    prompt versions, and the key hash.
+    """
+    phone = catalog.current.index.resolve(phone_model) if phone_model else None
+    return "|".join((
+        phone or phone_model.lower(), target_id(target), catalog.current.version, prompts.version(), key_hash(api_key)
+    ))
+
+
+def run_pipeline(phone_model: str, target: str, explainer) -> dict:
+    """
+    Runs the guide pipeline once and returns everything the page shows.
+    The AI direction is streamed onto the page while it is generated.
+    """
+    data = deterministic_steps(phone_model, target, catalog.current.version)
+    show_setup(data)
+
+    # 1. Get AI Direction (streamed)
+    st.subheader(f"🧭 How to Find {target}")
+    with st.spinner("🤖 AI is analyzing celestial conditions..."), span("ai_direction"):
+        ai_text = st.write_stream(stream_ai_direction(target_name(target), explainer=explainer))
+    data["direction_ai"] = {"source": "ai_estimated", "explanation": ai_text.strip()}
+    return data
+
+
+def show_setup(data: dict) -> None:
+    if not data["phone_found"]:
+        st.warning(f"Phone '{data['phone_model']}' not found. Using generic defaults.")
+
+    st.divider()
+    st.subheader("📸 Camera Setup")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Lens", data.get("lens", "Unknown").capitalize())
+    c2.metric("ISO", data["settings"].get("iso", "Auto"))
+    c3.metric("Shutter", data["settings"].get("shutter", "Auto"))
+
+    with st.expander("📝 View Detailed Instructions", expanded=True):
+        explanation = data.get("explanation", {})
+        if isinstance(explanation, dict):
+            for step in explanation.get("steps", []):
+                st.markdown(f"**{step['title']}**: {step['instruction']}")
+            st.caption(f"💡 *Tip: {explanation.get('expectation', '')}*")
+        else:
+            st.write(explanation)
+
+
+def with_direction_explanation(data: dict, explainer) -> dict:
+    """
+    8. Generate Direction Explanation (debug data only), once per guide.
+    """
+    if "direction" in data:
+        return data
+    return {
+        **data,
+        "direction": {
+            "data": data["direction_data"],
+            "explanation": explain_direction(data["target"], data["direction_data"], explainer=explainer)
+        }
+    }
+
+
+def show_guide(data: dict, streamed: bool = False) -> None:
+    if not streamed:
+        show_setup(data)
+        st.subheader(f"🧭 How to Find {data['target']}")
+        st.markdown(data["direction_ai"]["explanation"])
+    if not data["direction_ai"]["explanation"]:
+        st.warning("No location data available.")
+
+    # Final Footer Shoutout
+    st.divider()
+    st.caption(f"© 2026 Krish Savani. All rights reserved.")
+
+    if debug_mode:
+        st.divider()
+        hidden = ("phone_found", "phone_model", "target", "direction_data")
+        st.json({key: value for key, value in data.items() if key not in hidden})
+        # Stage timings of the run that produced this page (cached stages take ~0 ms)
+        st.json({"timings_ms": st.session_state.get("timings", [])})
+
+
 if submitted:
     if not user_api_key:
         st.error("❌ Please enter a Gemini API Key in the sidebar to proceed!")
         st.stop()
 
-    # Configure the API Key globally for this session
-    os.environ["GEMINI_API_KEY"] = user_api_key
-    genai.configure(api_key=user_api_key)
-
     if not phone_model or not target:
         st.error("Please enter both a Phone Model and a Target!")
     else:
-        with st.spinner("🤖 AI is analyzing celestial conditions..."):
-            try:
-                # --- DIRECT LOGIC PIPELINE ---
-
-                # 1. Get AI Direction
-                ai_direction = get_ai_direction(target)
-
-                # 2. Get Phone Specs
-                phone = get_phone_specs(phone_model.strip())
-                if not phone:
-                    st.warning(f"Phone '{phone_model}' not found. Using generic defaults.")
-
-                # 3. Classify Target
-                target_type = classify_target(target.strip())
-
-                # 4. Select Lens
-                lens = select_lens(phone, target_type)
-
-                # 5. Decide Settings
-                settings = decide_settings(phone, target_type, lens)
-
-                # 6. Generate Explanation
-                explanation = explain_decision(phone, target, lens, settings)
-
-                # 7. Get Static Direction Data
-                direction_data = get_direction_data(target)
-
-                # 8. Generate Direction Explanation
-                direction_explanation = explain_direction(target, direction_data)
-
-                data = {
-                    "lens": lens,
-                    "settings": settings,
-                    "explanation": explanation,
-                    "direction_ai": ai_direction,
-                    "direction": {
-                        "data": direction_data,
-                        "explanation": direction_explanation
-                    }
-                }
-
-                # --- DISPLAY RESULTS ---
-                st.divider()
-                st.subheader("📸 Camera Setup")
-                c1, c2, c3 = st.columns(3)
-                c1.metric("Lens", data.get("lens", "Unknown").capitalize())
-                c2.metric("ISO", data["settings"].get("iso", "Auto"))
-                c3.metric("Shutter", data["settings"].get("shutter", "Auto"))
-
-                with st.expander("📝 View Detailed Instructions", expanded=True):
-                    explanation = data.get("explanation", {})
-                    if isinstance(explanation, dict):
-                        for step in explanation.get("steps", []):
-                            st.markdown(f"**{step['title']}**: {step['instruction']}")
-                        st.caption(f"💡 *Tip: {explanation.get('expectation', '')}*")
-                    else:
-                        st.write(explanation)
-
-                st.subheader(f"🧭 How to Find {target}")
-                if data["direction_ai"].get("explanation"):
-                    st.markdown(data["direction_ai"]["explanation"])
-                else:
-                    st.warning("No location data available.")
-
-                # Final Footer Shoutout
-                st.divider()
-                st.caption(f"© 2026 Krish Savani. All rights reserved.")
+        try:
+            # Shared per-key explainer: no global SDK configuration, so users on the
+            # same server never overwrite each other's key
+            explainer = get_explainer(key_hash(user_api_key), user_api_key)
+            key = guide_key(phone_model.strip(), target.strip(), user_api_key)
 
+            # Same phone + target + key as any recent request on this server: no recompute
+            with trace() as run_trace, track_fallbacks() as fallbacks:
+                data = guide_cache().get(key)
+                streamed = data is None
+                if streamed:
+                    data = run_pipeline(phone_model.strip(), target.strip(), explainer)
                 if debug_mode:
-                    st.divider()
-                    st.json(data)
+                    with span("direction_explanation"):
+                        data = with_direction_explanation(data, explainer)
+            st.session_state["timings"] = [
+                {"stage": name, "ms": round(ms, 2), **tags} for name, ms, tags in run_trace.timings()
+            ]
+            # Guides with fallback text (the model failed) are not kept
+            if (streamed or debug_mode) and not fallbacks.used:
+                guide_cache().set(key, data)
+            st.session_state["guide"] = data
+            st.session_state["guide_key"] = key
+            show_guide(data, streamed)
+
+        except Exception as e:
+            st.error(f"❌ An error occurred: {e}")
 
-            except Exception as e:
-                st.error(f"❌ An error occurred: {e}")
+elif "guide" in st.session_state:
+    # Reruns from other widgets (debug toggle, expanders) redraw the last guide
+    data = st.session_state["guide"]
+    if debug_mode and "direction" not in data and user_api_key:
+        with track_fallbacks() as fallbacks:
+            data = with_direction_explanation(data, get_explainer(key_hash(user_api_key), user_api_key))
+        st.session_state["guide"] = data
+        if not fallbacks.used:
+            guide_cache().set(st.session_state["guide_key"], data)
+    show_guide(data)
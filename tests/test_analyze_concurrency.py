@@ -0,0 +1,35 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import backend.engines.ai_direction as ai_direction
+import backend.engines.ai_explainer as ai_explainer
+from backend.ai.fake import FakeExplainer
+from backend.api import main
+from backend.utils.result_cache import ResultCache
+
+LATENCY = 0.5
+
+
+def test_analyze_runs_ai_calls_concurrently(monkeypatch):
+    # Both AI texts of one request go to a model that takes LATENCY seconds per call
+    slow = FakeExplainer(latency=LATENCY)
+    monkeypatch.setattr(ai_explainer, "get_explainer", lambda api_key=None: slow)
+    monkeypatch.setattr(ai_direction, "get_ai_explainer", lambda api_key=None: slow)
+    monkeypatch.setattr(main, "AI_PACK_PROMPTS", False)
+    monkeypatch.setattr(main, "analysis_cache", ResultCache("analyze", None))
+
+    with TestClient(main.app) as client:
+        began = time.perf_counter()
+        response = client.post("/analyze", json={
+            "phone_name": "Galaxy S24 Ultra", "target": "Jupiter", "ai_direction": True
+        })
+        elapsed = time.perf_counter() - began
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["direction_ai"]["source"] == "ai_estimated"
+    assert body["direction"]["explanation"].startswith("Fake answer")
+    assert slow.stats()["calls"] == 2
+    # Close to one call's latency, well under the sum of both
+    assert LATENCY <= elapsed < 1.6 * LATENCY
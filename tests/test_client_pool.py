@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from backend.ai.client_pool import ModelPool, _attach, api_key_id
+from backend.ai.gemini import MODEL_NAME
+
+pytest.importorskip("google.generativeai")
+
+
+def test_models_are_keyed_by_the_key_hash_and_dropped_by_key():
+    pool = ModelPool()
+    model = pool.get_model("secret-key-1", MODEL_NAME)
+
+    assert pool.get_model("secret-key-1", MODEL_NAME) is model
+    assert pool.get_model("secret-key-2", MODEL_NAME) is not model
+    assert set(pool._models) == {(api_key_id("secret-key-1"), MODEL_NAME),
+                                 (api_key_id("secret-key-2"), MODEL_NAME)}
+
+    async def async_model():
+        return pool.get_async_model("secret-key-1", MODEL_NAME)
+
+    assert asyncio.run(async_model())._async_client is not None
+
+    pool.drop("secret-key-1")
+    assert set(pool._models) == {(api_key_id("secret-key-2"), MODEL_NAME)}
+    assert pool.get_model("secret-key-1", MODEL_NAME) is not model
+
+
+def test_missing_client_attribute_fails_loudly():
+    class Renamed:
+        _clients = None
+
+    with pytest.raises(RuntimeError, match="_client"):
+        _attach(Renamed(), "_client", object())
@@ -0,0 +1,45 @@
+import json
+import shutil
+
+import pytest
+
+from backend.engines.catalog_manager import CatalogManager
+from backend.engines.decision_table import TARGET_TYPES, DecisionTable
+from backend.engines.phone_specs import DATA_PATH
+
+
+@pytest.fixture
+def phones_json(tmp_path):
+    # A copy, so the compiled .bin is written next to it instead of into backend/data
+    path = tmp_path / "phones.json"
+    shutil.copy(DATA_PATH, path)
+    return path
+
+
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "json"])
+def test_table_matches_live_functions_for_every_catalog_phone(phones_json, compiled):
+    snapshot = CatalogManager(phones_json, compiled=compiled).current
+
+    assert snapshot.decisions.verify(snapshot.phones) == []
+    # Every phone plus the unknown-phone defaults, for every target type
+    assert len(snapshot.decisions.choices) == (len(snapshot.phones) + 1) * len(TARGET_TYPES)
+
+
+def test_compiled_and_json_catalogs_give_the_same_table(phones_json):
+    compiled = CatalogManager(phones_json, compiled=True).current.decisions
+    plain = CatalogManager(phones_json, compiled=False).current.decisions
+
+    assert compiled.choices == plain.choices
+    assert compiled.settings == plain.settings
+
+
+def test_reload_reevaluates_changed_phones_only(phones_json):
+    phones = json.loads(phones_json.read_text(encoding="utf-8"))
+    previous = DecisionTable(phones)
+    changed = next(iter(phones))
+    phones[changed]["telephoto_camera"] = {"available": False}
+
+    table = DecisionTable(phones, previous)
+
+    assert table.verify(phones) == []
+    assert table.reused == len(phones) - 1
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.engines.ephemeris import equatorial_position, julian_day, moon_phase, observe
+from backend.engines.sky_planner import night_start
+
+NEW_YORK = (40.7, -74.0)
+LONDON = (51.5, -0.13)
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def minutes_apart(iso: str, expected: datetime) -> float:
+    return abs((datetime.fromisoformat(iso) - expected).total_seconds()) / 60
+
+
+@pytest.mark.parametrize("when, ra, dec", [
+    (utc(2024, 3, 20, 3, 6), 0.0, 0.0),      # March equinox
+    (utc(2024, 6, 20, 20, 51), 90.0, 23.44),  # June solstice
+], ids=["equinox", "solstice"])
+def test_sun_position(when, ra, dec):
+    sun_ra, sun_dec, _ = equatorial_position("sun", julian_day(when))
+
+    assert sun_ra % 360 == pytest.approx(ra, abs=0.05) or sun_ra % 360 == pytest.approx(ra + 360, abs=0.05)
+    assert sun_dec == pytest.approx(dec, abs=0.05)
+
+
+def test_moon_phase():
+    assert moon_phase(julian_day(utc(2024, 6, 22, 1, 8)))["illumination"] > 0.99
+    assert moon_phase(julian_day(utc(2024, 4, 8, 18, 21)))["illumination"] < 0.01
+
+
+@pytest.mark.parametrize("place, when, rise, transit, setting", [
+    # 08:00 EDT: today's Sun, not yesterday's
+    (NEW_YORK, utc(2024, 6, 21, 12), utc(2024, 6, 21, 9, 25), utc(2024, 6, 21, 16, 57), utc(2024, 6, 22, 0, 31)),
+    (LONDON, utc(2024, 12, 21, 7), utc(2024, 12, 21, 8, 4), utc(2024, 12, 21, 11, 58), utc(2024, 12, 21, 15, 53)),
+], ids=["new_york_june", "london_december"])
+def test_sun_rise_transit_and_set(place, when, rise, transit, setting):
+    sun = observe("sun", *place, when)
+
+    assert minutes_apart(sun["rise"], rise) <= 3
+    assert minutes_apart(sun["transit"], transit) <= 3
+    assert minutes_apart(sun["set"], setting) <= 3
+
+
+@pytest.mark.parametrize("body", ["moon", "mars", "jupiter", "saturn"])
+@pytest.mark.parametrize("hour", [3, 9, 15, 21])
+def test_the_coming_night_is_still_ahead(body, hour):
+    # New York local time, morning through late evening
+    when = utc(2024, 6, 21, 4) + timedelta(hours=hour)
+    night = observe(body, *NEW_YORK, when)
+
+    assert datetime.fromisoformat(night["transit"]) > when - timedelta(hours=12)
+    if night["best_window"]:
+        assert datetime.fromisoformat(night["best_window"]["end"]) > when
+        assert datetime.fromisoformat(night["best_time"]) >= when - timedelta(minutes=1)
+
+
+def test_planner_night_starts_at_the_coming_night():
+    evening = night_start(*NEW_YORK, utc(2024, 6, 21, 23))
+    after_midnight = night_start(*NEW_YORK, utc(2024, 6, 22, 6))
+    # Once the night's dark hours are over the next night is planned
+    morning = night_start(*NEW_YORK, utc(2024, 6, 22, 12))
+
+    assert evening == after_midnight
+    assert evening < utc(2024, 6, 21, 23) < evening + timedelta(days=1)
+    assert morning - evening == timedelta(days=1)
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+import backend.engines.ai_direction as ai_direction
+import backend.engines.ai_explainer as ai_explainer
+from backend.ai.base import track_fallbacks
+from backend.ai.cache import MemoryCache
+from backend.ai.fallback import FallbackExplainer
+from backend.api import main
+from backend.utils.result_cache import ResultCache
+
+
+def test_fallback_text_is_marked():
+    with track_fallbacks() as fallbacks:
+        FallbackExplainer().generate_content("moon")
+    assert fallbacks.used
+
+    with track_fallbacks() as fallbacks:
+        FallbackExplainer().explain({}, "Moon", "main", {"iso": 100})
+    assert fallbacks.used
+
+
+def test_keyless_guide_is_not_cached(monkeypatch):
+    # No API key: every AI text comes from FallbackExplainer
+    keyless = FallbackExplainer()
+    monkeypatch.setattr(ai_explainer, "get_explainer", lambda api_key=None: keyless)
+    monkeypatch.setattr(ai_direction, "get_ai_explainer", lambda api_key=None: keyless)
+    monkeypatch.setattr(main, "AI_PACK_PROMPTS", False)
+    memory = MemoryCache()
+    monkeypatch.setattr(main, "analysis_cache", ResultCache("analyze", memory))
+
+    with TestClient(main.app) as client:
+        response = client.get("/guide/Galaxy S24 Ultra/Moon")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+    assert len(memory) == 0
@@ -0,0 +1,102 @@
+import difflib
+import random
+import shutil
+import string
+
+import pytest
+
+from backend.engines.catalog_manager import CatalogManager
+from backend.engines.phone_specs import DATA_PATH
+
+
+@pytest.fixture
+def phones_json(tmp_path):
+    # A copy, so the compiled .bin is written next to it instead of into backend/data
+    path = tmp_path / "phones.json"
+    shutil.copy(DATA_PATH, path)
+    return path
+
+
+@pytest.fixture(params=[True, False], ids=["compiled", "json"])
+def snapshot(request, phones_json):
+    return CatalogManager(phones_json, compiled=request.param).current
+
+
+def test_brand_search_finds_phones_without_the_brand_in_their_name(snapshot):
+    apple = {key for key in snapshot.phones if snapshot.phones[key].get("brand") == "Apple"}
+    # "iPhone 16 Pro" has no "apple" in it: only the indexed brand can match
+    assert apple and not any("apple" in key.lower() for key in apple)
+
+    found = snapshot.index.search("apple", limit=len(snapshot.phones))
+
+    assert {key for key, _ in found} == apple
+
+
+@pytest.mark.parametrize("brand", ["Samsung", "Google"])
+def test_brand_search_returns_only_that_brand(snapshot, brand):
+    found = snapshot.index.search(brand.lower(), limit=len(snapshot.phones))
+
+    assert found
+    assert {snapshot.phones[key].get("brand") for key, _ in found} == {brand}
+
+
+def baseline_resolve(phones, phone_name: str):
+    """
+    The original get_phone_specs lookup, returning the key it picked.
+    """
+    if phone_name in phones:
+        return phone_name
+    search_query = phone_name.lower().strip()
+    matches = [key for key in phones.keys() if search_query in key.lower()]
+    if matches:
+        return min(matches, key=len)
+    close_matches = difflib.get_close_matches(phone_name, phones.keys(), n=1, cutoff=0.5)
+    return close_matches[0] if close_matches else None
+
+
+def lookup_queries(keys) -> list:
+    """
+    Exact names, other spellings and substrings (substring path), and typos
+    and unrelated text (fuzzy path), built from the catalog names.
+    """
+    rng = random.Random(7)
+    queries = ["", " ", "a", "pro", "ultra", "12", "Nokia 3310", "xyz phone", "galaxy", "IPHONE"]
+    for key in keys:
+        words = key.split()
+        queries += [key, key.lower(), key.upper(), f"  {key.lower()} ", key[1:], key[:-1], key[2:7]]
+        queries += [" ".join(words[1:]), " ".join(words[:-1]), words[-1]]
+        for _ in range(4):
+            chars = list(key)
+            i = rng.randrange(len(chars))
+            edit = rng.choice(["drop", "swap", "replace", "insert"])
+            if edit == "drop":
+                del chars[i]
+            elif edit == "swap" and i + 1 < len(chars):
+                chars[i], chars[i + 1] = chars[i + 1], chars[i]
+            elif edit == "replace":
+                chars[i] = rng.choice(string.ascii_lowercase)
+            else:
+                chars.insert(i, rng.choice(string.ascii_lowercase + " "))
+            queries.append("".join(chars))
+        queries.append("".join(rng.sample(key, len(key))))
+    return queries
+
+
+def test_resolve_matches_the_original_lookup(snapshot):
+    index = snapshot.index
+    paths = {"exact": 0, "substring": 0, "fuzzy": 0, "none": 0}
+
+    for query in lookup_queries(index.keys):
+        expected = baseline_resolve(snapshot.phones, query)
+        assert index.resolve(query) == expected, query
+        if query in snapshot.phones:
+            paths["exact"] += 1
+        elif expected is None:
+            paths["none"] += 1
+        elif query.lower().strip() in expected.lower():
+            paths["substring"] += 1
+        else:
+            paths["fuzzy"] += 1
+
+    # Every path of the lookup was exercised
+    assert all(paths.values()), paths
@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.ai.fake import FakeExplainer, FakeModelError
+from backend.ai.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientExplainer, request_budget
+)
+from backend.ai.scheduler import QueueTimeout, ScheduledExplainer, Scheduler
+
+FALLBACK = "AI unavailable. Please check the standard guide."
+
+
+class Raising(FakeExplainer):
+    """
+    A model whose calls raise `error` (a socket timeout, the scheduler giving up).
+    """
+
+    def __init__(self, error: BaseException):
+        super().__init__()
+        self.error = error
+
+    def complete(self, prompt: str) -> str:
+        self._plan()
+        raise self.error
+
+    async def acomplete(self, prompt: str) -> str:
+        self._plan()
+        raise self.error
+
+
+def test_slow_call_hits_the_deadline():
+    explainer = ResilientExplainer(FakeExplainer(latency=1.0), timeout=0.1)
+
+    began = time.perf_counter()
+    with pytest.raises(DeadlineExceeded, match="exceeded 0.1s"):
+        asyncio.run(explainer.acomplete("moon"))
+    with pytest.raises(DeadlineExceeded, match="exceeded 0.1s"):
+        explainer.complete("moon")
+
+    assert time.perf_counter() - began < 0.5
+    assert explainer.stats()["timeouts"] == 2
+
+
+def test_request_budget_caps_the_call_timeout():
+    explainer = ResilientExplainer(FakeExplainer(latency=1.0), timeout=None)
+
+    async def call():
+        with request_budget(0.1):
+            return await explainer.acomplete("moon")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call())
+
+
+@pytest.mark.parametrize("timeout", [None, 5.0], ids=["no_timeout", "timeout"])
+def test_inner_timeout_passes_through_unchanged(timeout):
+    # AI_TIMEOUT=off and no request budget: nothing here has a deadline of its own
+    error = TimeoutError("socket timed out")
+    explainer = ResilientExplainer(Raising(error), timeout=timeout)
+
+    with pytest.raises(TimeoutError) as raised:
+        asyncio.run(explainer.acomplete("moon"))
+    assert raised.value is error
+    with pytest.raises(TimeoutError) as raised:
+        explainer.complete("moon")
+    assert raised.value is error
+    # A model error like any other: the breaker counts it
+    assert explainer.stats()["timeouts"] == 2
+    assert explainer.breaker.failures == 2
+    assert asyncio.run(explainer.agenerate_content("moon")) == FALLBACK
+
+
+def test_queue_timeout_is_not_a_model_failure():
+    # The queue wait runs under the call's own deadline: its QueueTimeout, not a
+    # DeadlineExceeded counted against the model, must reach the caller
+    scheduler = Scheduler(max_concurrency=1)
+    model = FakeExplainer()
+    explainer = ResilientExplainer(ScheduledExplainer(model, scheduler), timeout=0.1,
+                                   breaker=CircuitBreaker(failures=1))
+
+    scheduler.acquire()  # the only slot stays busy
+    try:
+        for _ in range(2):
+            with pytest.raises(QueueTimeout):
+                asyncio.run(explainer.acomplete("moon"))
+            with pytest.raises(QueueTimeout):
+                explainer.complete("moon")
+    finally:
+        scheduler.release()
+
+    assert model.calls == 0
+    assert explainer.breaker.state == "closed"
+    assert explainer.stats()["rejected"] == 4
+    assert explainer.stats()["timeouts"] == 0
+
+
+def test_breaker_trips_then_recovers_through_a_probe():
+    failing = [True]
+    model = FakeExplainer(fail=lambda number: failing[0])
+    explainer = ResilientExplainer(model, breaker=CircuitBreaker(failures=3, cooldown=0.1))
+
+    for _ in range(3):
+        with pytest.raises(FakeModelError):
+            asyncio.run(explainer.acomplete("moon"))
+    assert explainer.breaker.state == "open"
+
+    # Open: refused without calling the model
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(explainer.acomplete("moon"))
+    assert model.calls == 3
+
+    # Half-open after the cooldown: a failed probe opens it again...
+    time.sleep(0.15)
+    with pytest.raises(FakeModelError):
+        asyncio.run(explainer.acomplete("moon"))
+    assert explainer.breaker.state == "open"
+    assert explainer.breaker.trips == 2
+
+    # ...and a successful one closes it
+    failing[0] = False
+    time.sleep(0.15)
+    assert asyncio.run(explainer.acomplete("moon")).startswith("Fake answer")
+    assert explainer.breaker.state == "closed"
+    assert asyncio.run(explainer.acomplete("moon")).startswith("Fake answer")
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, cooldown=0.0)
+    breaker.record_failure()
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.release()
+    assert breaker.allow() is True
+
+
+def hedged_explainer(latencies: list) -> ResilientExplainer:
+    # Calls take latencies[0], latencies[1], ... seconds
+    model = FakeExplainer(latency=lambda: latencies.pop(0))
+    explainer = ResilientExplainer(model, timeout=5.0, hedge=True, hedge_min_delay=0.05, hedge_min_samples=5)
+    for _ in range(5):
+        explainer.latency.add(0.01)
+    return explainer
+
+
+def test_async_hedge_wins_over_a_slow_first_call():
+    explainer = hedged_explainer([2.0, 0.01])
+
+    began = time.perf_counter()
+    assert asyncio.run(explainer.acomplete("moon")) == "Fake answer #2 for a 4-character prompt."
+
+    assert time.perf_counter() - began < 0.5
+    assert explainer.stats()["hedges"] == 1
+    assert explainer.stats()["hedge_wins"] == 1
+
+
+def test_sync_hedge_wins_over_a_slow_first_call():
+    explainer = hedged_explainer([1.0, 0.01])
+
+    began = time.perf_counter()
+    assert explainer.complete("moon") == "Fake answer #2 for a 4-character prompt."
+
+    assert time.perf_counter() - began < 0.5
+    assert explainer.stats()["hedge_wins"] == 1
+
+
+def test_no_hedge_when_the_first_call_is_fast():
+    explainer = hedged_explainer([0.01, 0.01])
+
+    assert asyncio.run(explainer.acomplete("moon")) == "Fake answer #1 for a 4-character prompt."
+    assert explainer.stats()["hedges"] == 0
@@ -0,0 +1,20 @@
+import json
+
+from backend.engines.rule_engine import BASELINE_PATH, check_baseline
+
+
+def test_rules_match_the_stored_baseline():
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    assert baseline["cases"]
+
+    assert check_baseline() == []
+
+
+def test_baseline_check_notices_a_changed_decision(tmp_path):
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    lenses = baseline["cases"][0]["lens"]
+    lenses["planet"] = "ultrawide" if lenses["planet"] != "ultrawide" else "main"
+    path = tmp_path / "decision_baseline.json"
+    path.write_text(json.dumps(baseline), encoding="utf-8")
+
+    assert check_baseline(path) == ["case 0: lens for planet"]
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.ai.scheduler import BATCH, RateLimiter, Scheduler, priority
+
+
+class CheckingLimiter(RateLimiter):
+    """
+    Unlimited, but notes whether it was ever asked while the scheduler's lock was held.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.scheduler = None
+        self.calls = 0
+        self.under_lock = 0
+
+    def reserve(self, tokens: int) -> float:
+        self.calls += 1
+        if self.scheduler._lock.locked():
+            self.under_lock += 1
+        time.sleep(0.001)  # a shared limiter's flock and file I/O
+        return super().reserve(tokens)
+
+
+def test_limiter_is_asked_outside_the_lock_and_the_cap_holds():
+    limiter = CheckingLimiter()
+    scheduler = Scheduler(max_concurrency=4, max_queue=1000, limiter=limiter)
+    limiter.scheduler = scheduler
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def call(i):
+        with scheduler.slot(10):
+            with lock:
+                active.append(i)
+                peak.append(len(active))
+            time.sleep(0.005)
+            with lock:
+                active.remove(i)
+
+    async def acall():
+        async with scheduler.aslot(10):
+            with lock:
+                active.append(None)
+                peak.append(len(active))
+            await asyncio.sleep(0.005)
+            with lock:
+                active.remove(None)
+
+    async def many():
+        with priority(BATCH):
+            await asyncio.gather(*(acall() for _ in range(40)))
+
+    with ThreadPoolExecutor(16) as pool:
+        threads = [pool.submit(call, i) for i in range(60)]
+        asyncio.run(many())
+        for future in threads:
+            future.result()
+
+    stats = scheduler.stats()
+    assert stats["admitted"] == 100
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+    assert max(peak) <= 4
+    assert limiter.calls == 100
+    assert limiter.under_lock == 0
+
+
+def test_rate_limited_calls_are_admitted_when_quota_returns():
+    # 600 requests per minute = one every 0.1s, with no burst beyond one
+    scheduler = Scheduler(max_concurrency=8, limiter=RateLimiter(600, 0, burst_seconds=0.1))
+
+    async def main():
+        began = time.perf_counter()
+
+        async def one():
+            async with scheduler.aslot():
+                return time.perf_counter() - began
+
+        return await asyncio.gather(*(one() for _ in range(4)))
+
+    admitted = sorted(asyncio.run(main()))
+    assert admitted[0] < 0.05
+    assert 0.25 <= admitted[-1] < 0.6
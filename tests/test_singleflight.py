@@ -0,0 +1,252 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.ai.base import PromptExplainer
+from backend.ai.resilience import DeadlineExceeded, request_budget
+from backend.ai.scheduler import BATCH, INTERACTIVE, ScheduledExplainer, Scheduler, priority
+from backend.ai.singleflight import CoalescingExplainer, SingleFlight
+
+CALLERS = 50
+KEYS = ["moon", "jupiter", "saturn"]
+
+
+class StubModel(PromptExplainer):
+    """
+    Counts upstream calls per prompt; each call takes `delay` seconds.
+    """
+    model_name = "stub"
+
+    def __init__(self, delay: float = 0.1, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, prompt: str) -> None:
+        with self._lock:
+            self.calls[prompt] += 1
+
+    def complete(self, prompt: str) -> str:
+        self._count(prompt)
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"answer to {prompt}"
+
+    async def acomplete(self, prompt: str) -> str:
+        self._count(prompt)
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"answer to {prompt}"
+
+
+def run_threads(fn, count: int) -> list:
+    """
+    Runs fn(i) on `count` threads released together; returns results or exceptions.
+    """
+    start = threading.Barrier(count)
+
+    def call(i):
+        start.wait()
+        try:
+            return fn(i)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(call, range(count)))
+
+
+def test_threads_share_one_upstream_call_per_key():
+    model = StubModel()
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    results = run_threads(lambda i: explainer.complete(KEYS[i % len(KEYS)]), CALLERS)
+
+    assert results == [f"answer to {KEYS[i % len(KEYS)]}" for i in range(CALLERS)]
+    assert model.calls == {key: 1 for key in KEYS}
+    assert explainer.single_flight.stats() == {
+        "upstream_calls": len(KEYS), "shared_calls": CALLERS - len(KEYS), "in_flight": 0
+    }
+
+
+def test_async_callers_share_one_upstream_call_per_key():
+    model = StubModel()
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    async def main():
+        return await asyncio.gather(*(explainer.acomplete(KEYS[i % len(KEYS)]) for i in range(CALLERS)))
+
+    results = asyncio.run(main())
+
+    assert results == [f"answer to {KEYS[i % len(KEYS)]}" for i in range(CALLERS)]
+    assert model.calls == {key: 1 for key in KEYS}
+    assert explainer.single_flight.stats()["in_flight"] == 0
+
+
+def test_thread_errors_reach_every_waiter():
+    error = RuntimeError("quota exceeded")
+    model = StubModel(error=error)
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    results = run_threads(lambda i: explainer.complete("moon"), CALLERS)
+
+    assert all(result is error for result in results)
+    assert model.calls == {"moon": 1}
+    assert explainer.single_flight._calls == {}
+
+
+def test_async_errors_reach_every_waiter():
+    model = StubModel(error=RuntimeError("quota exceeded"))
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    async def main():
+        return await asyncio.gather(*(explainer.acomplete("moon") for _ in range(CALLERS)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) and str(result) == "quota exceeded" for result in results)
+    assert model.calls == {"moon": 1}
+    assert explainer.single_flight._flights == {}
+
+
+def test_cancelling_every_waiter_cancels_the_call_and_forgets_it():
+    single_flight = SingleFlight()
+    started = []
+    cancelled = []
+
+    async def upstream():
+        started.append(True)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        waiters = [asyncio.ensure_future(single_flight.ado("moon", upstream)) for _ in range(CALLERS)]
+        await asyncio.sleep(0.05)
+        assert single_flight.stats()["in_flight"] == 1
+        for waiter in waiters:
+            waiter.cancel()
+        for waiter in waiters:
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        # Let the cancelled upstream task finish and run its done callback
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert started == [True]
+    assert cancelled == [True]
+    assert single_flight._calls == {}
+    assert single_flight._flights == {}
+
+
+def test_cancelling_some_waiters_keeps_the_call_for_the_rest():
+    model = StubModel(delay=0.1)
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    async def main():
+        waiters = [asyncio.ensure_future(explainer.acomplete("moon")) for _ in range(10)]
+        await asyncio.sleep(0.02)
+        for waiter in waiters[:9]:
+            waiter.cancel()
+        return await waiters[9]
+
+    assert asyncio.run(main()) == "answer to moon"
+    assert model.calls == {"moon": 1}
+    assert explainer.single_flight._flights == {}
+
+
+class OrderedModel(StubModel):
+    """
+    Also notes the order prompts reach the model in.
+    """
+
+    def __init__(self, delay: float = 0.01):
+        super().__init__(delay)
+        self.order = []
+
+    def _count(self, prompt: str) -> None:
+        super()._count(prompt)
+        self.order.append(prompt)
+
+
+def test_interactive_waiter_moves_a_shared_batch_call_up():
+    scheduler = Scheduler(max_concurrency=1)
+    model = OrderedModel()
+    explainer = CoalescingExplainer(ScheduledExplainer(model, scheduler), SingleFlight())
+
+    async def main():
+        scheduler.acquire()  # the only slot is busy while the queue fills
+        with priority(BATCH):
+            batch = [asyncio.create_task(explainer.acomplete(prompt)) for prompt in ("saturn", "moon")]
+            await asyncio.sleep(0.01)
+        # An interactive request joins the batch "moon" call
+        interactive = asyncio.create_task(explainer.acomplete("moon"))
+        await asyncio.sleep(0.01)
+        depth = scheduler.stats()["queue_depth_by_priority"]
+        scheduler.release()
+        await asyncio.gather(*batch, interactive)
+        return depth
+
+    depth = asyncio.run(main())
+
+    assert depth == {"interactive": 1, "batch": 1, "precompute": 0}
+    assert model.order == ["moon", "saturn"]
+
+
+def test_thread_waiter_moves_a_shared_batch_call_up():
+    scheduler = Scheduler(max_concurrency=1)
+    model = OrderedModel()
+    explainer = CoalescingExplainer(ScheduledExplainer(model, scheduler), SingleFlight())
+
+    def call(prompt, level):
+        with priority(level):
+            return explainer.complete(prompt)
+
+    scheduler.acquire()
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(call, "saturn", BATCH)]
+        time.sleep(0.02)
+        futures.append(pool.submit(call, "moon", BATCH))
+        time.sleep(0.02)
+        futures.append(pool.submit(call, "moon", INTERACTIVE))
+        time.sleep(0.02)
+        scheduler.release()
+        assert [future.result() for future in futures] == ["answer to saturn", "answer to moon", "answer to moon"]
+
+    assert model.order == ["moon", "saturn"]
+
+
+def test_later_waiter_stops_at_its_own_budget():
+    model = StubModel(delay=0.3)
+    explainer = CoalescingExplainer(model, SingleFlight())
+
+    async def hurried():
+        with request_budget(0.05):
+            return await explainer.acomplete("moon")
+
+    async def main():
+        leader = asyncio.create_task(explainer.acomplete("moon"))
+        await asyncio.sleep(0.01)
+        began = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            await hurried()
+        waited = time.perf_counter() - began
+        return await leader, waited
+
+    result, waited = asyncio.run(main())
+
+    assert waited < 0.2
+    # The call went on for the leader
+    assert result == "answer to moon"
+    assert model.calls == {"moon": 1}
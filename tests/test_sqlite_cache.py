@@ -0,0 +1,41 @@
+import asyncio
+import sqlite3
+import time
+
+from backend.ai.cache import MemoryCache, SQLiteCache, TieredCache
+
+
+def test_locked_database_does_not_block_the_event_loop(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = TieredCache(MemoryCache(), SQLiteCache(path, busy_timeout=0.5))
+    # Another process holding the write lock
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+
+    async def main():
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.create_task(ticker())
+        began = time.perf_counter()
+        await cache.aset("key", "value")
+        waited = time.perf_counter() - began
+        ticking.cancel()
+        return waited, max(gaps)
+
+    waited, longest_gap = asyncio.run(main())
+    other.rollback()
+    other.close()
+
+    assert waited >= 0.4  # the write really waited for the lock...
+    assert longest_gap < 0.2  # ...while the loop kept running
+    assert cache.second.errors == 1
+    # The memory tier still has it
+    assert asyncio.run(cache.aget("key")) == "value"
@@ -0,0 +1,28 @@
+import pytest
+
+from backend.engines.target_resolver import load_targets
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return load_targets()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Moon", "moon"),
+    ("the moon", "moon"),
+    ("M31", "andromeda"),
+    ("Orion neb", "orion_nebula"),
+    ("milkyway", "milky_way"),
+    ("red planet", "mars"),
+    ("The Red Planet tonight", "mars"),
+    ("planet jupiter", "jupiter"),
+    ("saturn planet", "saturn"),
+])
+def test_resolves_to_canonical_target(resolver, text, expected):
+    assert resolver.resolve(text).id == expected
+
+
+@pytest.mark.parametrize("text", ["red", "red nebula", "red sprite lightning", "the planet"])
+def test_part_of_a_multi_word_alias_does_not_match(resolver, text):
+    assert resolver.resolve(text) is None